@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the fleet configuration and Product objects.
+
+Builds N synthetic products twice: once the legacy way (raw config dicts and
+a Product with an instance __dict__) and once through the typed config model
+with slotted Product objects, and reports the resident size per product.
+
+Usage:
+    python scripts/benchmark_config_memory.py --products 10000
+"""
+
+import argparse
+import copy
+import datetime
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from product_pipeline.core.pipeline import Product  # noqa: E402
+from product_pipeline.utils.config_model import build_config_model  # noqa: E402
+from product_pipeline.utils.helpers import (  # noqa: E402
+    init_deployment_targets,
+    init_notification_channels,
+)
+
+
+class LegacyProduct:
+    """Product as it was before __slots__, for comparison."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def generate_raw_config(count):
+    shapes = [
+        ({"artifactory": True, "s3": True}, {"email": "smtp.a.example.com"}),
+        ({"nexus": True, "s3": True}, {"email": "smtp.b.example.com"}),
+        ({"artifactory": True, "nexus": True}, {"slack": "ccc"}),
+        ({"s3": True}, {"email": "smtp.d.example.com", "slack": "ddd"}),
+    ]
+    products = []
+    for i in range(count):
+        repos_enabled, channels = shapes[i % len(shapes)]
+        repositories = {
+            repo: (
+                {"enabled": True, "credentials_ref": repo}
+                if repos_enabled.get(repo)
+                else {"enabled": False}
+            )
+            for repo in ("artifactory", "nexus", "s3")
+        }
+        notifications = {
+            "email": {"enabled": False},
+            "slack": {"enabled": False},
+        }
+        if "email" in channels:
+            notifications["email"] = {
+                "enabled": True,
+                "config": {"smtp_server": channels["email"], "port": 587},
+            }
+        if "slack" in channels:
+            notifications["slack"] = {
+                "enabled": True,
+                "config": {
+                    "webhook_url": f"https://hooks.slack.com/services/{channels['slack']}"
+                },
+            }
+        products.append(
+            {
+                "product_name": f"Product{i}",
+                "git_repository": f"https://github.com/example/Product{i}.git",
+                "default_target_branch": "main",
+                "repositories": repositories,
+                "notifications": notifications,
+            }
+        )
+    return {"products": products}
+
+
+def build_products(product_configs, product_cls):
+    now = datetime.datetime.now()
+    products = []
+    for product_config in product_configs:
+        products.append(
+            product_cls(
+                name=product_config.get("product_name"),
+                git_repository=product_config.get("git_repository"),
+                scheduled_time=now,
+                target_branch=product_config.get("default_target_branch"),
+                deploy_targets=init_deployment_targets(product_config),
+                notification_channels=init_notification_channels(product_config),
+                valid_stages=["build", "deploy", "notify"],
+            )
+        )
+    return products
+
+
+def measure(label, count, build):
+    raw = generate_raw_config(count)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    retained = build(copy.deepcopy(raw))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{label:<10} {used / 1024 / 1024:10.2f} MiB {used / count:10.0f} B/product")
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Config memory benchmark")
+    parser.add_argument("--products", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"Resident size for {args.products} products (tracemalloc):")
+    measure(
+        "legacy",
+        args.products,
+        lambda raw: (raw, build_products(raw["products"], LegacyProduct)),
+    )
+    measure(
+        "typed",
+        args.products,
+        lambda raw: build_products(build_config_model(raw).products, Product),
+    )
+
+
+if __name__ == "__main__":
+    main()
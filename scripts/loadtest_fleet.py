@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Fleet load test against local stand-in servers.
+
+Generates config.yaml/secrets.yaml for N synthetic products with small
+artifacts, starts fake Artifactory, Nexus and S3 endpoints, an SMTP sink and
+a Slack webhook sink (each with configurable latency and error injection),
+runs the fleet through the pipeline worker pool and reports throughput,
+p50/p95/p99 latency per stage and target, and resource usage.
+
+Usage:
+    python scripts/loadtest_fleet.py --products 200 --latency-ms 20 \\
+        --error-rate 0.01 --stages build,deploy,notify
+
+Latency and error rates take one value for every service, or per-service
+values such as --latency-ms artifactory=50,s3=10. Pipeline.run pauses one
+second between stages, which bounds a product's latency from below.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from product_pipeline.core.workers import PipelineWorkerPool  # noqa: E402
+from product_pipeline.utils.config import load_config_model  # noqa: E402
+from product_pipeline.utils.helpers import (  # noqa: E402
+    configure_runtime,
+    shutdown_runtime,
+)
+
+SERVICES = ("artifactory", "nexus", "s3", "slack", "smtp")
+
+
+class Fault:
+    """Latency (mean and jitter, in ms) and error rate of one stand-in."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def apply(self, size=0):
+        """Sleeps for the injected latency; returns False for an injected error."""
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+            self.errors += failed
+        return not failed
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            size = 0
+            while True:
+                length = int(self.rfile.readline().split(b";")[0], 16)
+                self.rfile.read(length + 2)
+                size += length
+                if length == 0:
+                    return size
+        length = int(self.headers.get("Content-Length") or 0)
+        remaining = length
+        while remaining:
+            remaining -= len(self.rfile.read(min(remaining, 1 << 16)))
+        return length
+
+    def _handle(self):
+        size = self._read_body()
+        ok = self.server.fault.apply(size)
+        body = b'{"status": "ok"}' if ok else b'{"error": "injected"}'
+        self.send_response(201 if ok else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_PUT = do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: every message is accepted and dropped."""
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        fault = self.server.fault
+        self._reply("220 smtp-sink ready" if fault.apply() else "421 injected error")
+        in_data = False
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            if in_data:
+                if line == ".":
+                    in_data = False
+                    self._reply("250 queued")
+                continue
+            command = line[:4].upper()
+            if command == "EHLO":
+                self._reply("250-smtp-sink\r\n250 8BITMIME")
+            elif command == "DATA":
+                in_data = True
+                self._reply("354 end with .")
+            elif command == "QUIT":
+                self._reply("221 bye")
+                return
+            else:  # HELO, MAIL, RCPT, RSET, NOOP
+                self._reply("250 ok")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_servers(faults):
+    """Starts every stand-in on a free local port; returns name -> (server, url)."""
+    servers = {}
+    for name, fault in faults.items():
+        if name == "smtp":
+            server = _SMTPServer(("127.0.0.1", 0), _SMTPHandler)
+        else:
+            server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+            server.daemon_threads = True
+        server.fault = fault
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        servers[name] = (server, f"http://127.0.0.1:{port}")
+    return servers
+
+
+def generate_fleet(directory, count, servers, artifact_kb, stages_config):
+    """Writes config.yaml, secrets.yaml and the artifacts of `count` products."""
+    artifacts_dir = os.path.join(directory, "artifacts")
+    os.makedirs(artifacts_dir, exist_ok=True)
+    urls = {name: url for name, (_, url) in servers.items()}
+    smtp_port = servers["smtp"][0].server_address[1]
+    products = []
+    for i in range(count):
+        name = f"Product{i}"
+        artifact = os.path.join(artifacts_dir, f"{name}.bin")
+        with open(artifact, "wb") as f:
+            f.write(os.urandom(artifact_kb * 1024))
+        products.append(
+            {
+                "product_name": name,
+                "git_repository": f"https://git.example.com/fleet/{name}.git",
+                "default_target_branch": "main",
+                "artifacts": [artifact],
+                "repositories": {
+                    "artifactory": {
+                        "enabled": True,
+                        "credentials_ref": "artifactory",
+                        "url": urls["artifactory"],
+                    },
+                    "nexus": {
+                        "enabled": True,
+                        "credentials_ref": "nexus",
+                        "url": urls["nexus"],
+                    },
+                    "s3": {"enabled": True, "credentials_ref": "s3", "url": urls["s3"]},
+                },
+                "notifications": {
+                    "email": {
+                        "enabled": True,
+                        "config": {
+                            "smtp_server": "127.0.0.1",
+                            "port": smtp_port,
+                            "starttls": False,
+                            "recipients": ["team@example.com"],
+                        },
+                    },
+                    "slack": {
+                        "enabled": True,
+                        "config": {"webhook_url": f"{urls['slack']}/hooks/{name}"},
+                    },
+                },
+                **stages_config,
+            }
+        )
+    config = {
+        "secrets": {"backend": "file", "path": os.path.join(directory, "secrets.yaml")},
+        "history": {"enabled": False},
+        "tracing": {"enabled": False},
+        "products": products,
+    }
+    secrets = {
+        "artifactory": {"username": "load", "password": "test"},
+        "nexus": {"username": "load", "password": "test"},
+        "s3": {"access_key": "load", "secret_key": "test"},
+    }
+    with open(os.path.join(directory, "config.yaml"), "w") as f:
+        yaml.safe_dump(config, f)
+    with open(os.path.join(directory, "secrets.yaml"), "w") as f:
+        yaml.safe_dump(secrets, f)
+    return [product["product_name"] for product in products]
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return float("nan")
+    rank = max(1, round(p / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def parse_service_values(text, default):
+    """'20' -> 20 for every service; 'artifactory=50,s3=10' per service."""
+    values = dict.fromkeys(SERVICES, default)
+    if text is None:
+        return values
+    if "=" not in text:
+        return dict.fromkeys(SERVICES, float(text))
+    for item in text.split(","):
+        name, value = item.split("=", 1)
+        if name.strip() not in values:
+            raise SystemExit(f"Unknown service '{name}'; expected one of {SERVICES}.")
+        values[name.strip()] = float(value)
+    return values
+
+
+def run_fleet(names, stages, workers):
+    """Runs the fleet in this process, the way --all does."""
+    config = load_config_model()
+    configure_runtime(config)
+    pool = PipelineWorkerPool(config, max_workers=workers)
+    start = time.monotonic()
+    futures = {name: pool.submit(name, None, stages) for name in names}
+    timings, failed = [], []
+    for name, future in futures.items():
+        try:
+            timings.extend(future.result())
+        except Exception as e:
+            print(f"[LoadTest] '{name}' failed: {str(e).splitlines()[0]}")
+            failed.append(name)
+    pool.shutdown()
+    # Sends the fleet's digests and stops the CPU stage processes
+    shutdown_runtime()
+    elapsed = time.monotonic() - start
+    return elapsed, timings, failed
+
+
+def report(args, elapsed, timings, failed, faults, usage_before):
+    ok = args.products - len(failed)
+    result = {
+        "products": args.products,
+        "succeeded": ok,
+        "failed": len(failed),
+        "elapsed_seconds": elapsed,
+        "throughput_per_minute": ok / elapsed * 60 if elapsed else 0.0,
+        "latency": {},
+        "services": {},
+        "resources": {},
+    }
+    print(f"\n{ok}/{args.products} products in {elapsed:.1f}s")
+    print(f"Throughput: {result['throughput_per_minute']:.1f} products/min")
+
+    samples = {}
+    for kind, name, seconds, status in timings:
+        if status == "success":
+            samples.setdefault(f"{kind} {name}", []).append(seconds)
+    print(f"\n{'latency (ms)':<28}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for key in sorted(samples):
+        values = sorted(samples[key])
+        p50, p95, p99 = (percentile(values, p) * 1000 for p in (50, 95, 99))
+        result["latency"][key] = {"n": len(values), "p50": p50, "p95": p95, "p99": p99}
+        print(f"{key:<28}{len(values):>6}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+
+    print(f"\n{'service':<14}{'requests':>10}{'errors':>8}{'MiB':>10}")
+    for name, fault in faults.items():
+        result["services"][name] = {
+            "requests": fault.requests,
+            "errors": fault.errors,
+            "bytes": fault.bytes,
+        }
+        print(
+            f"{name:<14}{fault.requests:>10}{fault.errors:>8}"
+            f"{fault.bytes / 1024 / 1024:>10.2f}"
+        )
+
+    print(f"\n{'resources':<14}{'user s':>10}{'sys s':>10}{'max RSS MiB':>14}")
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    # CPU stage processes are children of the forkserver, a child of ours
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    rows = [
+        (
+            "pipelines",
+            own.ru_utime - usage_before.ru_utime,
+            own.ru_stime - usage_before.ru_stime,
+            own.ru_maxrss,
+        ),
+        ("cpu stages", children.ru_utime, children.ru_stime, children.ru_maxrss),
+    ]
+    for label, user, system, max_rss in rows:
+        max_rss /= 1024  # KiB on Linux
+        result["resources"][label] = {
+            "user_seconds": user,
+            "system_seconds": system,
+            "max_rss_mib": max_rss,
+        }
+        print(f"{label:<14}{user:>10.2f}{system:>10.2f}{max_rss:>14.1f}")
+    if failed:
+        print(f"\nFailed: {', '.join(failed[:20])}{' ...' if len(failed) > 20 else ''}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet load test")
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--stages", default="build,deploy,notify")
+    parser.add_argument("--artifact-kb", type=int, default=64)
+    parser.add_argument("--latency-ms", help="e.g. 20, or artifactory=50,s3=10")
+    parser.add_argument("--jitter-ms", help="same format as --latency-ms")
+    parser.add_argument("--error-rate", help="0..1, same format as --latency-ms")
+    parser.add_argument(
+        "--build-command", help="Build command run by every product, e.g. 'sleep 0.1'"
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated fleet")
+    args = parser.parse_args()
+
+    latency = parse_service_values(args.latency_ms, 0.0)
+    jitter = parse_service_values(args.jitter_ms, 0.0)
+    errors = parse_service_values(args.error_rate, 0.0)
+    faults = {
+        name: Fault(latency[name], jitter[name], errors[name]) for name in SERVICES
+    }
+    servers = start_servers(faults)
+    stages_config = (
+        {"build": {"commands": [args.build_command]}} if args.build_command else {}
+    )
+
+    directory = tempfile.mkdtemp(prefix="pipeline-loadtest-")
+    names = generate_fleet(
+        directory, args.products, servers, args.artifact_kb, stages_config
+    )
+    # The fleet loads this config instead of the repository's
+    os.environ["PIPELINE_CONFIG_DIR"] = directory
+    print(f"Fleet of {args.products} products generated in {directory}")
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    elapsed, timings, failed = run_fleet(names, stages, args.workers)
+    result = report(args, elapsed, timings, failed, faults, usage_before)
+
+    for server, _ in servers.values():
+        server.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if not args.keep:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
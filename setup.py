@@ -35,6 +35,7 @@ setup(
     entry_points={
         "console_scripts": [
             "product-pipeline=product_pipeline.main:main",
+            "product-pipeline-regressions=product_pipeline.utils.history:main",
         ],
     },
     classifiers=[
@@ -0,0 +1,155 @@
+"""
+Change detection: skip the pipelines of branches that did not move.
+
+The remote head of every product's target branch is read with one
+`git ls-remote` per repository, whatever the number of its branches, all
+repositories being queried concurrently. Queries to one host are bounded
+by the `git` entry of `rate_limits`. A product is unchanged when its head
+is the commit of its last successful run in the run history.
+"""
+
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from product_pipeline.utils.history import create_history
+from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.ratelimit import get_rate_limiter
+
+logger = get_logger("Changes")
+
+DEFAULT_MAX_QUERIES = 16
+DEFAULT_TIMEOUT = 60
+
+
+class ChangeDetectionError(Exception):
+    pass
+
+
+def repository_host(repository):
+    """Host of a git URL (https://, ssh://, or scp-like git@host:path)."""
+    if "://" in repository:
+        return urlsplit(repository).hostname or "local"
+    match = re.match(r"^(?:[^@/]+@)?([^:/]+):", repository)
+    return match.group(1) if match else "local"
+
+
+def ls_remote(repository, branches, timeout=DEFAULT_TIMEOUT):
+    """Returns {branch: commit} of the branches that exist on the remote."""
+    refs = [f"refs/heads/{branch}" for branch in branches]
+    try:
+        result = subprocess.run(
+            ["git", "ls-remote", "--heads", repository, *refs],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        raise ChangeDetectionError(
+            f"git ls-remote {repository} timed out after {timeout}s."
+        ) from None
+    if result.returncode != 0:
+        raise ChangeDetectionError(
+            f"git ls-remote {repository} failed: {result.stderr.strip()}"
+        )
+    heads = {}
+    for line in result.stdout.splitlines():
+        commit, ref = line.split("\t", 1)
+        # Patterns match ref tails; keep exact matches only
+        if ref in refs:
+            heads[ref[len("refs/heads/") :]] = commit
+    return heads
+
+
+@dataclass(frozen=True)
+class ChangeStatus:
+    __slots__ = ("product", "branch", "head", "last_commit", "error")
+    product: str
+    branch: str
+    head: str
+    last_commit: str
+    error: str
+
+    @property
+    def changed(self):
+        # Unknown heads run the pipeline, which reports the actual problem
+        return self.head is None or self.head != self.last_commit
+
+
+def detect_changes(products, history, max_queries=None, timeout=DEFAULT_TIMEOUT):
+    """
+    products are (product_name, repository, branch) tuples. Returns a
+    ChangeStatus per product name.
+    """
+    products = list(products)
+    branches = {}
+    for _, repository, branch in products:
+        branches.setdefault(repository, set()).add(branch)
+
+    def query(repository):
+        host = repository_host(repository)
+        with get_rate_limiter().limit("git", host):
+            return ls_remote(repository, sorted(branches[repository]), timeout)
+
+    with ThreadPoolExecutor(
+        max_workers=max_queries or DEFAULT_MAX_QUERIES, thread_name_prefix="ls-remote"
+    ) as executor:
+        futures = {
+            repository: executor.submit(query, repository) for repository in branches
+        }
+
+    statuses = {}
+    for name, repository, branch in products:
+        head, error = None, None
+        try:
+            head = futures[repository].result().get(branch)
+            if head is None:
+                error = f"Branch '{branch}' not found in {repository}."
+        except ChangeDetectionError as e:
+            error = str(e)
+        last_commit = history.last_commit(name, branch) if history else None
+        statuses[name] = ChangeStatus(name, branch, head, last_commit, error)
+    return statuses
+
+
+def select_changed(config, product_configs, target_branch=None):
+    """
+    Returns the product configurations whose target branch moved since
+    their last successful run; all of them if the run history is disabled.
+    """
+    product_configs = list(product_configs)
+    history = create_history(config.get("history"))
+    if history is None:
+        logger.warning("Run history is disabled; running every product.")
+        return product_configs
+    settings = config.get("changes") or {}
+    try:
+        statuses = detect_changes(
+            (
+                (
+                    product.get("product_name"),
+                    product.get("git_repository"),
+                    target_branch or product.get("default_target_branch"),
+                )
+                for product in product_configs
+            ),
+            history,
+            max_queries=settings.get("max_queries"),
+            timeout=settings.get("timeout", DEFAULT_TIMEOUT),
+        )
+    finally:
+        history.close()
+    selected = []
+    for product in product_configs:
+        status = statuses[product.get("product_name")]
+        if status.error:
+            logger.warning(f"Running '{status.product}' anyway: {status.error}")
+        if status.changed:
+            selected.append(product)
+        else:
+            print(
+                f"[Changes] '{status.product}' unchanged at {status.head[:10]} "
+                f"({status.branch}); skipping."
+            )
+    return selected
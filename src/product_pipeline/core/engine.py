@@ -0,0 +1,237 @@
+"""
+Stage execution engine.
+
+Each stage runs on the executor matching its resource class: CPU-bound work
+goes to a process pool (no GIL contention with the rest of the pipeline),
+I/O-bound stages to a thread pool and subprocess-bound stages to a shared
+asyncio event loop, where waiting on child processes costs no thread.
+Executors are created on first use.
+
+Pool processes are forked from a forkserver that has already imported the
+pipeline and the stage plugins, so starting one costs milliseconds rather
+than an interpreter start-up, and get the per-process `limits` of the
+`engine` config section.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from product_pipeline.stages.base import CPU_BOUND, IO_BOUND, SUBPROCESS_BOUND
+from product_pipeline.utils.accounting import add_usage, measure
+from product_pipeline.utils.cancellation import DeadlineExceeded, current_token
+from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.tracing import (
+    SpanContext,
+    configure_tracing,
+    current_traceparent,
+    get_tracer,
+    wrap_context,
+)
+
+try:  # Unix only; limits are skipped elsewhere
+    import resource
+except ImportError:  # pragma: no cover - depends on the platform
+    resource = None
+
+logger = get_logger("Engine")
+
+# Defaults for the optional `engine` config section
+DEFAULT_IO_WORKERS = 8
+
+# Modules imported once by the forkserver and inherited by every pool process
+PRELOAD_MODULES = [
+    "product_pipeline.core.pipeline",
+    "product_pipeline.utils.helpers",
+]
+
+
+def _mp_context(preload=None):
+    # Forking a process that already runs threads can deadlock the child
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    # Only takes effect if the forkserver is not running yet
+    context.set_forkserver_preload(PRELOAD_MODULES + list(preload or []))
+    return context
+
+
+def apply_limits(limits):
+    """
+    Applies the `limits` of the `engine` config section inside a pool
+    process: memory_mb (address space), cpu_seconds, open_files and nice.
+    """
+    if limits.get("nice"):
+        os.nice(limits["nice"])
+    if resource is None:
+        return
+    for key, rlimit, scale in (
+        ("memory_mb", resource.RLIMIT_AS, 1024 * 1024),
+        ("cpu_seconds", resource.RLIMIT_CPU, 1),
+        ("open_files", resource.RLIMIT_NOFILE, 1),
+    ):
+        if limits.get(key):
+            value = int(limits[key] * scale)
+            resource.setrlimit(rlimit, (value, value))
+
+
+def _traced_work(tracing_config, traceparent, work, payload):
+    """
+    Runs a CPU stage's work() in a pool process, as a child span of the stage.
+    Returns the result and the (user, system, peak RSS delta) it used.
+    """
+    tracer = get_tracer()
+    if tracing_config and tracer.exporter is None:
+        # First traced work in this process
+        tracer = configure_tracing(tracing_config)
+    try:
+        with tracer.span(
+            "stage.work",
+            {"process.pid": os.getpid()},
+            parent=SpanContext.from_traceparent(traceparent),
+        ):
+            with measure(None) as usage:
+                result = work(payload)
+        return result, (
+            usage.user + usage.children_user,
+            usage.system + usage.children_system,
+            usage.peak_rss_delta,
+        )
+    finally:
+        tracer.flush()
+
+
+class StageEngine:
+    def __init__(self, config=None, preload=None):
+        config = config or {}
+        self.cpu_workers = config.get("cpu_workers") or os.cpu_count() or 1
+        self.io_workers = config.get("io_workers", DEFAULT_IO_WORKERS)
+        self.limits = dict(config.get("limits") or {})
+        # Plugin modules the forkserver imports along with the pipeline
+        self.preload = list(preload or [])
+        self._lock = threading.Lock()
+        self._process_pool = None
+        self._thread_pool = None
+        self._loop = None
+        self._loop_thread = None
+
+    def _get_process_pool(self):
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.cpu_workers,
+                    mp_context=_mp_context(self.preload),
+                    initializer=apply_limits,
+                    initargs=(self.limits,),
+                )
+            return self._process_pool
+
+    def _get_thread_pool(self):
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.io_workers, thread_name_prefix="stage-io"
+                )
+            return self._thread_pool
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="stage-loop", daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def submit(self, stage, product):
+        """Schedules the stage for the product; returns a concurrent Future."""
+        if stage.resource_class == CPU_BOUND:
+            return self._submit_cpu(stage, product)
+        if stage.resource_class == SUBPROCESS_BOUND:
+            # The task copies the caller's context, current span included
+            return asyncio.run_coroutine_threadsafe(
+                stage.run_async(product), self._get_loop()
+            )
+        if stage.resource_class == IO_BOUND:
+            return self._get_thread_pool().submit(wrap_context(stage.run), product)
+        raise ValueError(f"Unknown resource class '{stage.resource_class}'.")
+
+    def _submit_cpu(self, stage, product):
+        # Only the payload crosses the process boundary; the result is applied
+        # to the product here, once the worker is done
+        payload = stage.payload(product)
+        future = self._get_process_pool().submit(
+            _traced_work,
+            get_tracer().config,
+            current_traceparent(),
+            type(stage).work,
+            payload,
+        )
+
+        def apply():
+            result, usage = future.result(timeout=current_token().remaining())
+            # Counted in the stage measured by the pipeline (accounting.py)
+            add_usage(*usage)
+            return stage.apply(product, result)
+
+        return self._get_thread_pool().submit(wrap_context(apply))
+
+    def run_stage(self, stage, product):
+        logger.info(
+            f"Running stage '{stage.name}' ({stage.resource_class}) "
+            f"for '{product.name}'"
+        )
+        token = current_token()
+        future = self.submit(stage, product)
+        try:
+            return future.result(timeout=token.remaining())
+        except FutureTimeoutError:
+            if not token.expired:
+                raise
+            # Stops the stage's work where it cooperates (requests, child
+            # processes, plugin checks) instead of leaving it to hold a worker
+            reason = f"Stage '{stage.name}' of '{product.name}' exceeded its deadline"
+            token.cancel(reason)
+            future.cancel()
+            raise DeadlineExceeded(reason) from None
+
+    def shutdown(self):
+        with self._lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+                self._process_pool = None
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown()
+                self._thread_pool = None
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop_thread.join()
+                self._loop.close()
+                self._loop = None
+                self._loop_thread = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def configure_engine(config=None, preload=None):
+    """(Re)creates the process-wide engine from the `engine` config section."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.shutdown()
+        _engine = StageEngine(config, preload)
+        return _engine
+
+
+def get_engine():
+    """Returns the process-wide engine shared by all pipelines."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = StageEngine()
+        return _engine
@@ -0,0 +1,200 @@
+"""
+In-process event bus.
+
+Pipelines publish typed events (run/stage start and finish, target deployed,
+channel notified) that are delivered to every subscriber through its own
+bounded asyncio queue on a background event loop. A full queue blocks the
+publisher (backpressure) instead of buffering without limit. JsonLinesWriter
+is a built-in subscriber appending each event as one JSON line to a file.
+"""
+
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import os
+import threading
+from dataclasses import dataclass
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Events")
+
+RUN_STARTED = "run.started"
+RUN_FINISHED = "run.finished"
+STAGE_STARTED = "stage.started"
+STAGE_FINISHED = "stage.finished"
+TARGET_DEPLOYED = "target.deployed"
+CHANNEL_NOTIFIED = "channel.notified"
+
+# Event type published when a timed call of each kind finishes
+FINISHED_EVENTS = {
+    "stage": STAGE_FINISHED,
+    "target": TARGET_DEPLOYED,
+    "channel": CHANNEL_NOTIFIED,
+}
+
+DEFAULT_QUEUE_SIZE = 1000
+_CLOSE = object()
+
+
+@dataclass(frozen=True)
+class Event:
+    __slots__ = ("type", "product", "timestamp", "data")
+    type: str
+    product: str
+    timestamp: str
+    data: dict
+
+    @classmethod
+    def create(cls, event_type, product, **data):
+        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        return cls(event_type, product, timestamp, data)
+
+    def to_dict(self):
+        return {
+            "type": self.type,
+            "product": self.product,
+            "timestamp": self.timestamp,
+            **self.data,
+        }
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._loop = None
+        self._thread = None
+
+    def _ensure_loop(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="event-bus", daemon=True
+            )
+            self._thread.start()
+        return self._loop
+
+    def subscribe(self, handler, maxsize=DEFAULT_QUEUE_SIZE):
+        """
+        Registers handler(event), a function or coroutine function, fed from
+        a queue holding at most maxsize pending events.
+        """
+        with self._lock:
+            loop = self._ensure_loop()
+
+            async def start():
+                queue = asyncio.Queue(maxsize=maxsize)
+                task = asyncio.ensure_future(self._consume(handler, queue))
+                return queue, task, handler
+
+            subscriber = asyncio.run_coroutine_threadsafe(start(), loop).result()
+            self._subscribers.append(subscriber)
+
+    @staticmethod
+    async def _consume(handler, queue):
+        while True:
+            event = await queue.get()
+            if event is _CLOSE:
+                return
+            try:
+                result = handler(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                # One broken subscriber must not stop the pipeline or the others
+                logger.error(f"Event subscriber failed on '{event.type}': {e}")
+
+    def publish(self, event, timeout=None):
+        """
+        Delivers the event to every subscriber; blocks while a queue is full,
+        raising concurrent.futures.TimeoutError after `timeout` seconds.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+            loop = self._loop
+        if not subscribers:
+            return
+
+        async def put():
+            for queue, _, _ in subscribers:
+                await queue.put(event)
+
+        future = asyncio.run_coroutine_threadsafe(put(), loop)
+        try:
+            future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """Delivers the pending events, then stops the subscribers and the loop."""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+        if loop is None:
+            return
+
+        async def drain():
+            for queue, _, _ in subscribers:
+                await queue.put(_CLOSE)
+            await asyncio.gather(*(task for _, task, _ in subscribers))
+
+        asyncio.run_coroutine_threadsafe(drain(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        for _, _, handler in subscribers:
+            if hasattr(handler, "close"):
+                handler.close()
+
+
+class JsonLinesWriter:
+    """Subscriber appending every event as one JSON line, ready to be tailed."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a")
+
+    def __call__(self, event):
+        self._file.write(json.dumps(event.to_dict(), default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+_bus = EventBus()
+_bus_lock = threading.Lock()
+
+
+def configure_events(config=None):
+    """
+    (Re)creates the process-wide bus from the `events` config section,
+    subscribing a JsonLinesWriter when `path` is set.
+    """
+    global _bus
+    config = config or {}
+    with _bus_lock:
+        _bus.close()
+        _bus = EventBus()
+        if config.get("path"):
+            _bus.subscribe(
+                JsonLinesWriter(config["path"]),
+                maxsize=config.get("queue_size", DEFAULT_QUEUE_SIZE),
+            )
+        return _bus
+
+
+def get_event_bus():
+    """Returns the process-wide bus shared by all pipelines."""
+    with _bus_lock:
+        return _bus
+
+
+def publish(event_type, product, **data):
+    get_event_bus().publish(Event.create(event_type, product, **data))
@@ -0,0 +1,192 @@
+"""
+Matrix runs: one product's pipeline for several branches at once.
+
+All branches share a bare mirror of the repository, updated by a single
+fetch, and each branch is checked out in its own `git worktree` of it, so
+objects are downloaded and stored once whatever the number of branches.
+The pipelines then run concurrently on the shared engine and their results
+are grouped in one summary.
+"""
+
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from product_pipeline.core.engine import get_engine
+from product_pipeline.core.pipeline import Pipeline
+from product_pipeline.notifications.digest import get_digest_collector
+from product_pipeline.utils.helpers import create_product
+from product_pipeline.utils.history import create_history
+from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.tracing import span, wrap_context
+
+logger = get_logger("Matrix")
+
+# Defaults for the optional `matrix` config section
+DEFAULT_CACHE_DIR = ".pipeline_cache"
+DEFAULT_DEPTH = 1
+
+
+class MatrixError(Exception):
+    pass
+
+
+def _git(*args, cwd=None):
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise MatrixError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def _directory_name(branch):
+    # release/1.2 -> release_1.2
+    return re.sub(r"[^A-Za-z0-9._-]", "_", branch)
+
+
+class SharedMirror:
+    """Bare mirror of a repository, with one detached worktree per branch."""
+
+    def __init__(self, repository, path, worktree_dir, depth=DEFAULT_DEPTH):
+        self.repository = repository
+        self.path = path
+        self.worktree_dir = worktree_dir
+        self.depth = depth
+
+    def fetch(self, branches):
+        """Updates all branches with one fetch; returns branch -> commit."""
+        if not os.path.isdir(self.path):
+            _git("init", "--bare", "--quiet", self.path)
+            _git("remote", "add", "origin", self.repository, cwd=self.path)
+        args = ["fetch", "--quiet", "--force"]
+        if self.depth:
+            args += ["--depth", str(self.depth)]
+        refspecs = [f"+refs/heads/{branch}:refs/heads/{branch}" for branch in branches]
+        _git(*args, "origin", *refspecs, cwd=self.path)
+        return {
+            branch: _git("rev-parse", f"refs/heads/{branch}", cwd=self.path)
+            for branch in branches
+        }
+
+    def worktree(self, branch, commit):
+        """Checks commit out in the branch's worktree, reusing an existing one."""
+        path = os.path.join(self.worktree_dir, _directory_name(branch))
+        if os.path.exists(os.path.join(path, ".git")):
+            _git("checkout", "--quiet", "--force", "--detach", commit, cwd=path)
+        else:
+            # Detached, so one branch can never be "already checked out" elsewhere
+            _git("worktree", "prune", cwd=self.path)
+            _git(
+                "worktree",
+                "add",
+                "--quiet",
+                "--force",
+                "--detach",
+                os.path.abspath(path),
+                commit,
+                cwd=self.path,
+            )
+        return path
+
+
+@dataclass(frozen=True)
+class BranchResult:
+    __slots__ = ("branch", "commit", "status", "duration", "error")
+    branch: str
+    commit: str
+    status: str
+    duration: float
+    error: str
+
+
+def create_mirror(config, product_config):
+    settings = config.get("matrix") or {}
+    cache_dir = settings.get("cache_dir", DEFAULT_CACHE_DIR)
+    name = product_config.get("product_name")
+    return SharedMirror(
+        product_config.get("git_repository"),
+        os.path.join(cache_dir, "mirrors", f"{name}.git"),
+        os.path.join(cache_dir, "worktrees", name),
+        depth=settings.get("depth", DEFAULT_DEPTH),
+    )
+
+
+def run_matrix(config, product_config, branches, stages=None, secrets_provider=None):
+    """
+    Runs the product's pipeline for every branch concurrently, each in its
+    own worktree of the shared mirror. Returns a BranchResult per branch.
+    """
+    name = product_config.get("product_name")
+    settings = config.get("matrix") or {}
+    mirror = create_mirror(config, product_config)
+    print(f"[Matrix] Fetching {len(branches)} branch(es) of '{name}' once")
+    commits = mirror.fetch(branches)
+    # Worktrees are added one at a time: git locks the mirror's metadata
+    workspaces = {
+        branch: mirror.worktree(branch, commits[branch]) for branch in branches
+    }
+
+    history = create_history(config.get("history"))
+    engine = get_engine()
+    tracemalloc_top = (config.get("accounting") or {}).get("tracemalloc_top", 0)
+
+    def run_branch(branch):
+        start = time.monotonic()
+        product = create_product(product_config, branch, secrets_provider)
+        product.workspace = workspaces[branch]
+        try:
+            Pipeline(
+                product,
+                stages,
+                engine=engine,
+                history=history,
+                tracemalloc_top=tracemalloc_top,
+                deadlines=config.get("deadlines"),
+            ).run()
+        except Exception as e:
+            logger.error(f"Pipeline of '{name}' on '{branch}' failed: {e}")
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        else:
+            status, error = "success", None
+        return BranchResult(
+            branch, commits[branch], status, time.monotonic() - start, error
+        )
+
+    try:
+        with span(
+            "matrix.run", {"pipeline.product": name, "pipeline.branches": branches}
+        ):
+            with ThreadPoolExecutor(
+                max_workers=settings.get("max_parallel") or len(branches),
+                thread_name_prefix="matrix",
+            ) as executor:
+                # One context copy per branch: a context runs in one thread at a time
+                futures = [
+                    executor.submit(wrap_context(run_branch), branch)
+                    for branch in branches
+                ]
+                results = [future.result() for future in futures]
+    finally:
+        # One digest for the whole matrix
+        get_digest_collector().flush_all()
+        engine.shutdown()
+        if history is not None:
+            history.close()
+    print_summary(name, results)
+    return results
+
+
+def print_summary(name, results):
+    print(f"[Matrix] Summary for '{name}':")
+    width = max(len(result.branch) for result in results)
+    for result in results:
+        line = (
+            f"[Matrix]   {result.branch:<{width}}  {result.commit[:10]}  "
+            f"{result.status:<7}  {result.duration:.1f}s"
+        )
+        if result.error:
+            line += f"  ({result.error})"
+        print(line)
+    failed = sum(result.status != "success" for result in results)
+    print(f"[Matrix] {len(results) - failed} succeeded, {failed} failed.")
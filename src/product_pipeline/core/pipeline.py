@@ -1,6 +1,31 @@
+import datetime
 import time
 import sys  # Needed to exit in case of an error
+from contextlib import contextmanager
 from product_pipeline.utils.logging import get_logger
+from product_pipeline.core import events
+from product_pipeline.core.engine import get_engine
+from product_pipeline.core.tee import TeeUploadError, tee_upload
+from product_pipeline.stages.base import STAGE_REGISTRY, get_stage
+from product_pipeline.stages.build import run_build
+from product_pipeline.stages.compress import compress_artifacts
+from product_pipeline.stages.test import git_commit, run_integration_tests
+
+# Built-in stages register themselves on import
+import product_pipeline.stages.clone  # noqa: F401
+import product_pipeline.stages.deploy  # noqa: F401
+import product_pipeline.stages.notify  # noqa: F401
+from product_pipeline.utils.accounting import measure
+from product_pipeline.utils.cancellation import (
+    CancellationToken,
+    DeadlineExceeded,
+    stage_timeout,
+    use_token,
+)
+from product_pipeline.utils.hashing import build_manifest, write_manifest
+from product_pipeline.utils.metrics import get_metrics
+from product_pipeline.utils.ratelimit import get_rate_limiter
+from product_pipeline.utils.tracing import span
 from product_pipeline.repositories.artifactory import ArtifactoryTarget
 from product_pipeline.repositories.nexus import NexusTarget
 from product_pipeline.repositories.s3 import S3Target
@@ -10,10 +35,27 @@ from product_pipeline.notifications.slack import SlackNotification
 logger = get_logger("Pipeline")
 
 # List of implemented pipeline steps
-IMPLEMENTED_STEPS = ["build", "deploy", "notify"]
+IMPLEMENTED_STEPS = ["clone", "build", "test", "compress", "deploy", "notify"]
 
 
 class Product:
+    # Slotted: daemons may hold one Product per configured product
+    __slots__ = (
+        "name",
+        "git_repository",
+        "scheduled_time",
+        "target_branch",
+        "deploy_targets",
+        "notification_channels",
+        "valid_stages",
+        "artifacts",
+        "checksums",
+        "config",
+        "manifest",
+        "workspace",
+        "timings",
+    )
+
     def __init__(
         self,
         name,
@@ -23,6 +65,9 @@ class Product:
         deploy_targets,
         notification_channels,
         valid_stages=None,
+        artifacts=None,
+        config=None,
+        workspace=None,
     ):
         self.name = name
         self.git_repository = git_repository
@@ -34,79 +79,353 @@ class Product:
         self.valid_stages = (
             valid_stages if valid_stages is not None else IMPLEMENTED_STEPS
         )
+        # Local paths of the build outputs uploaded by the deploy targets
+        self.artifacts = list(artifacts or [])
+        # SHA-256 per artifact, computed once while streaming to the targets
+        self.checksums = {}
+        # Product entry from config.yaml, read by the optional stages
+        self.config = config if config is not None else {}
+        # Paths, sizes and digests of the artifacts, shared by all targets
+        self.manifest = None
+        # Local checkout of git_repository used by the test stage
+        self.workspace = workspace
+        # (kind, name, seconds, status) of each stage, target and channel call
+        self.timings = []
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Product({fields})"
+
+    @contextmanager
+    def timed(self, kind, name):
+        if kind == "stage":
+            events.publish(events.STAGE_STARTED, self.name, stage=name)
+        start = time.monotonic()
+        status = "failed"
+        try:
+            with span(
+                f"{kind} {name}",
+                {"pipeline.product": self.name, f"pipeline.{kind}": name},
+            ):
+                yield
+            status = "success"
+        finally:
+            self.record_timing(kind, name, time.monotonic() - start, status)
+
+    def record_timing(self, kind, name, seconds, status):
+        """Keeps the timing for the run history and publishes it as an event."""
+        self.timings.append((kind, name, seconds, status))
+        events.publish(
+            events.FINISHED_EVENTS[kind],
+            self.name,
+            **{kind: name, "duration": round(seconds, 6), "status": status},
+        )
 
     def build(self):
         msg = f"Building product '{self.name}' from repository '{self.git_repository}' on branch '{self.target_branch}'."
         logger.info(msg)
         print(f"[Build] {msg}")
+        run_build(self)
+
+    def test(self):
+        msg = f"Testing product '{self.name}' on branch '{self.target_branch}'."
+        logger.info(msg)
+        print(f"[Test] {msg}")
+        run_integration_tests(self)
+
+    def compress(self):
+        msg = f"Compressing artifacts of product '{self.name}'."
+        logger.info(msg)
+        print(f"[Compress] {msg}")
+        compress_artifacts(self)
+
+    def build_manifest(self):
+        """
+        Hashes the artifacts once (memory-mapped, in parallel) when the
+        product's `manifest` section is enabled, so targets get checksums up
+        front instead of each rehashing.
+        """
+        settings = self.config.get("manifest") or {}
+        if not settings.get("enabled", False) or not self.artifacts:
+            return None
+        self.manifest = build_manifest(self.artifacts, workers=settings.get("workers"))
+        for entry in self.manifest["artifacts"]:
+            self.checksums[entry["path"]] = entry["sha256"]
+        if settings.get("path"):
+            write_manifest(self.manifest, settings["path"])
+        return self.manifest
 
     def deploy(self):
         msg = f"Deploying product '{self.name}'."
         logger.info(msg)
         print(f"[Deploy] {msg}")
+        self.build_manifest()
+        streaming = [
+            target
+            for target in self.deploy_targets
+            if self.artifacts and getattr(target, "can_stream", lambda: False)()
+        ]
+        if streaming:
+            names = ", ".join(type(target).__name__ for target in streaming)
+            print(f"[Deploy] Streaming {len(self.artifacts)} artifact(s) to {names}")
+            # Each artifact is read and hashed once, whatever the number of targets
+            totals = dict.fromkeys(streaming, 0.0)
+            failed = set(streaming)
+            try:
+                for artifact in self.artifacts:
+                    durations = {}
+                    try:
+                        digest = tee_upload(
+                            self,
+                            artifact,
+                            streaming,
+                            hash_stream=artifact not in self.checksums,
+                            durations=durations,
+                        )
+                    except TeeUploadError as e:
+                        failed = set(e.errors)
+                        raise
+                    finally:
+                        for target, seconds in durations.items():
+                            totals[target] += seconds
+                    self.checksums.setdefault(artifact, digest)
+                failed = set()
+            finally:
+                for target in streaming:
+                    status = "failed" if target in failed else "success"
+                    self.record_timing(
+                        "target", type(target).__name__, totals[target], status
+                    )
         for target in self.deploy_targets:
-            target.deploy(self)
+            if target not in streaming:
+                with self.timed("target", type(target).__name__):
+                    target.deploy(self)
 
     def notify(self):
         msg = f"Notifying about product '{self.name}'."
         logger.info(msg)
         print(f"[Notify] {msg}")
         for channel in self.notification_channels:
-            channel.notify(self)
+            with self.timed("channel", type(channel).__name__):
+                channel.notify(self)
 
 
 class Pipeline:
-    def __init__(self, product: Product, stages=None):
+    def __init__(
+        self,
+        product: Product,
+        stages=None,
+        engine=None,
+        history=None,
+        tracemalloc_top=0,
+        deadlines=None,
+    ):
         self.product = product
+        # Optional RunHistory receiving the timings of every run
+        self.history = history
+        # Executors shared with other pipelines unless one is given
+        self.engine = engine if engine is not None else get_engine()
         # Use provided stages or default to product.valid_stages
         if stages is None:
             stages = product.valid_stages
-        # Validate that each provided stage is implemented
+        # Validate that each provided stage is implemented (built in or plugin)
         for stage in stages:
-            if stage not in IMPLEMENTED_STEPS:
+            if stage not in STAGE_REGISTRY:
                 print(f"Error: Functionality for step '{stage}' is not implemented.")
                 sys.exit(1)
         self.stages = stages
+        # Top allocations recorded per stage with tracemalloc (0 disables)
+        self.tracemalloc_top = tracemalloc_top
+        # StageUsage (CPU time, peak RSS growth) of each stage of the last run
+        self.usage = []
+        # `deadlines` section (run, stage, stages) in seconds; the product's
+        # own section overrides the global one
+        self.deadlines = {
+            **(deadlines or {}),
+            **((product.config or {}).get("deadlines") or {}),
+        }
 
     def run(self):
         logger.info(f"Starting pipeline for product: '{self.product.name}'")
         print(f"Starting pipeline for product: '{self.product.name}'")
-        for stage in self.stages:
-            if stage == "build":
-                self.product.build()
-            elif stage == "deploy":
-                self.product.deploy()
-            elif stage == "notify":
-                self.product.notify()
-            time.sleep(1)  # Simulate delay between stages
+        started_at = datetime.datetime.now(datetime.timezone.utc)
+        start = time.monotonic()
+        status = "failed"
+        events.publish(
+            events.RUN_STARTED,
+            self.product.name,
+            branch=self.product.target_branch,
+            stages=list(self.stages),
+        )
+        try:
+            with span(
+                "pipeline.run",
+                {
+                    "pipeline.product": self.product.name,
+                    "pipeline.branch": self.product.target_branch,
+                    "pipeline.stages": list(self.stages),
+                },
+            ):
+                run_token = CancellationToken.after(self.deadlines.get("run"))
+                for stage in self.stages:
+                    self.run_stage(stage, run_token)
+                    time.sleep(1)  # Simulate delay between stages
+            status = "success"
+        except DeadlineExceeded as e:
+            status = "timeout"
+            logger.error(f"Pipeline of '{self.product.name}' timed out: {e}")
+            raise
+        finally:
+            duration = time.monotonic() - start
+            events.publish(
+                events.RUN_FINISHED,
+                self.product.name,
+                duration=round(duration, 6),
+                status=status,
+            )
+            if self.history is not None:
+                self.record(started_at, duration, status)
+            self.report_usage(duration, status)
         logger.info("Pipeline finished.")
         print("Pipeline finished.")
 
+    def run_stage(self, stage, run_token):
+        """Runs one stage under a token bounded by its and the run's deadline."""
+        token = run_token.child(stage_timeout(self.deadlines, stage))
+        try:
+            with use_token(token):
+                with self.product.timed("stage", stage):
+                    with measure(stage, self.tracemalloc_top) as usage:
+                        self.usage.append(usage)
+                        token.check()
+                        self.engine.run_stage(get_stage(stage), self.product)
+        finally:
+            token.detach()
+
+    def report_usage(self, duration, status):
+        """Prints the resource usage of the run and exports it as metrics."""
+        product = self.product
+        labels = {"product": product.name, "branch": product.target_branch}
+        metrics = get_metrics()
+        metrics.inc(
+            "pipeline_runs_total", help_text="Pipeline runs", status=status, **labels
+        )
+        metrics.set(
+            "pipeline_run_duration_seconds",
+            duration,
+            help_text="Wall time of the last run",
+            **labels,
+        )
+        stage_seconds = {
+            name: seconds
+            for kind, name, seconds, _ in product.timings
+            if kind == "stage"
+        }
+        for usage in self.usage:
+            print(f"[Usage] {usage.summary()}")
+            stage_labels = dict(labels, stage=usage.stage)
+            for mode, seconds in (
+                ("user", usage.user + usage.children_user),
+                ("system", usage.system + usage.children_system),
+            ):
+                metrics.inc(
+                    "pipeline_stage_cpu_seconds_total",
+                    seconds,
+                    help_text="CPU time of the stage, child processes included",
+                    mode=mode,
+                    **stage_labels,
+                )
+            metrics.set(
+                "pipeline_stage_peak_rss_delta_bytes",
+                usage.peak_rss_delta,
+                help_text="Growth of the peak RSS during the last run of the stage",
+                **stage_labels,
+            )
+            if usage.stage in stage_seconds:
+                metrics.set(
+                    "pipeline_stage_duration_seconds",
+                    stage_seconds[usage.stage],
+                    help_text="Wall time of the last run of the stage",
+                    **stage_labels,
+                )
+        for kind, host, limiter in get_rate_limiter().adaptive_limiters():
+            state = limiter.snapshot()
+            endpoint_labels = dict(labels, kind=kind, host=host)
+            metrics.set(
+                "pipeline_endpoint_concurrency_limit",
+                state["limit"],
+                help_text="Adaptive limit of concurrent calls to the host",
+                **endpoint_labels,
+            )
+            metrics.set(
+                "pipeline_endpoint_latency_gradient",
+                state["gradient"],
+                help_text="Baseline over smoothed latency of the host (1 = unloaded)",
+                **endpoint_labels,
+            )
+            metrics.set(
+                "pipeline_endpoint_latency_seconds",
+                state["latency"],
+                help_text="Smoothed latency of calls to the host",
+                **endpoint_labels,
+            )
+            metrics.set(
+                "pipeline_endpoint_limit_decreases",
+                state["decreases"],
+                help_text="Times the host's limit was backed off in this process",
+                **endpoint_labels,
+            )
+        metrics.export(product.name)
+
+    def record(self, started_at, duration, status):
+        product = self.product
+        try:
+            self.history.record_run(
+                product.name,
+                product.target_branch,
+                git_commit(product.workspace) if product.workspace else None,
+                started_at,
+                duration,
+                status,
+                product.timings,
+            )
+        except Exception as e:
+            # Losing a history entry must not fail the delivery itself
+            logger.error(f"Failed to record run of '{product.name}': {e}")
 
-def create_deployment_target(repo_type, repo_config):
+
+def create_deployment_target(repo_type, repo_config, secrets_provider=None):
     target = None
     if repo_type.lower() == "artifactory" and repo_config.get("enabled", False):
         target = ArtifactoryTarget(
             credentials_ref=repo_config.get("credentials_ref"),
             credentials=repo_config.get("credentials"),
+            secrets_provider=secrets_provider,
+            config=repo_config,
         )
     elif repo_type.lower() == "nexus" and repo_config.get("enabled", False):
         target = NexusTarget(
             credentials_ref=repo_config.get("credentials_ref"),
             credentials=repo_config.get("credentials"),
+            secrets_provider=secrets_provider,
+            config=repo_config,
         )
     elif repo_type.lower() == "s3" and repo_config.get("enabled", False):
         target = S3Target(
             credentials_ref=repo_config.get("credentials_ref"),
             credentials=repo_config.get("credentials"),
+            secrets_provider=secrets_provider,
+            config=repo_config,
         )
     return target
 
 
-def create_notification_channel(channel_type, channel_config):
+def create_notification_channel(channel_type, channel_config, secrets_provider=None):
     channel = None
     if channel_type.lower() == "email" and channel_config.get("enabled", False):
-        channel = EmailNotification(config=channel_config.get("config", {}))
+        channel = EmailNotification(
+            config=channel_config.get("config", {}), secrets_provider=secrets_provider
+        )
     elif channel_type.lower() == "slack" and channel_config.get("enabled", False):
         channel = SlackNotification(config=channel_config.get("config", {}))
     return channel
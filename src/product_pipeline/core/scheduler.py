@@ -0,0 +1,239 @@
+"""
+Priority and weighted fair-share scheduling of pipeline runs.
+
+Fleet runs (--all) and webhook runs (--listen) go through a RunScheduler
+instead of starting in config or arrival order. At most max_parallel runs
+execute at a time; whenever a slot frees up, the next queued run is:
+
+1. the one of the highest priority: the product's `priority` setting
+   (default 0), raised to `hotfix_priority` for branches matching
+   `hotfix_branches`;
+2. among equal priorities, the one with the smallest start tag of
+   start-time fair queuing. Each run of a product advances the product's
+   tag by its expected duration divided by the product's `weight`, so a
+   product with huge builds falls behind small ones instead of taking
+   every worker that frees up.
+
+A run at or above `preempt_priority` preempts the queued runs below it:
+they are held back while such a run is queued or running. Running work
+is never interrupted.
+"""
+
+import fnmatch
+import heapq
+import itertools
+import statistics
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Scheduler")
+
+# Defaults for the optional `scheduler` config section
+DEFAULT_HOTFIX_PRIORITY = 100
+# Expected run duration (seconds) of a product without history
+DEFAULT_COST = 60.0
+# Weight of the latest duration in a product's expected duration
+COST_SMOOTHING = 0.5
+
+
+class _Run:
+    __slots__ = ("product", "args", "priority", "weight", "cost", "start", "future")
+
+    def __init__(self, product, args, priority, weight, cost, start):
+        self.product = product
+        self.args = args
+        self.priority = priority
+        self.weight = weight
+        self.cost = cost
+        # Start tag in the fair-share virtual time
+        self.start = start
+        self.future = Future()
+
+
+class RunScheduler:
+    """
+    Starts queued runs with start(product, *args) -> Future, by priority and
+    weighted fair share, at most max_parallel at a time.
+    """
+
+    def __init__(
+        self,
+        start,
+        max_parallel,
+        preempt_priority=None,
+        history=None,
+        clock=time.monotonic,
+    ):
+        self._start = start
+        self.max_parallel = max(1, max_parallel)
+        self.preempt_priority = preempt_priority
+        # Optional RunHistory seeding the expected duration of each product
+        self.history = history
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._running = 0
+        # Queued or running runs at or above preempt_priority
+        self._preempting = 0
+        # Fair-share virtual time: start tag of the latest started run
+        self._virtual_time = 0.0
+        self._finish_tags = {}
+        self._costs = {}
+        self._closed = False
+
+    def expected_cost(self, product):
+        """Expected duration of a product's run: smoothed, or from history."""
+        with self._lock:
+            if product in self._costs:
+                return self._costs[product]
+        cost = DEFAULT_COST
+        if self.history is not None:
+            durations = [
+                run["duration"]
+                for run in self.history.runs(product)
+                if run["status"] == "success"
+            ]
+            if durations:
+                cost = statistics.median(durations)
+        with self._lock:
+            return self._costs.setdefault(product, cost)
+
+    def submit(self, product, *args, priority=0, weight=1.0):
+        """Queues a run of product; returns a Future of its result."""
+        if weight <= 0:
+            raise ValueError(f"Weight of '{product}' must be positive, not {weight}.")
+        cost = self.expected_cost(product)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit runs after shutdown.")
+            start = max(self._virtual_time, self._finish_tags.get(product, 0.0))
+            self._finish_tags[product] = start + cost / weight
+            run = _Run(product, args, priority, weight, cost, start)
+            if self._preempts(run):
+                self._preempting += 1
+                held = sum(1 for entry in self._queue if entry[-1].priority < priority)
+                if held:
+                    print(
+                        f"[Scheduler] Run of '{product}' (priority {priority}) "
+                        f"preempts {held} queued run(s)"
+                    )
+            heapq.heappush(self._queue, (-priority, start, next(self._sequence), run))
+            queued = self._next_runs()
+        self._launch(queued)
+        return run.future
+
+    def _preempts(self, run):
+        return (
+            self.preempt_priority is not None and run.priority >= self.preempt_priority
+        )
+
+    def _next_runs(self):
+        # Pops the runs to start now; called with the lock held
+        runs = []
+        while self._queue and self._running < self.max_parallel:
+            run = self._queue[0][-1]
+            if self._preempting and not self._preempts(run):
+                break  # Held back until the preempting runs are done
+            heapq.heappop(self._queue)
+            if not run.future.set_running_or_notify_cancel():
+                if self._preempts(run):
+                    self._preempting -= 1
+                continue
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, run.start)
+            runs.append(run)
+        return runs
+
+    def _launch(self, runs):
+        # Outside the lock: a run that completes at once calls back into it
+        for run in runs:
+            logger.info(f"Starting run of '{run.product}' (priority {run.priority})")
+            started = self._clock()
+            try:
+                future = self._start(run.product, *run.args)
+            except Exception as e:
+                self._finished(run, started, error=e)
+                continue
+            future.add_done_callback(
+                lambda future, run=run, started=started: self._finished(
+                    run, started, future
+                )
+            )
+
+    def _finished(self, run, started, future=None, error=None):
+        duration = self._clock() - started
+        with self._lock:
+            self._running -= 1
+            if self._preempts(run):
+                self._preempting -= 1
+            # Charges the actual duration instead of the expected one
+            previous = self._costs.get(run.product, run.cost)
+            self._costs[run.product] = (
+                COST_SMOOTHING * duration + (1 - COST_SMOOTHING) * previous
+            )
+            self._finish_tags[run.product] = (
+                self._finish_tags.get(run.product, 0.0)
+                + (duration - run.cost) / run.weight
+            )
+            queued = self._next_runs()
+        if error is None:
+            error = CancelledError() if future.cancelled() else future.exception()
+        if error is not None:
+            run.future.set_exception(error)
+        else:
+            run.future.set_result(future.result())
+        self._launch(queued)
+
+    @property
+    def queued(self):
+        with self._lock:
+            return len(self._queue)
+
+    def shutdown(self, cancel_queued=False):
+        """Stops accepting runs; optionally cancels the ones not started yet."""
+        queued = []
+        with self._lock:
+            self._closed = True
+            if cancel_queued:
+                queued, self._queue = self._queue, []
+                self._preempting -= sum(
+                    1 for entry in queued if self._preempts(entry[-1])
+                )
+        for entry in queued:
+            entry[-1].future.cancel()
+
+
+def run_priority(settings, product_config, branch=None):
+    """Priority of a run: the product's, or hotfix_priority on a hotfix branch."""
+    settings = settings or {}
+    priority = int(product_config.get("priority", 0))
+    patterns = settings.get("hotfix_branches") or ()
+    if branch and any(fnmatch.fnmatchcase(branch, pattern) for pattern in patterns):
+        priority = max(
+            priority, int(settings.get("hotfix_priority", DEFAULT_HOTFIX_PRIORITY))
+        )
+    return priority
+
+
+def create_scheduler(config, start, max_parallel, history=None):
+    """
+    RunScheduler of the `scheduler` config section:
+
+        scheduler:
+          hotfix_branches: ["hotfix/*"]
+          hotfix_priority: 100
+          preempt_priority: 100   # holds back queued runs below it
+    """
+    settings = config.get("scheduler") or {}
+    preempt_priority = settings.get("preempt_priority")
+    if preempt_priority is None and settings.get("hotfix_branches"):
+        preempt_priority = settings.get("hotfix_priority", DEFAULT_HOTFIX_PRIORITY)
+    return RunScheduler(
+        start,
+        max_parallel,
+        preempt_priority=preempt_priority,
+        history=history,
+    )
@@ -0,0 +1,127 @@
+"""
+Streams one artifact to several deployment targets at once.
+
+The artifact is read from disk once; every chunk is handed to one bounded
+queue per target, so the reader runs at the pace of the slowest target
+(backpressure) and a single SHA-256 is computed for all of them.
+"""
+
+import hashlib
+import os
+import queue
+import threading
+import time
+from product_pipeline.utils.cancellation import current_token
+from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.tracing import span, wrap_context
+
+logger = get_logger("Tee")
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_QUEUE_DEPTH = 4
+
+_EOF = object()
+_ABORT = object()
+
+
+class TeeUploadError(Exception):
+    """Raised when one or more targets failed to receive a streamed artifact."""
+
+    def __init__(self, artifact, errors):
+        names = ", ".join(type(target).__name__ for target in errors)
+        super().__init__(f"Streaming '{artifact}' failed for: {names}")
+        self.artifact = artifact
+        self.errors = errors
+
+
+def _consume(target, product, artifact, size, chunk_queue, errors, durations):
+    finished = False
+    start = time.monotonic()
+
+    def chunks():
+        nonlocal finished
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is _EOF or chunk is _ABORT:
+                finished = True
+                if chunk is _ABORT:
+                    raise IOError(f"Reading '{artifact}' was aborted.")
+                return
+            yield chunk
+
+    try:
+        with span(
+            "target stream",
+            {"pipeline.target": type(target).__name__, "pipeline.artifact": artifact},
+        ):
+            target.upload_stream(product, artifact, size, chunks())
+    except Exception as e:
+        logger.error(f"{type(target).__name__} failed to receive '{artifact}': {e}")
+        errors[target] = e
+    finally:
+        if durations is not None:
+            durations[target] = time.monotonic() - start
+        # Keep draining so a failed or early-finishing target never stalls the reader
+        while not finished:
+            chunk = chunk_queue.get()
+            finished = chunk is _EOF or chunk is _ABORT
+
+
+def tee_upload(
+    product,
+    artifact,
+    targets,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    queue_depth=DEFAULT_QUEUE_DEPTH,
+    hash_stream=True,
+    durations=None,
+):
+    """
+    Streams `artifact` to every target's upload_stream() concurrently.
+    Returns the artifact's SHA-256 hex digest (None when hash_stream is False,
+    e.g. because a manifest already holds it); raises TeeUploadError if any
+    target failed (after all targets have finished). If given, `durations`
+    receives the upload time of each target.
+    """
+    size = os.path.getsize(artifact)
+    errors = {}
+    queues = []
+    workers = []
+    for target in targets:
+        chunk_queue = queue.Queue(maxsize=queue_depth)
+        worker = threading.Thread(
+            target=wrap_context(_consume),
+            args=(target, product, artifact, size, chunk_queue, errors, durations),
+            name=f"tee-{type(target).__name__}",
+            daemon=True,
+        )
+        worker.start()
+        queues.append(chunk_queue)
+        workers.append(worker)
+
+    digest = hashlib.sha256() if hash_stream else None
+    token = current_token()
+    completed = False
+    try:
+        with open(artifact, "rb") as f:
+            while True:
+                # A cancelled stage aborts the stream for every target
+                token.check()
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                if digest is not None:
+                    digest.update(chunk)
+                for chunk_queue in queues:
+                    # Blocks while the slowest target has queue_depth chunks pending
+                    chunk_queue.put(chunk)
+        completed = True
+    finally:
+        for chunk_queue in queues:
+            chunk_queue.put(_EOF if completed else _ABORT)
+        for worker in workers:
+            worker.join()
+
+    if errors:
+        raise TeeUploadError(artifact, errors)
+    return digest.hexdigest() if digest is not None else None
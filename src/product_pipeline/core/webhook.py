@@ -0,0 +1,347 @@
+"""
+Webhook trigger: runs pipelines on git push events.
+
+A small HTTP listener accepts push payloads (GitHub, Gitea and GitLab
+formats), maps the pushed repository to its products through an index of
+the configured `git_repository` URLs and enqueues a run of every product
+whose target branch was pushed. The first push starts a run at once; pushes
+arriving within the next `debounce` seconds are coalesced into one more run
+when the window closes. With a products.d directory, a ConfigWatcher keeps
+the index up to date as product files are added, edited or removed.
+"""
+
+import hashlib
+import hmac
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from product_pipeline.utils.config_store import DEFAULT_POLL_INTERVAL, ConfigWatcher
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Webhook")
+
+# Defaults for the optional `webhook` config section
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_DEBOUNCE = 5.0
+DEFAULT_MAX_PARALLEL = 4
+MAX_PAYLOAD_SIZE = 5 * 1024 * 1024
+
+
+def normalize_repository(url):
+    """
+    Canonical host/path of a git URL, so the https, ssh and scp-like forms of
+    one repository match: git@github.com:Org/A.git -> github.com/org/a
+    """
+    url = url.strip().lower()
+    url = re.sub(r"^[a-z+]+://", "", url)
+    url = re.sub(r"^[^@/]+@", "", url)
+    url = re.sub(r"^([^/:]+):(?!\d+/)", r"\1/", url)  # scp-like host:path
+    url = re.sub(r":\d+/", "/", url, count=1)  # port
+    return re.sub(r"(\.git)?/*$", "", url)
+
+
+class RepositoryIndex:
+    """
+    Products by normalized git_repository, with their target branch;
+    products are updated in place as their configuration changes.
+    """
+
+    def __init__(self, products=()):
+        self._lock = threading.Lock()
+        # product name -> (repository, target branch), and repository -> names
+        self._entries = {}
+        self._products = {}
+        for product in products:
+            self.update(product)
+
+    def update(self, product):
+        """Adds a product, or replaces its previous entry."""
+        name = product.get("product_name")
+        repository = product.get("git_repository")
+        with self._lock:
+            self._remove(name)
+            if repository:
+                entry = (
+                    normalize_repository(repository),
+                    product.get("default_target_branch"),
+                )
+                self._entries[name] = entry
+                self._products.setdefault(entry[0], []).append(name)
+
+    def remove(self, name):
+        with self._lock:
+            self._remove(name)
+
+    def _remove(self, name):
+        # Called with the lock held
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            names = self._products[entry[0]]
+            names.remove(name)
+            if not names:
+                del self._products[entry[0]]
+
+    def lookup(self, urls, branch):
+        """Names of the products of any of the urls whose target is branch."""
+        names = []
+        with self._lock:
+            for url in dict.fromkeys(normalize_repository(url) for url in urls):
+                for name in self._products.get(url, ()):
+                    if self._entries[name][1] == branch and name not in names:
+                        names.append(name)
+        return names
+
+
+def parse_push(payload):
+    """Returns (repository urls, branch) of a push payload; branch None for tags."""
+    ref = payload.get("ref") or ""
+    branch = ref[len("refs/heads/") :] if ref.startswith("refs/heads/") else None
+    urls = []
+    for section in ("repository", "project"):
+        info = payload.get(section) or {}
+        for key in (
+            "clone_url",
+            "ssh_url",
+            "git_url",
+            "html_url",
+            "git_http_url",
+            "git_ssh_url",
+            "url",
+        ):
+            if isinstance(info.get(key), str):
+                urls.append(info[key])
+    return urls, branch
+
+
+class RunQueue:
+    """
+    Runs runner(product, branch) on a thread pool, at most once per key while
+    it waits to start, debouncing repeated triggers of one key.
+    """
+
+    def __init__(self, runner, debounce=DEFAULT_DEBOUNCE, max_parallel=None):
+        self.runner = runner
+        self.debounce = debounce
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_parallel or DEFAULT_MAX_PARALLEL,
+            thread_name_prefix="webhook-run",
+        )
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._pending = set()
+        self._queued = set()
+
+    def trigger(self, product, branch):
+        """Enqueues a run now, or once the key's debounce window closes."""
+        key = (product, branch)
+        with self._lock:
+            if key in self._windows:
+                self._pending.add(key)
+                return False
+            self._open_window(key)
+            self._enqueue(key)
+            return True
+
+    def _open_window(self, key):
+        timer = threading.Timer(self.debounce, self._close_window, args=(key,))
+        timer.daemon = True
+        self._windows[key] = timer
+        timer.start()
+
+    def _close_window(self, key):
+        with self._lock:
+            if self._windows.pop(key, None) is None:
+                return  # Shut down
+            if key in self._pending:
+                # Pushes during the window: one more run, and a new window
+                self._pending.discard(key)
+                self._open_window(key)
+                self._enqueue(key)
+
+    def _enqueue(self, key):
+        if key in self._queued:
+            return
+        self._queued.add(key)
+        self._executor.submit(self._run, key)
+
+    def _run(self, key):
+        with self._lock:
+            self._queued.discard(key)
+        product, branch = key
+        try:
+            self.runner(product, branch)
+        except Exception as e:
+            logger.error(f"Triggered run of '{product}' on '{branch}' failed: {e}")
+
+    def shutdown(self):
+        with self._lock:
+            for timer in self._windows.values():
+                timer.cancel()
+            self._windows.clear()
+            self._pending.clear()
+        self._executor.shutdown()
+
+
+class _PushHandler(BaseHTTPRequestHandler):
+    server_version = "product-pipeline-webhook"
+
+    def do_POST(self):
+        listener = self.server.listener
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_PAYLOAD_SIZE:
+            return self._reply(413, {"error": "payload too large"})
+        body = self.rfile.read(length)
+        if not listener.verify(self.headers, body):
+            return self._reply(401, {"error": "invalid signature"})
+        if self.headers.get("X-GitHub-Event") == "ping":
+            return self._reply(200, {"status": "pong"})
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._reply(400, {"error": "invalid JSON"})
+        if not isinstance(payload, dict):
+            return self._reply(400, {"error": "invalid payload"})
+        self._reply(202, {"triggered": listener.handle_push(payload)})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class WebhookListener:
+    """HTTP listener turning push events into runs of a RunQueue."""
+
+    def __init__(self, index, queue, host=DEFAULT_HOST, port=DEFAULT_PORT, secret=None):
+        self.index = index
+        self.queue = queue
+        self.secret = secret
+        self.server = ThreadingHTTPServer((host, port), _PushHandler)
+        self.server.daemon_threads = True
+        self.server.listener = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def verify(self, headers, body):
+        """Checks GitHub/Gitea HMAC signatures or the GitLab token, if a secret is set."""
+        if not self.secret:
+            return True
+        token = headers.get("X-Gitlab-Token")
+        if token is not None:
+            return hmac.compare_digest(token.encode(), self.secret.encode())
+        signature = headers.get("X-Hub-Signature-256") or headers.get(
+            "X-Gitea-Signature"
+        )
+        if not signature:
+            return False
+        expected = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(
+            signature.split("=", 1)[-1].encode(), expected.encode()
+        )
+
+    def reload_products(self, config, names):
+        """Re-indexes the products of config whose products.d files changed."""
+        shadowed = set(config.duplicates())
+        for name in sorted(names):
+            if name in shadowed:
+                logger.error(
+                    f"Product '{name}' of products.d is already defined in "
+                    f"config.yaml; ignoring the file."
+                )
+                continue
+            product = config.find(name)
+            if product is None:
+                self.index.remove(name)
+            else:
+                self.index.update(product)
+            print(f"[Webhook] Reloaded configuration of '{name}'")
+
+    def handle_push(self, payload):
+        urls, branch = parse_push(payload)
+        if branch is None:
+            return []
+        products = self.index.lookup(urls, branch)
+        for product in products:
+            started = self.queue.trigger(product, branch)
+            print(
+                f"[Webhook] Push to '{branch}' of '{product}': "
+                f"{'run enqueued' if started else 'debounced'}"
+            )
+        return products
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="webhook", daemon=True
+        )
+        self._thread.start()
+        host, port = self.address[:2]
+        logger.info(f"Listening for push events on http://{host}:{port}/")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self.queue.shutdown()
+
+
+def create_listener(config, runner, secrets_provider=None):
+    """
+    WebhookListener of the `webhook` config section:
+
+        webhook:
+          host: 127.0.0.1
+          port: 8080
+          debounce: 5        # seconds coalescing pushes to one branch
+          max_parallel: 4    # runs at a time
+          secret_ref: webhook  # secrets entry with a `secret` key
+    """
+    settings = config.get("webhook") or {}
+    secret = None
+    if settings.get("secret_ref") and secrets_provider is not None:
+        secret = (secrets_provider.get(settings["secret_ref"]) or {}).get("secret")
+    queue = RunQueue(
+        runner,
+        debounce=settings.get("debounce", DEFAULT_DEBOUNCE),
+        max_parallel=settings.get("max_parallel"),
+    )
+    return WebhookListener(
+        RepositoryIndex(config.get("products")),
+        queue,
+        host=settings.get("host", DEFAULT_HOST),
+        port=settings.get("port", DEFAULT_PORT),
+        secret=secret,
+    )
+
+
+def watch_products(
+    config, listener, secrets_provider=None, interval=DEFAULT_POLL_INTERVAL
+):
+    """
+    Starts a ConfigWatcher re-indexing the listener's products as their
+    products.d files change; cached credentials are dropped too, so a new
+    credentials_ref resolves at once. None without a products.d directory.
+    """
+    store = getattr(config, "store", None)
+    if store is None:
+        return None
+
+    def on_change(names):
+        if secrets_provider is not None:
+            secrets_provider.invalidate()
+        listener.reload_products(config, names)
+
+    return ConfigWatcher(store, interval=interval, on_change=on_change).start()
@@ -0,0 +1,94 @@
+"""
+Worker pool running the pipelines of --all and --listen.
+
+Runs are threads of this process, so they share its runtime: pooled
+connections and TLS sessions, per-host rate and adaptive limits, the Nexus
+batcher and digests. The limits configured for a host hold for the whole
+fleet and one digest covers every product. Only CPU-bound stages leave the
+process, on the engine's process pool (engine.py), whose processes are
+forked from a forkserver that has already imported the pipeline and get the
+engine's resource limits.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from product_pipeline.utils.config import load_secrets_provider
+from product_pipeline.utils.helpers import (
+    create_product,
+    lookup_product_config,
+    run_pipeline,
+)
+from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.tracing import SpanContext, span
+
+logger = get_logger("Workers")
+
+
+class WorkerError(Exception):
+    pass
+
+
+class PipelineWorkerPool:
+    """
+    Runs product pipelines of config on threads of this process, at most
+    max_workers at a time. Each submit() returns a Future with the product's
+    timings. With flush_digests, each run sends the digests pending when it
+    ends; otherwise they wait for shutdown_runtime().
+    """
+
+    def __init__(
+        self, config, max_workers=None, secrets_provider=None, flush_digests=False
+    ):
+        self.config = config
+        self.secrets_provider = (
+            secrets_provider
+            if secrets_provider is not None
+            else load_secrets_provider(config)
+        )
+        self.flush_digests = flush_digests
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="pipeline"
+        )
+
+    def submit(self, product_name, target_branch=None, stages=None, traceparent=None):
+        return self._executor.submit(
+            run_product_pipeline,
+            self.config,
+            product_name,
+            target_branch,
+            stages,
+            traceparent,
+            self.secrets_provider,
+            self.flush_digests,
+        )
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+def run_product_pipeline(
+    config,
+    product_name,
+    target_branch=None,
+    stages=None,
+    traceparent=None,
+    secrets_provider=None,
+    flush_digests=False,
+):
+    """
+    Runs the pipeline of one product of config; the job of a worker.
+    traceparent links its spans to the caller's trace. Returns the product's
+    (kind, name, seconds, status) timings.
+    """
+    product_config = lookup_product_config(config, product_name)
+    if product_config is None:
+        raise WorkerError(f"Product '{product_name}' not found in configuration.")
+    with span(
+        "worker.run",
+        {"pipeline.product": product_name},
+        parent=SpanContext.from_traceparent(traceparent),
+    ):
+        product = create_product(product_config, target_branch, secrets_provider)
+        run_pipeline(config, product, stages, flush_digests=flush_digests)
+    return product.timings
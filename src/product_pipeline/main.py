@@ -7,18 +7,27 @@ as well as helper functions to create deployment targets and notification channe
 import os
 import sys
 import argparse
-import datetime
+import threading
 from product_pipeline.utils.logging import get_logger
-from product_pipeline.core.pipeline import Product, Pipeline
+from product_pipeline.core.changes import select_changed
+from product_pipeline.core.matrix import run_matrix
+from product_pipeline.core.scheduler import create_scheduler, run_priority
+from product_pipeline.core.webhook import create_listener, watch_products
+from product_pipeline.core.workers import PipelineWorkerPool
+from product_pipeline.stages.base import STAGE_REGISTRY
+from product_pipeline.utils.history import create_history
+from product_pipeline.utils.tracing import current_traceparent, span
 
 # Import configuration loader from utils_py directory
-from product_pipeline.utils.config import load_configuration
+from product_pipeline.utils.config import load_config_model, load_secrets_provider
 
 # Import helper functions from helpers
 from product_pipeline.utils.helpers import (
+    configure_runtime,
+    create_product,
     find_product_config,
-    init_deployment_targets,
-    init_notification_channels,
+    run_pipeline,
+    shutdown_runtime,
 )
 
 logger = get_logger("ProductPipeline")
@@ -48,64 +57,204 @@ def run_in_container():
         print("Running inside Docker container.")
 
 
+def create_run_scheduler(config, pool):
+    """RunScheduler starting each run on a worker thread of the pool."""
+    return create_scheduler(
+        config,
+        pool.submit,
+        pool.max_workers,
+        history=create_history(config.get("history")),
+    )
+
+
+def schedule_run(config, scheduler, product_config, target_branch, *args):
+    """Queues a run of the product by its priority and fair-share weight."""
+    branch = target_branch or product_config.get("default_target_branch")
+    return scheduler.submit(
+        product_config.get("product_name"),
+        target_branch,
+        *args,
+        priority=run_priority(config.get("scheduler"), product_config, branch),
+        weight=float(product_config.get("weight", 1.0)),
+    )
+
+
+def run_all_products(config, target_branch, stages, products=None):
+    """
+    Runs every configured product (or `products`) on the worker pool, in the
+    order of the scheduler (priority, then fair share). Digests are left
+    pending for shutdown_runtime(), which sends one for the whole fleet.
+    """
+    settings = config.get("workers") or {}
+    pool = PipelineWorkerPool(config, max_workers=settings.get("max_workers"))
+    scheduler = create_run_scheduler(config, pool)
+    futures = {
+        product.get("product_name"): schedule_run(
+            config, scheduler, product, target_branch, stages, current_traceparent()
+        )
+        for product in (config.get("products") if products is None else products)
+    }
+    failed = []
+    for name, future in futures.items():
+        try:
+            future.result()
+            print(f"[Workers] Pipeline of '{name}' finished.")
+        except Exception as e:
+            logger.error(f"Pipeline of '{name}' failed: {e}")
+            failed.append(name)
+    scheduler.shutdown()
+    pool.shutdown()
+    if failed:
+        print(f"Error: Pipelines failed for: {', '.join(failed)}")
+        sys.exit(1)
+
+
+def listen(config, stages):
+    """
+    Serves push webhooks until interrupted; runs are scheduled by priority
+    and fair share on the worker pool.
+    """
+    settings = config.get("workers") or {}
+    secrets_provider = load_secrets_provider(config)
+    pool = PipelineWorkerPool(
+        config,
+        max_workers=settings.get("max_workers"),
+        secrets_provider=secrets_provider,
+        flush_digests=True,
+    )
+    scheduler = create_run_scheduler(config, pool)
+
+    def runner(product_name, branch):
+        product_config = find_product_config(config, product_name)
+        schedule_run(config, scheduler, product_config, branch, stages).result()
+        print(f"[Webhook] Pipeline of '{product_name}' on '{branch}' finished.")
+
+    listener = create_listener(config, runner, secrets_provider)
+    listener.start()
+    # Edits of products.d files apply to the next push, without a restart
+    watcher = watch_products(config, listener, secrets_provider)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Runs still queued are dropped; running ones finish first
+        scheduler.shutdown(cancel_queued=True)
+        if watcher is not None:
+            watcher.stop()
+        listener.stop()
+        pool.shutdown()
+
+
 def main():
     run_in_container()
 
-    config = load_configuration()
+    # Validated, immutable view of config.yaml (products.d files load on demand)
+    config = load_config_model()
+    configure_runtime(config)
 
     parser = argparse.ArgumentParser(description="Run Product Delivery Pipeline")
-    parser.add_argument(
-        "--repo_name", required=True, help="Product name as specified in config.yaml"
+    selection = parser.add_mutually_exclusive_group(required=True)
+    selection.add_argument(
+        "--repo_name", help="Product name as specified in config.yaml"
     )
-    parser.add_argument(
+    selection.add_argument(
+        "--listen",
+        action="store_true",
+        help="Run pipelines on git push events received by the webhook listener",
+    )
+    selection.add_argument(
+        "--all",
+        action="store_true",
+        help="Run every configured product on the worker pool",
+    )
+    branch_selection = parser.add_mutually_exclusive_group()
+    branch_selection.add_argument(
         "--target_branch", help="Target branch for deployment (overrides config)"
     )
+    branch_selection.add_argument(
+        "--branches",
+        help="Comma-separated branches run concurrently as a matrix (with --repo_name)",
+    )
+    parser.add_argument(
+        "--changed_only",
+        action="store_true",
+        help="Skip products whose target branch has not moved since their last successful run",
+    )
     parser.add_argument(
         "--stages",
-        help="Comma-separated list of pipeline stages (e.g. build,deploy,notify)",
+        help="Comma-separated list of pipeline stages (e.g. clone,build,test,compress,deploy,notify)",
     )
     args = parser.parse_args()
 
-    # Find product configuration by name using helper function
-    product_config = find_product_config(config, args.repo_name)
-
-    repo_name = product_config.get("product_name")
-    git_repository = product_config.get("git_repository")
-    default_target_branch = product_config.get("default_target_branch")
-    target_branch = args.target_branch if args.target_branch else default_target_branch
-
-    # Initialize deployment targets and notification channels using helper functions
-    deploy_targets = init_deployment_targets(product_config)
-    notification_channels = init_notification_channels(product_config)
-
-    scheduled_time = datetime.datetime.now()
-    valid_stages = ["build", "deploy", "notify"]
-    product = Product(
-        name=repo_name,
-        git_repository=git_repository,
-        scheduled_time=scheduled_time,
-        target_branch=target_branch,
-        deploy_targets=deploy_targets,
-        notification_channels=notification_channels,
-        valid_stages=valid_stages,
-    )
-
-    print(f"[DEBUG] {product.__dict__}")
-
     # If the --stages argument is provided, parse it into a list of stages and validate them
     stages = None
     if args.stages:
         stages = [s.strip() for s in args.stages.split(",") if s.strip()]
         for stage in stages:
-            if stage not in valid_stages:
+            if stage not in STAGE_REGISTRY:
                 print(
-                    f"Error: Stage '{stage}' is not valid. Valid stages are: {valid_stages}"
+                    f"Error: Stage '{stage}' is not valid. Valid stages are: {list(STAGE_REGISTRY)}"
                 )
                 sys.exit(1)
 
+    if args.listen:
+        try:
+            listen(config, stages)
+        finally:
+            shutdown_runtime()
+        return
+
+    if args.all:
+        if args.branches:
+            print("Error: --branches runs the matrix of a single --repo_name.")
+            shutdown_runtime()
+            sys.exit(1)
+        try:
+            products = config.get("products")
+            if args.changed_only:
+                products = select_changed(config, products, args.target_branch)
+            with span("fleet.run", {"pipeline.products": len(products)}):
+                run_all_products(config, args.target_branch, stages, products)
+        finally:
+            shutdown_runtime()
+        return
+
+    # Find product configuration by name using helper function
+    product_config = find_product_config(config, args.repo_name)
+
+    if (
+        args.changed_only
+        and not args.branches
+        and not select_changed(config, [product_config], args.target_branch)
+    ):
+        shutdown_runtime()
+        return
+
+    if args.branches:
+        branches = [b.strip() for b in args.branches.split(",") if b.strip()]
+        try:
+            results = run_matrix(
+                config, product_config, branches, stages, load_secrets_provider(config)
+            )
+        finally:
+            shutdown_runtime()
+        if any(result.status != "success" for result in results):
+            sys.exit(1)
+        return
+
+    # Deployment targets resolve their credentials lazily through the provider
+    product = create_product(
+        product_config, args.target_branch, load_secrets_provider(config)
+    )
+
+    print(f"[DEBUG] {product!r}")
+
     # Run the main pipeline (build, deploy, notify)
-    pipeline = Pipeline(product, stages)
-    pipeline.run()
+    try:
+        run_pipeline(config, product, stages)
+    finally:
+        shutdown_runtime()
 
 
 if __name__ == "__main__":
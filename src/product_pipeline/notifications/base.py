@@ -1,8 +1,34 @@
 from abc import ABC, abstractmethod
+from product_pipeline.utils.ratelimit import get_rate_limiter
 
 
 class NotificationChannel(ABC):
+    # Channel type, selects the `rate_limits` entry in config.yaml
+    kind = None
+
+    def __init__(self, config=None):
+        self.config = config or {}
+
     @abstractmethod
     def notify(self, product):
         """Method for sending a notification about the product."""
         pass
+
+    def limit(self, host):
+        """Context manager holding a call within the host's rate limit."""
+        return get_rate_limiter().limit(self.kind, host)
+
+    @property
+    def digest(self):
+        """Whether notifications are coalesced into digests (see digest.py)."""
+        return (self.config.get("digest") or {}).get("enabled", False)
+
+    @property
+    def destination(self):
+        """Hashable identity of the recipients; digests are grouped by it."""
+        return None
+
+    @abstractmethod
+    def send_digest(self, lines):
+        """Sends one message with a status line per product."""
+        pass
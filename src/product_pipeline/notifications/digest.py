@@ -0,0 +1,88 @@
+"""
+Digest notifications.
+
+Channels with `digest.enabled` hand their notifications to a process-wide
+collector instead of sending them right away. The collector groups them per
+(channel type, destination) and sends one consolidated message with a status
+line per product, either after `digest.window` seconds or when the run ends
+(flush_all), so N products notifying the same webhook or SMTP recipients
+cost one call instead of N.
+"""
+
+import threading
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Digest")
+
+
+def product_status(product):
+    """Status of a product so far, from the timings recorded by its pipeline."""
+    timings = getattr(product, "timings", None) or []
+    return "failed" if any(t[3] == "failed" for t in timings) else "success"
+
+
+def status_line(product):
+    return f"{product.name} ({product.target_branch}): {product_status(product)}"
+
+
+class _PendingDigest:
+    def __init__(self, channel):
+        # The first channel of a digest sends it for everybody
+        self.channel = channel
+        self.lines = []
+        self.timer = None
+
+
+class DigestCollector:
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.messages_sent = 0
+
+    def submit(self, channel, product):
+        settings = channel.config.get("digest") or {}
+        window = settings.get("window")
+        key = (channel.kind, channel.destination)
+        with self._lock:
+            digest = self._pending.get(key)
+            if digest is None:
+                digest = self._pending[key] = _PendingDigest(channel)
+                # Without a window the digest covers the whole run
+                if window:
+                    digest.timer = threading.Timer(
+                        window, self._flush, args=(key, digest)
+                    )
+                    digest.timer.daemon = True
+                    digest.timer.start()
+            digest.lines.append(status_line(product))
+
+    def flush_all(self):
+        with self._lock:
+            pending = list(self._pending.items())
+        for key, digest in pending:
+            self._flush(key, digest)
+
+    def _flush(self, key, digest):
+        with self._lock:
+            # The timer and the end of the run may race; only one wins
+            if self._pending.get(key) is not digest:
+                return
+            del self._pending[key]
+        if digest.timer is not None:
+            digest.timer.cancel()
+        self.messages_sent += 1
+        try:
+            digest.channel.send_digest(digest.lines)
+        except Exception as e:
+            logger.error(
+                f"Failed to send {digest.channel.kind} digest of "
+                f"{len(digest.lines)} product(s): {e}"
+            )
+
+
+_collector = DigestCollector()
+
+
+def get_digest_collector():
+    """Returns the process-wide collector shared by all notification channels."""
+    return _collector
@@ -1,29 +1,92 @@
+import smtplib
+import ssl
+from email.message import EmailMessage
 from product_pipeline.notifications.base import NotificationChannel
+from product_pipeline.notifications.digest import get_digest_collector
+from product_pipeline.utils.cancellation import CancelledError, current_token
 from product_pipeline.utils.logging import get_logger
 
 logger = get_logger("EmailNotification")
 
+DEFAULT_SMTP_TIMEOUT = 30
+DEFAULT_SENDER = "product-pipeline@localhost"
+
 
 class EmailNotification(NotificationChannel):
-    def __init__(self, config: dict):
-        self.config = config
+    kind = "email"
+
+    def __init__(self, config: dict, secrets_provider=None):
+        super().__init__(config)
+        self.secrets_provider = secrets_provider
+
+    @property
+    def credentials(self):
+        # SMTP login of the `credentials_ref` secrets entry, if any
+        ref = self.config.get("credentials_ref")
+        if not ref or self.secrets_provider is None:
+            return None
+        return self.secrets_provider.get(ref)
 
     def notify(self, product):
         msg = f"Sending email notification for product '{product.name}' with config {self.config}."
         logger.info(msg)
         print(f"[Email] {msg}")
 
-        # Simulate SMTP connection for testing
-        import smtplib
+        if self.digest:
+            get_digest_collector().submit(self, product)
+            return
+        self.send(
+            f"Product {product.name} processed",
+            f"Product {product.name} has been processed",
+        )
+
+    @property
+    def destination(self):
+        return (
+            self.config.get("smtp_server"),
+            self.config.get("port", 587),
+            tuple(self.config.get("recipients") or ()),
+        )
+
+    def send_digest(self, lines):
+        print(f"[Email] Sending digest of {len(lines)} product(s).")
+        self.send(
+            f"{len(lines)} product(s) processed",
+            "\n".join([f"{len(lines)} product(s) processed:"] + lines),
+        )
+
+    def send(self, subject, body):
+        recipients = list(self.config.get("recipients") or ())
+        if not recipients:
+            logger.warning("No recipients configured, email not sent.")
+            return
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = self.config.get("sender", DEFAULT_SENDER)
+        message["To"] = ", ".join(recipients)
+        message.set_content(body)
 
+        token = current_token()
         try:
-            with smtplib.SMTP(
-                self.config.get("smtp_server"), self.config.get("port", 587)
-            ) as server:
-                # In a real implementation, you would send the email here
-                # server.starttls()
-                # server.login(username, password)
-                # server.send_message(message)
-                pass
+            token.check()
+            with self.limit(self.config.get("smtp_server")):
+                with smtplib.SMTP(
+                    self.config.get("smtp_server"),
+                    self.config.get("port", 587),
+                    timeout=token.timeout(
+                        self.config.get("timeout", DEFAULT_SMTP_TIMEOUT)
+                    ),
+                ) as server:
+                    if self.config.get("starttls", True):
+                        server.starttls(context=ssl.create_default_context())
+                    credentials = self.credentials
+                    if credentials:
+                        server.login(
+                            credentials.get("username", credentials.get("user")),
+                            credentials.get("password", ""),
+                        )
+                    server.send_message(message)
+        except CancelledError:
+            raise  # Deadline or shutdown: fail the stage, don't log and go on
         except Exception as e:
             logger.error(f"Failed to send email: {e}")
@@ -1,26 +1,55 @@
+import json
+from urllib.parse import urlsplit
 from product_pipeline.notifications.base import NotificationChannel
+from product_pipeline.notifications.digest import get_digest_collector
+from product_pipeline.utils.cancellation import CancelledError, current_token
 from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.tracing import inject
+from product_pipeline.utils.transport import get_transport
 
 logger = get_logger("SlackNotification")
 
 
 class SlackNotification(NotificationChannel):
+    kind = "slack"
+
     def __init__(self, config: dict):
-        self.config = config
+        super().__init__(config)
 
     def notify(self, product):
         msg = f"Sending Slack notification for product '{product.name}' with config {self.config}."
         logger.info(msg)
         print(f"[Slack] {msg}")
 
-        # Simulate HTTP request for testing
-        import requests
+        if self.digest:
+            get_digest_collector().submit(self, product)
+            return
+        self.post(f"Product {product.name} has been processed")
+
+    @property
+    def destination(self):
+        return self.config.get("webhook_url")
+
+    def send_digest(self, lines):
+        print(f"[Slack] Sending digest of {len(lines)} product(s).")
+        self.post("\n".join([f"{len(lines)} product(s) processed:"] + lines))
 
+    def post(self, text):
+        webhook_url = self.config.get("webhook_url")
+        token = current_token()
         try:
-            response = requests.post(
-                self.config.get("webhook_url"),
-                json={"text": f"Product {product.name} has been processed"},
-            )
+            token.check()
+            # Webhook calls share the pooled keep-alive transport
+            with self.limit(urlsplit(webhook_url).hostname):
+                response = get_transport().request(
+                    "POST",
+                    webhook_url,
+                    body=json.dumps({"text": text}).encode("utf-8"),
+                    headers=inject({"Content-Type": "application/json"}),
+                    timeout=token.remaining(),
+                )
             response.raise_for_status()
+        except CancelledError:
+            raise  # Deadline or shutdown: fail the stage, don't log and go on
         except Exception as e:
             logger.error(f"Failed to send Slack notification: {e}")
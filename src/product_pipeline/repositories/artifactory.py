@@ -1,15 +1,30 @@
-from product_pipeline.repositories.base import DeploymentTarget
+from product_pipeline.repositories.base import StreamingTarget
 from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.transport import basic_auth_header
 
 logger = get_logger("Artifactory")
 
 
-class ArtifactoryTarget(DeploymentTarget):
-    def __init__(self, credentials_ref=None, credentials=None):
-        self.credentials_ref = credentials_ref
-        self.credentials = credentials
+class ArtifactoryTarget(StreamingTarget):
+    kind = "artifactory"
 
     def deploy(self, product):
         msg = f"Deploying product '{product.name}' to Artifactory (credentials: {self.credentials})."
         logger.info(msg)
         print(f"[Artifactory] {msg}")
+        if not self.url:
+            return
+        for artifact in getattr(product, "artifacts", ()):
+            self.upload(product, artifact)
+
+    def upload_stream(self, product, artifact, size, chunks):
+        repository = self.config.get("repository", "generic-local")
+        headers = basic_auth_header(self.credentials)
+        headers["Content-Length"] = str(size)
+        checksum = getattr(product, "checksums", {}).get(artifact)
+        if checksum:
+            # Lets Artifactory verify the upload without hashing it ourselves
+            headers["X-Checksum-Sha256"] = checksum
+        url = f"{self.url}/{repository}/{self.artifact_path(product, artifact)}"
+        self.request("PUT", url, body=chunks, headers=headers)
+        logger.info(f"Uploaded '{artifact}' to {url}")
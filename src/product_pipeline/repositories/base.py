@@ -1,8 +1,100 @@
-from abc import ABC, abstractmethod
-
-
-class DeploymentTarget(ABC):
-    @abstractmethod
-    def deploy(self, product):
-        """Method for deploying the product to the target repository."""
-        pass
+import os
+from abc import ABC, abstractmethod
+from urllib.parse import urlsplit
+from product_pipeline.utils.cancellation import current_token
+from product_pipeline.utils.ratelimit import get_rate_limiter
+from product_pipeline.utils.tracing import inject, span
+from product_pipeline.utils.transport import TransportError, get_transport
+
+
+class DeploymentTarget(ABC):
+    # Repository type, selects the `rate_limits` entry in config.yaml
+    kind = None
+
+    def __init__(
+        self, credentials_ref=None, credentials=None, secrets_provider=None, config=None
+    ):
+        self.credentials_ref = credentials_ref
+        self._credentials = credentials
+        self.secrets_provider = secrets_provider
+        # Repository settings from config.yaml (url, repository, bucket, ...)
+        self.config = config or {}
+
+    @property
+    def credentials(self):
+        # Explicit credentials win; otherwise resolve credentials_ref on first use
+        if (
+            self._credentials is None
+            and self.secrets_provider is not None
+            and self.credentials_ref
+        ):
+            return self.secrets_provider.get(self.credentials_ref)
+        return self._credentials
+
+    @property
+    def url(self):
+        url = self.config.get("url")
+        return url.rstrip("/") if url else None
+
+    def artifact_path(self, product, artifact):
+        """Remote path of an artifact: <product>/<branch>/<file name>."""
+        return f"{product.name}/{product.target_branch}/{os.path.basename(artifact)}"
+
+    def can_stream(self):
+        """Whether artifacts can be fed to upload_stream() from a shared read."""
+        return False
+
+    def request(self, method, url, body=None, headers=None):
+        """
+        Sends a request through the shared, pooled HTTP transport, within the
+        rate limit of the url's host and the deadline of the current stage.
+        """
+        token = current_token()
+        token.check()
+        if body is not None and not isinstance(body, (bytes, str, bytearray)):
+            # Chunked bodies stop between chunks once the stage is cancelled;
+            # file bodies are bounded by the socket timeout
+            if not hasattr(body, "read"):
+                body = token.guard(body)
+        with span(f"HTTP {method}", {"http.method": method, "http.url": url}):
+            headers = inject(dict(headers or {}))
+            with get_rate_limiter().limit(self.kind, urlsplit(url).hostname) as call:
+                try:
+                    response = get_transport().request(
+                        method,
+                        url,
+                        body=body,
+                        headers=headers,
+                        timeout=token.remaining(),
+                    )
+                except (OSError, TransportError):
+                    # A socket timeout at the deadline is the deadline's doing
+                    token.check()
+                    raise
+                # 429s, 5xx and latency drive the host's adaptive concurrency
+                call.status = response.status
+            return response.raise_for_status()
+
+    @abstractmethod
+    def deploy(self, product):
+        """Method for deploying the product to the target repository."""
+        pass
+
+
+class StreamingTarget(DeploymentTarget):
+    """
+    Target receiving artifacts as streams of chunks, so the deploy stage can
+    read each artifact once for all such targets (core/tee.py).
+    """
+
+    def can_stream(self):
+        return bool(self.url)
+
+    def upload(self, product, artifact):
+        with open(artifact, "rb") as f:
+            self.upload_stream(product, artifact, os.path.getsize(artifact), f)
+
+    @abstractmethod
+    def upload_stream(self, product, artifact, size, chunks):
+        """Uploads `size` bytes of `artifact` read from an iterable of chunks."""
+        pass
@@ -1,15 +1,178 @@
-from product_pipeline.repositories.base import DeploymentTarget
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from product_pipeline.repositories.base import StreamingTarget
+from product_pipeline.utils.cancellation import current_token
 from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.transport import basic_auth_header, encode_multipart
 
 logger = get_logger("Nexus")
 
+# Defaults for the optional `batch` section of a nexus repository config
+DEFAULT_BATCH_MAX_ITEMS = 20
+DEFAULT_BATCH_WINDOW = 0.5
 
-class NexusTarget(DeploymentTarget):
-    def __init__(self, credentials_ref=None, credentials=None):
-        self.credentials_ref = credentials_ref
-        self.credentials = credentials
+
+class NexusTarget(StreamingTarget):
+    kind = "nexus"
 
     def deploy(self, product):
         msg = f"Deploying product '{product.name}' to Nexus (credentials: {self.credentials})."
         logger.info(msg)
         print(f"[Nexus] {msg}")
+        if not self.url:
+            return
+        artifacts = list(getattr(product, "artifacts", ()))
+        if not artifacts:
+            return
+        if self.batching:
+            # Blocks until the shared batch is flushed; raises this product's error
+            token = current_token()
+            future = get_nexus_batcher().submit(self, product, artifacts)
+            try:
+                future.result(timeout=token.remaining())
+            except FutureTimeoutError:
+                token.check()
+                raise
+        else:
+            self.upload_component(product, artifacts)
+
+    @property
+    def batching(self):
+        return (self.config.get("batch") or {}).get("enabled", False)
+
+    def can_stream(self):
+        # Batched uploads are collected per product, so they read their own files
+        return bool(self.url) and not self.batching
+
+    def upload_stream(self, product, artifact, size, chunks):
+        self.upload_assets(
+            f"/{product.name}/{product.target_branch}",
+            [(os.path.basename(artifact), (size, chunks))],
+        )
+
+    @property
+    def repository(self):
+        return self.config.get("repository", "raw-hosted")
+
+    def upload_component(self, product, artifacts):
+        """Uploads the product's artifacts as the assets of one raw component."""
+        self.upload_assets(
+            f"/{product.name}/{product.target_branch}",
+            [(os.path.basename(artifact), artifact) for artifact in artifacts],
+        )
+
+    def upload_assets(self, directory, assets):
+        """
+        Uploads (remote file name, source) pairs in one multipart request;
+        source is a local path or a (size, chunks) stream.
+        """
+        fields = {"raw.directory": directory}
+        files = []
+        for index, (filename, source) in enumerate(assets, start=1):
+            fields[f"raw.asset{index}.filename"] = filename
+            files.append((f"raw.asset{index}", os.path.basename(filename), source))
+        content_type, length, body = encode_multipart(fields, files)
+        headers = basic_auth_header(self.credentials)
+        headers.update({"Content-Type": content_type, "Content-Length": str(length)})
+        url = f"{self.url}/service/rest/v1/components?repository={self.repository}"
+        self.request("POST", url, body=body, headers=headers)
+        logger.info(f"Uploaded {len(assets)} asset(s) to Nexus '{self.repository}'")
+
+
+class _PendingBatch:
+    def __init__(self, target):
+        # The first target of a batch supplies url, repository and credentials
+        self.target = target
+        self.items = []
+        self.timer = None
+
+
+class NexusBatcher:
+    """
+    Collects uploads for the same (Nexus url, repository, credentials) from
+    concurrent pipelines and submits them as one multi-asset component once
+    `max_items` products are pending or `window` seconds have passed.
+    Each submission gets its own Future carrying that product's result.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+
+    def submit(self, target, product, artifacts):
+        batch_config = target.config.get("batch") or {}
+        max_items = batch_config.get("max_items", DEFAULT_BATCH_MAX_ITEMS)
+        window = batch_config.get("window", DEFAULT_BATCH_WINDOW)
+        key = (target.url, target.repository, target.credentials_ref)
+        future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = _PendingBatch(target)
+                batch.timer = threading.Timer(window, self._flush, args=(key, batch))
+                batch.timer.daemon = True
+                batch.timer.start()
+            batch.items.append((product, list(artifacts), future))
+            full = len(batch.items) >= max_items
+        if full:
+            self._flush(key, batch)
+        return future
+
+    def flush_all(self):
+        with self._lock:
+            pending = list(self._pending.items())
+        for key, batch in pending:
+            self._flush(key, batch)
+
+    def _count_request(self):
+        # Flushes run on timer threads and on submitting threads alike
+        with self._lock:
+            self.requests_sent += 1
+
+    def _flush(self, key, batch):
+        with self._lock:
+            # The timer and a size-triggered flush may race; only one wins
+            if self._pending.get(key) is not batch:
+                return
+            del self._pending[key]
+        batch.timer.cancel()
+
+        assets = []
+        for product, artifacts, _ in batch.items:
+            prefix = f"{product.name}/{product.target_branch}"
+            assets.extend(
+                (f"{prefix}/{os.path.basename(artifact)}", artifact)
+                for artifact in artifacts
+            )
+        try:
+            self._count_request()
+            batch.target.upload_assets("/", assets)
+        except Exception as e:
+            if len(batch.items) == 1:
+                batch.items[0][2].set_exception(e)
+                return
+            # Retry individually so each product learns its own outcome
+            logger.warning(
+                f"Batch upload of {len(batch.items)} products failed ({e}); "
+                "retrying per product."
+            )
+            for product, artifacts, future in batch.items:
+                try:
+                    self._count_request()
+                    batch.target.upload_component(product, artifacts)
+                    future.set_result(True)
+                except Exception as item_error:
+                    future.set_exception(item_error)
+            return
+        for _, _, future in batch.items:
+            future.set_result(True)
+
+
+_batcher = NexusBatcher()
+
+
+def get_nexus_batcher():
+    """Returns the process-wide batcher shared by all NexusTarget instances."""
+    return _batcher
@@ -1,15 +1,90 @@
-from product_pipeline.repositories.base import DeploymentTarget
+import datetime
+import hashlib
+import hmac
+from urllib.parse import quote, urlsplit
+from product_pipeline.repositories.base import StreamingTarget
 from product_pipeline.utils.logging import get_logger
 
 logger = get_logger("S3")
 
+# Streamed bodies are not hashed up front for the signature
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
 
-class S3Target(DeploymentTarget):
-    def __init__(self, credentials_ref=None, credentials=None):
-        self.credentials_ref = credentials_ref
-        self.credentials = credentials
+
+def _hmac(key, msg):
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+class S3Target(StreamingTarget):
+    kind = "s3"
 
     def deploy(self, product):
         msg = f"Deploying product '{product.name}' to S3 (credentials: {self.credentials})."
         logger.info(msg)
         print(f"[S3] {msg}")
+        if not self.url:
+            return
+        for artifact in getattr(product, "artifacts", ()):
+            self.upload(product, artifact)
+
+    def object_url(self, product, artifact):
+        bucket = self.config.get("bucket", "artifacts")
+        prefix = self.config.get("prefix", "")
+        key = quote(f"{prefix}{self.artifact_path(product, artifact)}", safe="/-_.~")
+        return f"{self.url}/{bucket}/{key}"
+
+    def upload_stream(self, product, artifact, size, chunks):
+        url = self.object_url(product, artifact)
+        # A manifest checksum makes the payload signed instead of UNSIGNED-PAYLOAD
+        payload_hash = getattr(product, "checksums", {}).get(artifact, UNSIGNED_PAYLOAD)
+        headers = self.sign("PUT", url, payload_hash=payload_hash)
+        headers["Content-Length"] = str(size)
+        self.request("PUT", url, body=chunks, headers=headers)
+        logger.info(f"Uploaded '{artifact}' to {url}")
+
+    def sign(self, method, url, now=None, payload_hash=UNSIGNED_PAYLOAD):
+        """Returns AWS Signature Version 4 headers for a path-style request."""
+        credentials = self.credentials or {}
+        region = self.config.get("region", "us-east-1")
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = now.strftime("%Y%m%d")
+        parts = urlsplit(url)
+
+        headers = {
+            "host": parts.netloc,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+        }
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join(
+            [
+                method,
+                parts.path or "/",
+                parts.query,
+                "".join(f"{k}:{headers[k]}\n" for k in sorted(headers)),
+                signed_headers,
+                payload_hash,
+            ]
+        )
+        scope = f"{date}/{region}/s3/aws4_request"
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+            ]
+        )
+        key = ("AWS4" + credentials.get("secret_key", "")).encode("utf-8")
+        for part in (date, region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        signature = hmac.new(
+            key, string_to_sign.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+        headers["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={credentials.get('access_key', '')}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        headers["Host"] = headers.pop("host")
+        return headers
@@ -0,0 +1,82 @@
+import asyncio
+import importlib
+from abc import ABC, abstractmethod
+
+# Resource classes a stage can declare; the engine picks an executor from it
+CPU_BOUND = "cpu"
+IO_BOUND = "io"
+SUBPROCESS_BOUND = "subprocess"
+RESOURCE_CLASSES = (CPU_BOUND, IO_BOUND, SUBPROCESS_BOUND)
+
+# Registered stage classes by name
+STAGE_REGISTRY = {}
+
+
+class Stage(ABC):
+    """
+    A pipeline stage plugin. `resource_class` tells the engine where to run it:
+    CPU-bound stages go to a process pool, I/O-bound stages to a thread pool
+    and subprocess-bound stages to an asyncio event loop.
+    """
+
+    name = None
+    resource_class = IO_BOUND
+
+    @abstractmethod
+    def run(self, product):
+        """Method for running the stage for the product in the current thread."""
+        pass
+
+    async def run_async(self, product):
+        """Coroutine used on the event loop; defaults to run() in a thread."""
+        await asyncio.to_thread(self.run, product)
+
+
+class CPUStage(Stage):
+    """
+    A CPU-bound stage. Its work() must be a picklable function of a
+    picklable payload, since it runs in another process; payload() and
+    apply() run in the pipeline's own process.
+    """
+
+    resource_class = CPU_BOUND
+
+    @abstractmethod
+    def payload(self, product):
+        """Method for extracting the (picklable) input of work() from the product."""
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def work(payload):
+        """Method doing the CPU-heavy part; returns a picklable result."""
+        pass
+
+    @abstractmethod
+    def apply(self, product, result):
+        """Method for storing the result of work() on the product."""
+        pass
+
+    def run(self, product):
+        self.apply(product, self.work(self.payload(product)))
+
+
+def register_stage(stage_cls):
+    """Class decorator registering a Stage subclass under its name."""
+    if stage_cls.resource_class not in RESOURCE_CLASSES:
+        raise ValueError(
+            f"Stage '{stage_cls.name}' has unknown resource class "
+            f"'{stage_cls.resource_class}'."
+        )
+    STAGE_REGISTRY[stage_cls.name] = stage_cls
+    return stage_cls
+
+
+def get_stage(name):
+    return STAGE_REGISTRY[name]()
+
+
+def load_stage_plugins(modules):
+    """Imports plugin modules, which register their stages on import."""
+    for module in modules or []:
+        importlib.import_module(module)
@@ -0,0 +1,175 @@
+"""
+Build stage: runs the product's build commands as subprocesses.
+
+Command output is streamed line by line to size-rotated log files; only the
+last `tail_lines` lines are kept in memory (a ring buffer) for the error
+report of a failed command, so chatty builds use constant memory.
+"""
+
+import os
+import shlex
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from product_pipeline.stages.base import SUBPROCESS_BOUND, Stage, register_stage
+from product_pipeline.utils.cancellation import current_token
+from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.tracing import wrap_context
+
+logger = get_logger("Build")
+
+DEFAULT_LOG_DIR = "build/logs"
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_BACKUPS = 3
+DEFAULT_TAIL_LINES = 200
+# Longest line kept as one unit; longer output is split
+MAX_LINE_BYTES = 64 * 1024
+
+
+class BuildError(Exception):
+    def __init__(self, command, returncode, tail, log_path):
+        super().__init__(
+            f"Build command '{command}' failed with exit code {returncode} "
+            f"(log: {log_path}):\n" + "".join(tail)
+        )
+        self.command = command
+        self.returncode = returncode
+        self.tail = tail
+        self.log_path = log_path
+
+
+class RotatingLog:
+    """Append-only log file rotated to .1 ... .N once it exceeds max_bytes."""
+
+    def __init__(
+        self, path, max_bytes=DEFAULT_LOG_MAX_BYTES, backups=DEFAULT_LOG_BACKUPS
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb")
+        self._size = 0
+
+    def write(self, data):
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "wb")
+        self._size = 0
+
+    def close(self):
+        self._file.close()
+
+
+def run_command(command, cwd, env, log_path, settings):
+    """
+    Runs one command, streaming its output to a rotating log. Returns the
+    last output lines; raises BuildError if the command fails.
+    """
+    token = current_token()
+    token.check()
+    tail = deque(maxlen=settings.get("tail_lines", DEFAULT_TAIL_LINES))
+    log = RotatingLog(
+        log_path,
+        max_bytes=settings.get("log_max_bytes", DEFAULT_LOG_MAX_BYTES),
+        backups=settings.get("log_backups", DEFAULT_LOG_BACKUPS),
+    )
+    try:
+        process = subprocess.Popen(
+            shlex.split(command),
+            cwd=cwd,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        # Killing the command at the deadline also ends the read loop
+        with process, token.on_cancel(process.kill):
+            for line in iter(lambda: process.stdout.readline(MAX_LINE_BYTES), b""):
+                log.write(line)
+                tail.append(line.decode("utf-8", errors="replace"))
+    finally:
+        log.close()
+    token.check()
+    if process.returncode != 0:
+        raise BuildError(command, process.returncode, list(tail), log_path)
+    return list(tail)
+
+
+def _steps(commands):
+    # A nested list is a group of commands that may run in parallel
+    for step in commands:
+        yield [step] if isinstance(step, str) else list(step)
+
+
+def run_build(product):
+    """
+    Runs the build commands of the product's `build` config section:
+
+        build:
+          commands:
+            - "./configure"
+            - ["make -C lib", "make -C app"]  # run in parallel, up to jobs
+          env: {CC: clang}
+          jobs: 4                    # also exported as JOBS
+          workspace: /path/to/src    # defaults to product.workspace
+          log_dir: build/logs
+          log_max_bytes: 10485760
+          log_backups: 3
+          tail_lines: 200
+    """
+    settings = product.config.get("build") or {}
+    commands = settings.get("commands") or []
+    if not commands:
+        return None
+    cwd = settings.get("workspace") or product.workspace
+    jobs = settings.get("jobs") or os.cpu_count() or 1
+    env = dict(os.environ)
+    env.update({key: str(value) for key, value in (settings.get("env") or {}).items()})
+    env.setdefault("JOBS", str(jobs))
+    log_dir = settings.get("log_dir", DEFAULT_LOG_DIR)
+
+    index = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for step in _steps(commands):
+            futures = []
+            for command in step:
+                index += 1
+                log_path = os.path.join(log_dir, f"{product.name}-{index}.log")
+                print(f"[Build] Running '{command}' (log: {log_path})")
+                # The command runs under the stage's cancellation token
+                futures.append(
+                    executor.submit(
+                        wrap_context(run_command), command, cwd, env, log_path, settings
+                    )
+                )
+            # Wait for the whole group before reporting its first failure
+            errors = [future.exception() for future in futures]
+            for error in errors:
+                if error is not None:
+                    raise error
+    msg = f"Ran {index} build command(s) for '{product.name}'."
+    logger.info(msg)
+    print(f"[Build] {msg}")
+    return index
+
+
+@register_stage
+class BuildStage(Stage):
+    name = "build"
+    resource_class = SUBPROCESS_BOUND
+
+    def run(self, product):
+        product.build()
@@ -1,4 +1,87 @@
-def clone_repo(product):
-    print(
-        f"[Clone] Cloning repository for product '{product.name}' from {product.git_repository}..."
-    )
+import asyncio
+import os
+from product_pipeline.stages.base import SUBPROCESS_BOUND, Stage, register_stage
+from product_pipeline.utils.cancellation import current_token
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Clone")
+
+
+class CloneError(Exception):
+    pass
+
+
+def _kill(process):
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass  # Already exited
+
+
+async def _git(*args, cwd=None):
+    current_token().check()
+    process = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    loop = asyncio.get_running_loop()
+    token = current_token()
+    # Cancellation may come from another thread: kill git on the loop's thread
+    with token.on_cancel(lambda: loop.call_soon_threadsafe(_kill, process)):
+        output, _ = await process.communicate()
+    token.check()
+    if process.returncode != 0:
+        raise CloneError(f"git {' '.join(args)} failed: {output.decode().strip()}")
+    return output.decode()
+
+
+def clone_repo(product):
+    print(
+        f"[Clone] Cloning repository for product '{product.name}' from {product.git_repository}..."
+    )
+
+
+async def clone_repo_async(product):
+    """
+    Shallow-clones (or fetches) target_branch into product.workspace.
+    Without a workspace only the announcement is printed.
+    """
+    clone_repo(product)
+    workspace = product.workspace
+    if not workspace:
+        return
+    if os.path.isfile(os.path.join(workspace, ".git")):
+        # Worktree of a shared mirror, checked out by the matrix (matrix.py)
+        logger.info(f"Using worktree {workspace} for '{product.name}'")
+        return
+    if os.path.isdir(os.path.join(workspace, ".git")):
+        await _git(
+            "fetch", "--depth", "1", "origin", product.target_branch, cwd=workspace
+        )
+        await _git("checkout", "-B", product.target_branch, "FETCH_HEAD", cwd=workspace)
+    else:
+        await _git(
+            "clone",
+            "--depth",
+            "1",
+            "--branch",
+            product.target_branch,
+            product.git_repository,
+            workspace,
+        )
+    logger.info(f"Workspace for '{product.name}' ready at {workspace}")
+
+
+@register_stage
+class CloneStage(Stage):
+    name = "clone"
+    resource_class = SUBPROCESS_BOUND
+
+    def run(self, product):
+        asyncio.run(clone_repo_async(product))
+
+    async def run_async(self, product):
+        await clone_repo_async(product)
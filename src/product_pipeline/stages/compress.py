@@ -0,0 +1,199 @@
+"""
+Compression stage: shrinks artifacts before they are deployed.
+
+Artifacts are read as a stream of fixed-size chunks that are compressed in
+parallel and written back in order as independent gzip members (or zstd
+frames); concatenated members form a valid .gz/.zst file. zlib and zstandard
+release the GIL while compressing, so a thread pool keeps all cores busy
+without copying chunks between processes.
+"""
+
+import gzip
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from product_pipeline.stages.base import CPUStage, register_stage
+from product_pipeline.utils.config_model import thaw
+from product_pipeline.utils.logging import get_logger
+
+try:  # Optional dependency, gzip is used when it is not installed
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+logger = get_logger("Compress")
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Inputs that are already compressed gain nothing from another pass
+COMPRESSED_EXTENSIONS = {
+    ".gz",
+    ".tgz",
+    ".zst",
+    ".xz",
+    ".bz2",
+    ".lz4",
+    ".zip",
+    ".7z",
+    ".jar",
+    ".war",
+    ".whl",
+    ".apk",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".mp4",
+}
+COMPRESSED_MAGIC = (
+    b"\x1f\x8b",  # gzip
+    b"\x28\xb5\x2f\xfd",  # zstd
+    b"\xfd7zXZ\x00",  # xz
+    b"BZh",  # bzip2
+    b"PK\x03\x04",  # zip, jar, whl
+    b"7z\xbc\xaf\x27\x1c",  # 7z
+)
+# Highly compressible content is worth a higher level
+TEXT_EXTENSIONS = {".txt", ".log", ".json", ".xml", ".csv", ".yaml", ".yml", ".sql"}
+
+# (max size in bytes, gzip level, zstd level), first match wins
+LEVELS_BY_SIZE = (
+    (16 * 1024 * 1024, 9, 19),
+    (256 * 1024 * 1024, 6, 9),
+    (float("inf"), 3, 3),
+)
+
+
+def is_compressed(path):
+    if os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return True
+    with open(path, "rb") as f:
+        head = f.read(8)
+    return any(head.startswith(magic) for magic in COMPRESSED_MAGIC)
+
+
+def choose_level(path, size, fmt):
+    """Picks a compression level from the artifact's size and type."""
+    for max_size, gzip_level, zstd_level in LEVELS_BY_SIZE:
+        if size <= max_size:
+            level = zstd_level if fmt == "zstd" else gzip_level
+            break
+    if os.path.splitext(path)[1].lower() in TEXT_EXTENSIONS:
+        # Text shrinks a lot, so trade one step of speed for ratio
+        level = min(level + 1, 19 if fmt == "zstd" else 9)
+    return level
+
+
+def _compress_chunk(chunk, fmt, level):
+    if fmt == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(chunk)
+    return gzip.compress(chunk, compresslevel=level, mtime=0)
+
+
+def compress_file(
+    src, dst, fmt="gzip", level=6, chunk_size=DEFAULT_CHUNK_SIZE, workers=None
+):
+    """
+    Compresses src into dst in parallel chunks. At most 2 * workers chunks are
+    held in memory at any time. Returns the number of bytes written.
+    """
+    workers = workers or os.cpu_count() or 1
+    written = 0
+    pending = deque()
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                chunk = fin.read(chunk_size)
+                if chunk:
+                    pending.append(executor.submit(_compress_chunk, chunk, fmt, level))
+                # Write finished members in order once the window is full or at EOF
+                while pending and (not chunk or len(pending) >= 2 * workers):
+                    data = pending.popleft().result()
+                    fout.write(data)
+                    written += len(data)
+                if not chunk:
+                    break
+    return written
+
+
+def compress_files(product_name, artifacts, settings):
+    """
+    Compresses artifacts according to a `compression` config section and
+    returns the list of resulting paths (unchanged for skipped inputs).
+    """
+    fmt = settings.get("format", "gzip").lower()
+    if fmt == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed, falling back to gzip.")
+        fmt = "gzip"
+    suffix = ".zst" if fmt == "zstd" else ".gz"
+
+    compressed = []
+    for artifact in artifacts:
+        if is_compressed(artifact):
+            print(f"[Compress] Skipping already compressed '{artifact}'.")
+            compressed.append(artifact)
+            continue
+        size = os.path.getsize(artifact)
+        level = settings.get("level")
+        if level is None:
+            level = choose_level(artifact, size, fmt)
+        output_dir = settings.get("output_dir") or os.path.dirname(artifact)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        dst = os.path.join(output_dir, os.path.basename(artifact) + suffix)
+        written = compress_file(
+            artifact,
+            dst,
+            fmt=fmt,
+            level=level,
+            chunk_size=settings.get("chunk_size", DEFAULT_CHUNK_SIZE),
+            workers=settings.get("workers"),
+        )
+        ratio = written / size if size else 1.0
+        msg = f"Compressed '{artifact}' -> '{dst}' ({fmt} level {level}, {ratio:.0%})"
+        logger.info(f"{product_name}: {msg}")
+        print(f"[Compress] {msg}")
+        compressed.append(dst)
+    return compressed
+
+
+def compression_settings(product):
+    """
+    Returns the product's `compression` config section, or None if disabled:
+
+        compression:
+          enabled: true
+          format: gzip      # or zstd (requires the zstandard package)
+          workers: 4        # defaults to the number of cores
+          chunk_size: 4194304
+          output_dir: build/compressed
+    """
+    settings = product.config.get("compression") or {}
+    if not settings.get("enabled", False):
+        print(f"[Compress] Compression disabled for product '{product.name}'.")
+        return None
+    return thaw(settings)
+
+
+def compress_artifacts(product):
+    """Compresses the product's artifacts in place of the originals."""
+    settings = compression_settings(product)
+    if settings is not None:
+        product.artifacts = compress_files(product.name, product.artifacts, settings)
+
+
+@register_stage
+class CompressStage(CPUStage):
+    name = "compress"
+
+    def payload(self, product):
+        return product.name, list(product.artifacts), compression_settings(product)
+
+    @staticmethod
+    def work(payload):
+        product_name, artifacts, settings = payload
+        if settings is None:
+            return artifacts
+        return compress_files(product_name, artifacts, settings)
+
+    def apply(self, product, result):
+        product.artifacts = result
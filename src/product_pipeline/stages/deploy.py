@@ -1,4 +1,17 @@
-def deploy_product(product):
-    print(
-        f"[Deploy Stage] Deploying product '{product.name}' to target repositories..."
-    )
+from product_pipeline.stages.base import IO_BOUND, Stage, register_stage
+
+
+def deploy_product(product):
+    print(
+        f"[Deploy Stage] Deploying product '{product.name}' to target repositories..."
+    )
+    product.deploy()
+
+
+@register_stage
+class DeployStage(Stage):
+    name = "deploy"
+    resource_class = IO_BOUND
+
+    def run(self, product):
+        deploy_product(product)
@@ -1,2 +1,15 @@
-def notify_product(product):
-    print(f"[Notify Stage] Sending notifications for product '{product.name}'...")
+from product_pipeline.stages.base import IO_BOUND, Stage, register_stage
+
+
+def notify_product(product):
+    print(f"[Notify Stage] Sending notifications for product '{product.name}'...")
+    product.notify()
+
+
+@register_stage
+class NotifyStage(Stage):
+    name = "notify"
+    resource_class = IO_BOUND
+
+    def run(self, product):
+        notify_product(product)
@@ -1,4 +1,210 @@
-def run_integration_tests(product):
-    print(
-        f"[Integration Test] Running integration tests for product '{product.name}'..."
-    )
+"""
+Integration test stage.
+
+A product's test files are split into shards balanced by their historical
+durations and the shards run on a process pool. Passing results are cached by
+(commit, test file hash), so unchanged tests are skipped on re-runs.
+"""
+
+import glob
+import hashlib
+import heapq
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from product_pipeline.stages.base import SUBPROCESS_BOUND, Stage, register_stage
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("IntegrationTests")
+
+DEFAULT_PATTERNS = ["tests/**/test_*.py"]
+# Assumed duration (seconds) of a test file that has never run
+DEFAULT_DURATION = 1.0
+
+
+class IntegrationTestError(Exception):
+    def __init__(self, failed):
+        super().__init__(f"{len(failed)} test file(s) failed: {', '.join(failed)}")
+        self.failed = failed
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def git_commit(workspace):
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=workspace,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def discover_test_files(workspace, patterns=None):
+    files = set()
+    for pattern in patterns or DEFAULT_PATTERNS:
+        for path in glob.glob(os.path.join(workspace, pattern), recursive=True):
+            files.add(os.path.relpath(path, workspace))
+    return sorted(files)
+
+
+def shard_tests(files, durations, shards):
+    """
+    Splits files into at most `shards` groups with similar total duration
+    (longest-processing-time-first). Unknown files get DEFAULT_DURATION.
+    """
+    shards = max(1, min(shards, len(files)))
+    heap = [(0.0, index, []) for index in range(shards)]
+    ordered = sorted(files, key=lambda f: (-durations.get(f, DEFAULT_DURATION), f))
+    for path in ordered:
+        load, index, group = heapq.heappop(heap)
+        group.append(path)
+        heapq.heappush(
+            heap, (load + durations.get(path, DEFAULT_DURATION), index, group)
+        )
+    return [group for _, _, group in sorted(heap, key=lambda item: item[1]) if group]
+
+
+def _run_shard(command, files, workspace):
+    """Runs each test file of a shard in turn; executed in a worker process."""
+    results = []
+    for path in files:
+        start = time.monotonic()
+        completed = subprocess.run(
+            command + [path],
+            cwd=workspace,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        results.append(
+            {
+                "file": path,
+                "passed": completed.returncode == 0,
+                "duration": time.monotonic() - start,
+                "output": completed.stdout[-2000:],
+            }
+        )
+    return results
+
+
+def _load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def run_integration_tests(product):
+    """
+    Runs the product's integration tests according to its `tests` config:
+
+        tests:
+          enabled: true
+          workspace: /path/to/checkout   # defaults to product.workspace
+          patterns: ["tests/**/test_*.py"]
+          command: "python -m pytest -q"
+          shards: 8                      # defaults to the number of cores
+          workers: 8
+    """
+    settings = product.config.get("tests") or {}
+    if not settings.get("enabled", False):
+        print(f"[Integration Test] Tests disabled for product '{product.name}'.")
+        return None
+    workspace = settings.get("workspace") or product.workspace
+    if not workspace:
+        raise ValueError(f"No workspace to run tests of product '{product.name}'.")
+    print(
+        f"[Integration Test] Running integration tests for product '{product.name}'..."
+    )
+
+    cache_dir = settings.get("cache_dir") or os.path.join(workspace, ".pipeline_cache")
+    durations_path = os.path.join(cache_dir, "test_durations.json")
+    results_path = os.path.join(cache_dir, "test_results.json")
+    durations = _load_json(durations_path)
+    cached_results = _load_json(results_path)
+
+    commit = git_commit(workspace)
+    files = discover_test_files(workspace, settings.get("patterns"))
+    keys = {}
+    pending = []
+    for path in files:
+        keys[path] = f"{commit}:{file_digest(os.path.join(workspace, path))}"
+        # Without a commit the code under test is unknown, so nothing is cached
+        if commit and cached_results.get(keys[path]) == "passed":
+            continue
+        pending.append(path)
+    skipped = len(files) - len(pending)
+
+    command = shlex.split(settings.get("command", f"{sys.executable} -m pytest -q"))
+    workers = settings.get("workers") or os.cpu_count() or 1
+    shards = shard_tests(pending, durations, settings.get("shards") or workers)
+    results = []
+    if shards:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            futures = [
+                executor.submit(_run_shard, command, shard, workspace)
+                for shard in shards
+            ]
+            for future in futures:
+                results.extend(future.result())
+
+    failed = []
+    for result in results:
+        durations[result["file"]] = round(result["duration"], 3)
+        if result["passed"]:
+            if commit:
+                cached_results[keys[result["file"]]] = "passed"
+        else:
+            failed.append(result["file"])
+            logger.error(f"Test file '{result['file']}' failed:\n{result['output']}")
+    _save_json(durations_path, durations)
+    # Entries of older commits can never match again
+    _save_json(
+        results_path,
+        {k: v for k, v in cached_results.items() if k.startswith(f"{commit}:")},
+    )
+
+    msg = (
+        f"{len(results) - len(failed)} passed, {len(failed)} failed, "
+        f"{skipped} cached across {len(shards)} shard(s)."
+    )
+    logger.info(msg)
+    print(f"[Integration Test] {msg}")
+    if failed:
+        raise IntegrationTestError(failed)
+    return results
+
+
+@register_stage
+class TestStage(Stage):
+    name = "test"
+    resource_class = SUBPROCESS_BOUND
+    # Not a pytest test class, despite the name
+    __test__ = False
+
+    def run(self, product):
+        product.test()
@@ -0,0 +1,152 @@
+"""
+Per-stage CPU and memory accounting.
+
+measure() samples resource.getrusage() around a stage: user and system CPU
+time of this process and of the child processes it waited for (build
+commands, git), and the growth of the peak RSS. Work a stage hands to the
+CPU process pool is measured there and added with add_usage(). Optionally,
+tracemalloc reports the stage's top allocations.
+
+getrusage() covers the whole process, so stages of pipelines running
+concurrently in one process (matrix runs) see each other's usage; runs in
+their own worker (--all) are measured exactly.
+"""
+
+import contextvars
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+try:  # Unix only; CPU and RSS stay zero elsewhere
+    import resource
+except ImportError:  # pragma: no cover - depends on the platform
+    resource = None
+
+_current_usage = contextvars.ContextVar("current_usage", default=None)
+
+# ru_maxrss is in KiB on Linux, in bytes on macOS
+_MAXRSS_SCALE = 1 if sys.platform == "darwin" else 1024
+
+
+class StageUsage:
+    __slots__ = (
+        "stage",
+        "user",
+        "system",
+        "children_user",
+        "children_system",
+        "peak_rss_delta",
+        "top_allocations",
+    )
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.user = 0.0
+        self.system = 0.0
+        self.children_user = 0.0
+        self.children_system = 0.0
+        # Bytes the process's peak RSS grew by during the stage
+        self.peak_rss_delta = 0
+        # (file:line, size delta in bytes, count delta) of the largest allocations
+        self.top_allocations = []
+
+    @property
+    def cpu_seconds(self):
+        return self.user + self.system + self.children_user + self.children_system
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def summary(self):
+        line = (
+            f"stage {self.stage}: user {self.user + self.children_user:.2f}s, "
+            f"sys {self.system + self.children_system:.2f}s, "
+            f"peak RSS +{self.peak_rss_delta / 1024 / 1024:.1f} MiB"
+        )
+        for location, size, _ in self.top_allocations[:3]:
+            line += f"\n    {location}: {size / 1024:+.1f} KiB"
+        return line
+
+
+def rusage():
+    """(self, children) getrusage() results, None without the resource module."""
+    if resource is None:
+        return None, None
+    return (
+        resource.getrusage(resource.RUSAGE_SELF),
+        resource.getrusage(resource.RUSAGE_CHILDREN),
+    )
+
+
+def add_usage(user, system, peak_rss_delta=0):
+    """Adds CPU time measured elsewhere (a pool process) to the current stage."""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.children_user += user
+        usage.children_system += system
+        usage.peak_rss_delta = max(usage.peak_rss_delta, peak_rss_delta)
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        )
+    )
+
+
+def _top_allocations(before, after, limit):
+    stats = after.compare_to(before, "lineno")
+    return [
+        (
+            f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            stat.size_diff,
+            stat.count_diff,
+        )
+        for stat in stats[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def _add_rusage(usage, own, children, own_after, children_after):
+    usage.user += own_after.ru_utime - own.ru_utime
+    usage.system += own_after.ru_stime - own.ru_stime
+    usage.children_user += children_after.ru_utime - children.ru_utime
+    usage.children_system += children_after.ru_stime - children.ru_stime
+    usage.peak_rss_delta = max(
+        usage.peak_rss_delta,
+        (own_after.ru_maxrss - own.ru_maxrss) * _MAXRSS_SCALE,
+        (children_after.ru_maxrss - children.ru_maxrss) * _MAXRSS_SCALE,
+    )
+
+
+@contextmanager
+def measure(stage, tracemalloc_top=0):
+    """
+    Context manager yielding the StageUsage of its block. tracemalloc_top > 0
+    also records that many top allocations (tracing slows Python code down).
+    """
+    usage = StageUsage(stage)
+    token = _current_usage.set(usage)
+    started_tracing = False
+    snapshot = None
+    if tracemalloc_top:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        snapshot = _snapshot()
+    own, children = rusage()
+    try:
+        yield usage
+    finally:
+        own_after, children_after = rusage()
+        _current_usage.reset(token)
+        if own is not None:
+            _add_rusage(usage, own, children, own_after, children_after)
+        if snapshot is not None:
+            usage.top_allocations = _top_allocations(
+                snapshot, _snapshot(), tracemalloc_top
+            )
+            if started_tracing:
+                tracemalloc.stop()
@@ -0,0 +1,192 @@
+"""
+Adaptive (AIMD) concurrency limits per endpoint host.
+
+A static max_in_flight is too low for an idle server and too high for a
+struggling one. An AIMDLimiter finds the host's capacity from the calls
+themselves:
+
+- additive increase: each successful call made while at least half of the
+  limit was in use raises it by 1/limit, about one per round of calls,
+  while the smoothed latency stays within `tolerance` times the baseline;
+- multiplicative decrease: a 429, a 5xx, a connection error or latency
+  rising past the tolerance multiplies it by `backoff`, at most once per
+  smoothed latency so one burst of failures counts once.
+
+The baseline follows the lowest latencies seen and drifts up slowly, so a
+server that is slower for good does not hold the limit at its minimum.
+Uploads of very different sizes to one host make the latency noisier; the
+tolerance absorbs steady mixes.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Adaptive")
+
+# Defaults for the `adaptive` settings of a rate_limits entry
+DEFAULT_INITIAL = 4
+DEFAULT_MINIMUM = 1
+DEFAULT_MAXIMUM = 64
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TOLERANCE = 2.0
+# Weight of the latest sample in the smoothed latency
+LATENCY_SMOOTHING = 0.2
+# Share of the gap the baseline closes per slower sample
+BASELINE_DRIFT = 0.01
+# Latency (seconds) below which jitter is never taken for queuing
+MIN_BASELINE = 0.01
+
+
+class Call:
+    """One limited call; callers set `status` once the response arrived."""
+
+    __slots__ = ("status", "saturated")
+
+    def __init__(self, saturated=False):
+        self.status = None
+        # Whether at least half of the limit was in use when the call started
+        self.saturated = saturated
+
+
+def is_overload(status=None, error=None):
+    """True for responses and errors telling the host is overloaded."""
+    if error is not None:
+        status = getattr(error, "status", None)
+        if status is None:
+            return isinstance(error, OSError)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class AIMDLimiter:
+    def __init__(
+        self,
+        name,
+        initial=DEFAULT_INITIAL,
+        minimum=DEFAULT_MINIMUM,
+        maximum=DEFAULT_MAXIMUM,
+        backoff=DEFAULT_BACKOFF,
+        tolerance=DEFAULT_TOLERANCE,
+        clock=time.monotonic,
+    ):
+        if not 0 < backoff < 1:
+            raise ValueError("Backoff must be between 0 and 1.")
+        self.name = name
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self._clock = clock
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        # Smoothed and baseline latency in seconds (None before the first call)
+        self.latency = None
+        self.baseline = None
+        self._last_decrease = None
+        self.decreases = 0
+
+    @property
+    def gradient(self):
+        """Baseline over smoothed latency: 1 when unloaded, falling with queuing."""
+        if not self.latency:
+            return 1.0
+        return min(1.0, max(self.baseline, MIN_BASELINE) / self.latency)
+
+    @contextmanager
+    def acquire(self, wait=None):
+        """
+        Context manager holding one slot; yields the Call to report on.
+        `wait`, e.g. a rate limit's token wait, runs once the slot is held
+        and before the latency clock starts: throttling is not the host's.
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            # Growing the limit is only warranted while it is in use
+            call = Call(saturated=self.in_flight * 2 >= int(self.limit))
+        if wait is not None:
+            try:
+                wait()
+            except BaseException:
+                self._release(call, 0.0, overloaded=False)
+                raise
+        started = self._clock()
+        try:
+            yield call
+        except BaseException as e:
+            self._release(
+                call, self._clock() - started, overloaded=is_overload(error=e)
+            )
+            raise
+        self._release(
+            call, self._clock() - started, overloaded=is_overload(call.status)
+        )
+
+    def _release(self, call, latency, overloaded):
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                self._decrease(f"status {call.status}" if call.status else "error")
+            elif call.status is not None:
+                self._sample(latency, call.saturated)
+            self._condition.notify_all()
+
+    def _sample(self, latency, saturated):
+        if self.latency is None:
+            self.latency = self.baseline = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+            if latency < self.baseline:
+                self.baseline = latency
+            else:
+                self.baseline += BASELINE_DRIFT * (latency - self.baseline)
+        if self.latency > self.tolerance * max(self.baseline, MIN_BASELINE):
+            self._decrease(f"latency {self.latency:.3f}s")
+        elif saturated and self.limit < self.maximum:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def _decrease(self, reason):
+        now = self._clock()
+        if self._last_decrease is not None and now - self._last_decrease < (
+            self.latency or 0.0
+        ):
+            return  # Already backed off for this round of calls
+        self._last_decrease = now
+        limit = max(self.minimum, self.limit * self.backoff)
+        if int(limit) != int(self.limit):
+            logger.info(f"Concurrency to {self.name}: {int(limit)} ({reason})")
+        self.limit = limit
+        self.decreases += 1
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency": self.latency or 0.0,
+                "gradient": self.gradient,
+                "decreases": self.decreases,
+            }
+
+
+def create_adaptive_limiter(name, settings, maximum=None):
+    """
+    AIMDLimiter of the `adaptive` settings of a rate_limits entry:
+
+        adaptive: {initial: 4, min: 1, backoff: 0.5, tolerance: 2.0}
+
+    The entry's max_in_flight, if any, caps the limit.
+    """
+    if not hasattr(settings, "get"):
+        settings = {}  # adaptive: true
+    return AIMDLimiter(
+        name,
+        initial=settings.get("initial", DEFAULT_INITIAL),
+        minimum=settings.get("min", DEFAULT_MINIMUM),
+        maximum=maximum or settings.get("max", DEFAULT_MAXIMUM),
+        backoff=settings.get("backoff", DEFAULT_BACKOFF),
+        tolerance=settings.get("tolerance", DEFAULT_TOLERANCE),
+    )
@@ -0,0 +1,178 @@
+"""
+Deadlines and cooperative cancellation.
+
+Pipeline.run gives the run and each of its stages a CancellationToken with a
+deadline. The stage's token is the current token of all the code the stage
+runs, pool threads and asyncio tasks included (it lives in a context
+variable, like the current span), so plugins reach it through
+current_token() without any change to their signatures:
+
+- HTTP requests of targets and channels cap their socket timeouts at the
+  time left and check the token between body chunks;
+- child processes (build commands, git) are killed once it is cancelled;
+- long plugin loops call current_token().check().
+
+When a deadline passes, the pipeline cancels the token, so in-flight work
+aborts instead of holding a worker.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Cancellation")
+
+
+class CancelledError(Exception):
+    pass
+
+
+class DeadlineExceeded(CancelledError):
+    pass
+
+
+class CancellationToken:
+    def __init__(self, deadline=None, parent=None, clock=time.monotonic):
+        # Absolute deadline on clock(), or None
+        self.deadline = deadline
+        self.parent = parent
+        self._clock = clock
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+        if parent is not None:
+            if parent.deadline is not None and (
+                deadline is None or parent.deadline < deadline
+            ):
+                self.deadline = parent.deadline
+            parent.add_callback(self._parent_cancelled)
+
+    @classmethod
+    def after(cls, timeout, parent=None, clock=time.monotonic):
+        """Token expiring in `timeout` seconds (never if None), within parent."""
+        deadline = clock() + timeout if timeout is not None else None
+        return cls(deadline, parent=parent, clock=clock)
+
+    def child(self, timeout=None):
+        return CancellationToken.after(timeout, parent=self, clock=self._clock)
+
+    def _parent_cancelled(self):
+        self.cancel(self.parent.reason)
+
+    def detach(self):
+        """Stops following the parent's cancellation, once the token is done."""
+        if self.parent is not None:
+            self.parent.remove_callback(self._parent_cancelled)
+
+    def cancel(self, reason="Cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Cancellation callback failed: {e}")
+
+    def add_callback(self, callback):
+        """Calls callback() on cancellation (at once if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    @contextmanager
+    def on_cancel(self, callback):
+        """Context manager registering callback for the duration of its block."""
+        self.add_callback(callback)
+        try:
+            yield
+        finally:
+            self.remove_callback(callback)
+
+    @property
+    def expired(self):
+        return self.deadline is not None and self._clock() >= self.deadline
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.expired:
+            self.cancel("Deadline exceeded")
+        return self._event.is_set()
+
+    def remaining(self):
+        """Seconds left before the deadline (None without one)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self._clock())
+
+    def timeout(self, default=None):
+        """default capped at the time left, e.g. for socket timeouts."""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return remaining if default is None else min(default, remaining)
+
+    def check(self):
+        """Raises DeadlineExceeded or CancelledError once cancelled."""
+        if self.cancelled:
+            error = DeadlineExceeded if self.expired else CancelledError
+            raise error(self.reason)
+
+    def wait(self, seconds):
+        """Sleeps up to seconds; returns True if cancelled meanwhile."""
+        timeout = self.timeout(seconds)
+        self._event.wait(timeout)
+        return self.cancelled
+
+    def guard(self, chunks):
+        """Iterates chunks (e.g. an upload body), checking between them."""
+        for chunk in chunks:
+            self.check()
+            yield chunk
+
+
+class _NeverCancelled(CancellationToken):
+    def cancel(self, reason="Cancelled"):
+        pass
+
+    def add_callback(self, callback):
+        pass  # Would never be called; not kept either
+
+
+# Current token outside of any pipeline run
+NEVER = _NeverCancelled()
+
+_current_token = contextvars.ContextVar("current_token", default=NEVER)
+
+
+def current_token():
+    return _current_token.get()
+
+
+@contextmanager
+def use_token(token):
+    """Makes token the current token of its block."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def stage_timeout(deadlines, stage):
+    """Timeout of a stage from a `deadlines` section: per-stage, else default."""
+    deadlines = deadlines or {}
+    return (deadlines.get("stages") or {}).get(stage, deadlines.get("stage"))
@@ -1,6 +1,9 @@
 import os
 import yaml
+from product_pipeline.utils.config_model import build_config_model
+from product_pipeline.utils.config_store import ProductStore
 from product_pipeline.utils.logging import get_logger
+from product_pipeline.utils.secrets import create_secrets_provider
 
 logger = get_logger("ConfigLoader")
 
@@ -10,43 +13,60 @@ def load_yaml_file(filepath):
         return yaml.safe_load(f)
 
 
-def load_configuration():
+def get_config_dir():
+    # PIPELINE_CONFIG_DIR points runs (and their workers) at another config,
+    # e.g. the synthetic fleet of scripts/loadtest_fleet.py
+    if os.environ.get("PIPELINE_CONFIG_DIR"):
+        return os.path.abspath(os.environ["PIPELINE_CONFIG_DIR"])
     # Assume config.yaml and secrets.yaml are in the config/ directory.
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(os.path.dirname(script_dir)))
-    config_path = os.path.join(project_root, "config", "config.yaml")
-    secrets_path = os.path.join(project_root, "config", "secrets.yaml")
+    return os.path.join(project_root, "config")
+
+
+def project_path(path):
+    """Resolves a relative path of config.yaml against the project root."""
+    if not path or os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(get_config_dir()), path)
+
+
+def load_configuration():
+    config_path = os.path.join(get_config_dir(), "config.yaml")
 
     if not os.path.exists(config_path):
         logger.error(f"Configuration file {config_path} not found!")
         raise FileNotFoundError(f"Configuration file {config_path} not found!")
-    if not os.path.exists(secrets_path):
-        logger.error(f"Secrets file {secrets_path} not found!")
-        raise FileNotFoundError(f"Secrets file {secrets_path} not found!")
-
-    config = load_yaml_file(config_path)
-    secrets = load_yaml_file(secrets_path) or {}
-
-    # Process placeholders in secrets (e.g., "${ARTIFACTORY_USER}")
-    for service, creds in secrets.items():
-        if creds is None:
-            continue
-        for key, value in creds.items():
-            if (
-                isinstance(value, str)
-                and value.startswith("${")
-                and value.endswith("}")
-            ):
-                env_var = value[2:-1]
-                creds[key] = os.environ.get(env_var, value)
-
-    # Merge secrets into repository configurations
-    for product in config.get("products", []):
-        repos = product.get("repositories", {})
-        for repo_type, repo_conf in repos.items():
-            if repo_conf.get("enabled", False) and repo_conf.get("credentials_ref"):
-                secret_key = repo_conf.get("credentials_ref")
-                if secret_key in secrets:
-                    repo_conf["credentials"] = secrets[secret_key]
-
-    return config
+
+    # Credentials are not merged here: targets resolve their credentials_ref
+    # lazily through a SecretsProvider (see load_secrets_provider).
+    return load_yaml_file(config_path)
+
+
+def load_config_model():
+    """
+    Loads config.yaml into a FleetConfig. Products may also live in one file
+    each under config/products.d/ (or the `products_dir` setting); those are
+    parsed only when requested.
+    """
+    raw_config = load_configuration()
+    products_dir = raw_config.get("products_dir") or os.path.join(
+        get_config_dir(), "products.d"
+    )
+    if not os.path.isabs(products_dir):
+        products_dir = os.path.join(os.path.dirname(get_config_dir()), products_dir)
+    store = ProductStore(products_dir) if os.path.isdir(products_dir) else None
+    return build_config_model(raw_config, store=store)
+
+
+def load_secrets_provider(config):
+    """
+    Creates the secrets provider described by the `secrets` section of the
+    configuration, defaulting to config/secrets.yaml with an in-memory TTL cache.
+    """
+    secrets_config = dict(config.get("secrets") or {})
+    if secrets_config.get("path"):
+        secrets_config["path"] = project_path(secrets_config["path"])
+    return create_secrets_provider(
+        secrets_config, default_path=os.path.join(get_config_dir(), "secrets.yaml")
+    )
@@ -0,0 +1,200 @@
+"""
+Typed, immutable model of config.yaml.
+
+The raw YAML is validated and converted once at load time. Strings are
+interned and identical sub-configurations (repository and notification
+entries, nested mappings) are shared between products, so a fleet of
+thousands of products holds one copy of each distinct value.
+"""
+
+import sys
+from dataclasses import dataclass
+from types import MappingProxyType
+
+EMPTY_MAPPING = MappingProxyType({})
+
+
+class ConfigError(ValueError):
+    """Raised when config.yaml does not match the expected structure."""
+
+
+def _canonical(value):
+    # Hashable key describing a (raw) value, used to share equal sub-configs
+    if isinstance(value, dict):
+        return ("map", tuple(sorted((str(k), _canonical(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return ("seq", tuple(_canonical(v) for v in value))
+    return (type(value).__name__, value)
+
+
+def thaw(value):
+    """Returns a plain (mutable, picklable) copy of a frozen config value."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+class _Interner:
+    """Freezes raw YAML values, returning one shared object per distinct value."""
+
+    def __init__(self):
+        self._shared = {}
+
+    def freeze(self, value):
+        if isinstance(value, str):
+            return sys.intern(value)
+        if not isinstance(value, (dict, list, tuple)):
+            return value
+        key = _canonical(value)
+        frozen = self._shared.get(key)
+        if frozen is None:
+            if isinstance(value, dict):
+                frozen = MappingProxyType(
+                    {sys.intern(str(k)): self.freeze(v) for k, v in value.items()}
+                )
+            else:
+                frozen = tuple(self.freeze(v) for v in value)
+            self._shared[key] = frozen
+        return frozen
+
+
+@dataclass(frozen=True)
+class ProductConfig:
+    __slots__ = (
+        "product_name",
+        "git_repository",
+        "default_target_branch",
+        "repositories",
+        "notifications",
+        "extra",
+    )
+    product_name: str
+    git_repository: str
+    default_target_branch: str
+    repositories: MappingProxyType
+    notifications: MappingProxyType
+    extra: MappingProxyType
+
+    def get(self, key, default=None):
+        """Dict-style access, so helpers work with both raw and typed configs."""
+        if key in self.__slots__ and key != "extra":
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.extra.get(key, default)
+
+
+@dataclass(frozen=True)
+class FleetConfig:
+    __slots__ = ("products", "settings", "_by_name", "store")
+    products: tuple
+    settings: MappingProxyType
+    _by_name: MappingProxyType
+    # Optional lazily parsed products.d directory (see config_store.py)
+    store: object
+
+    def get(self, key, default=None):
+        if key == "products":
+            if self.store is None:
+                return self.products
+            # A products.d file never shadows a product of config.yaml
+            return self.products + self.store.products(skip=self._by_name)
+        return self.settings.get(key, default)
+
+    def duplicates(self):
+        """Names of products defined both in config.yaml and in products.d."""
+        if self.store is None:
+            return []
+        return sorted(set(self._by_name) & set(self.store.names()))
+
+    def find(self, product_name):
+        product = self._by_name.get(product_name)
+        if product is None and self.store is not None:
+            # Parses only this product's file
+            product = self.store.get(product_name)
+        return product
+
+
+def _require_mapping(value, where):
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ConfigError(f"{where} must be a mapping, got {type(value).__name__}.")
+    return value
+
+
+def _validate_entries(entries, where, required_when_enabled=()):
+    for entry_type, entry in entries.items():
+        entry = _require_mapping(entry, f"{where}.{entry_type}")
+        if not isinstance(entry.get("enabled", False), bool):
+            raise ConfigError(f"{where}.{entry_type}.enabled must be a boolean.")
+        if entry.get("enabled", False):
+            for key, expected in required_when_enabled:
+                value = entry.get(key)
+                if value is not None and not isinstance(value, expected):
+                    raise ConfigError(
+                        f"{where}.{entry_type}.{key} must be {expected.__name__}."
+                    )
+
+
+def build_product_config(raw, interner=None):
+    interner = interner or _Interner()
+    raw = _require_mapping(raw, "product")
+    name = raw.get("product_name")
+    if not isinstance(name, str) or not name:
+        raise ConfigError("Every product needs a non-empty 'product_name'.")
+    for key in ("git_repository", "default_target_branch"):
+        if raw.get(key) is not None and not isinstance(raw.get(key), str):
+            raise ConfigError(f"Product '{name}': '{key}' must be a string.")
+
+    repositories = _require_mapping(raw.get("repositories"), f"{name}.repositories")
+    notifications = _require_mapping(raw.get("notifications"), f"{name}.notifications")
+    _validate_entries(repositories, f"{name}.repositories", [("credentials_ref", str)])
+    _validate_entries(notifications, f"{name}.notifications", [("config", dict)])
+
+    known = set(ProductConfig.__slots__)
+    extra = {k: v for k, v in raw.items() if k not in known}
+    return ProductConfig(
+        product_name=interner.freeze(name),
+        git_repository=interner.freeze(raw.get("git_repository")),
+        default_target_branch=interner.freeze(raw.get("default_target_branch")),
+        repositories=interner.freeze(repositories),
+        notifications=interner.freeze(notifications),
+        extra=interner.freeze(extra) if extra else EMPTY_MAPPING,
+    )
+
+
+def build_config_model(raw_config, store=None):
+    """
+    Validates the raw configuration dictionary and returns a FleetConfig,
+    optionally backed by a ProductStore for products.d files.
+    Raises ConfigError on structural problems.
+    """
+    raw_config = _require_mapping(raw_config, "configuration")
+    products_raw = raw_config.get("products") or []
+    if not isinstance(products_raw, list):
+        raise ConfigError("'products' must be a list.")
+
+    interner = _Interner()
+    products = tuple(build_product_config(raw, interner) for raw in products_raw)
+    by_name = {}
+    for product in products:
+        if product.product_name in by_name:
+            raise ConfigError(f"Duplicate product_name '{product.product_name}'.")
+        by_name[product.product_name] = product
+
+    settings = {k: v for k, v in raw_config.items() if k != "products"}
+    config = FleetConfig(
+        products=products,
+        settings=interner.freeze(settings),
+        _by_name=MappingProxyType(by_name),
+        store=store,
+    )
+    duplicates = config.duplicates()
+    if duplicates:
+        raise ConfigError(
+            f"Products defined both in config.yaml and in {store.directory}: "
+            f"{', '.join(duplicates)}."
+        )
+    return config
@@ -0,0 +1,243 @@
+"""
+Split product configuration: config/products.d/<product_name>.yaml.
+
+Product files are indexed by name and parsed only when a product is first
+requested. A ConfigWatcher keeps a long-running process up to date: it
+watches the directory with inotify (polling where inotify is unavailable)
+and re-parses only the product files that changed.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import yaml
+from product_pipeline.utils.config_model import (
+    ConfigError,
+    _Interner,
+    build_product_config,
+)
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("ConfigStore")
+
+PRODUCT_FILE_EXTENSIONS = (".yaml", ".yml")
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+def _file_state(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ProductStore:
+    """Lazily parsed products of a products.d directory, safe across threads."""
+
+    def __init__(self, directory, interner=None):
+        self.directory = directory
+        self._interner = interner or _Interner()
+        self._lock = threading.Lock()
+        # product name -> path, and product name -> (file state, ProductConfig)
+        self._paths = {}
+        self._loaded = {}
+        self.rescan()
+
+    def rescan(self):
+        """Re-indexes the directory (added/removed files); parses nothing."""
+        paths = {}
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                name, ext = os.path.splitext(entry.name)
+                if ext in PRODUCT_FILE_EXTENSIONS and entry.is_file():
+                    paths[name] = entry.path
+        with self._lock:
+            self._paths = paths
+            for name in set(self._loaded) - set(paths):
+                del self._loaded[name]
+        return paths
+
+    def names(self):
+        with self._lock:
+            return sorted(self._paths)
+
+    def get(self, name):
+        """Returns the ProductConfig of a product, parsing its file on first use."""
+        with self._lock:
+            path = self._paths.get(name)
+            loaded = self._loaded.get(name)
+        if path is None:
+            return None
+        if loaded is None:
+            loaded = self._load(name, path)
+        return loaded[1]
+
+    def products(self, skip=()):
+        """All products but the `skip` names; parses every file not loaded yet."""
+        return tuple(
+            product
+            for product in map(self.get, self.names())
+            if product is not None and product.product_name not in skip
+        )
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._loaded
+
+    def _load(self, name, path):
+        state = _file_state(path)
+        with open(path, "r") as f:
+            raw = yaml.safe_load(f)
+        product = build_product_config(raw, self._interner)
+        if product.product_name != name:
+            raise ConfigError(
+                f"{path} defines product '{product.product_name}', expected '{name}'."
+            )
+        loaded = (state, product)
+        with self._lock:
+            self._loaded[name] = loaded
+        return loaded
+
+    def reload(self, name):
+        """
+        Re-parses one product file if it was loaded before (unloaded products
+        stay lazy). A broken file keeps the previous configuration.
+        """
+        with self._lock:
+            path = self._paths.get(name)
+            loaded = self._loaded.get(name)
+        if path is None or loaded is None or loaded[0] == _file_state(path):
+            return False
+        try:
+            self._load(name, path)
+        except Exception as e:
+            logger.error(f"Keeping previous configuration of '{name}': {e}")
+            return False
+        logger.info(f"Reloaded configuration of '{name}' from {path}")
+        return True
+
+    def poll(self):
+        """Finds changed files by their mtime/size; returns reloaded names."""
+        before = set(self.names())
+        after = set(self.rescan())
+        changed = before ^ after
+        for name in after & before:
+            if self.reload(name):
+                changed.add(name)
+        return changed
+
+
+class _Inotify:
+    """Minimal inotify binding (Linux) through libc; no extra dependency."""
+
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (
+            self.IN_CLOSE_WRITE
+            | self.IN_MOVED_FROM
+            | self.IN_MOVED_TO
+            | self.IN_CREATE
+            | self.IN_DELETE
+        )
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def read(self, timeout):
+        """Returns the file names with events, waiting up to timeout seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            names.add(os.fsdecode(data[offset : offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """
+    Background thread hot-reloading a ProductStore. on_change, if given, is
+    called with the set of product names that were added, removed or reloaded.
+    """
+
+    def __init__(
+        self, store, interval=DEFAULT_POLL_INTERVAL, on_change=None, use_inotify=True
+    ):
+        self.store = store
+        self.interval = interval
+        self.on_change = on_change
+        self.use_inotify = use_inotify
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify(self.store.directory)
+            except (OSError, AttributeError, TypeError) as e:
+                logger.info(f"inotify unavailable ({e}); polling for changes.")
+        self.backend = "inotify" if inotify else "polling"
+        self._thread = threading.Thread(
+            target=self._run, args=(inotify,), name="config-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, inotify):
+        try:
+            while not self._stop.is_set():
+                if inotify is None:
+                    self._stop.wait(self.interval)
+                    changed = self.store.poll()
+                else:
+                    changed = self._changed_files(inotify.read(self.interval))
+                if changed and self.on_change is not None:
+                    self.on_change(changed)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _changed_files(self, file_names):
+        names = {
+            os.path.splitext(file_name)[0]
+            for file_name in file_names
+            if file_name.endswith(PRODUCT_FILE_EXTENSIONS)
+        }
+        if not names:
+            return set()
+        before = set(self.store.names())
+        after = set(self.store.rescan())
+        changed = (before ^ after) & names
+        for name in names & before & after:
+            if self.store.reload(name):
+                changed.add(name)
+        return changed
@@ -0,0 +1,92 @@
+"""
+Parallel artifact hashing and build manifests.
+
+Artifacts are memory-mapped instead of read into Python buffers. Each file
+gets its standard SHA-256 plus a blockwise "tree" digest (SHA-256 over the
+SHA-256 of every block), whose blocks are hashed concurrently; hashlib
+releases the GIL, so a thread pool spreads the work across cores.
+"""
+
+import datetime
+import hashlib
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Hashing")
+
+DEFAULT_BLOCK_SIZE = 8 * 1024 * 1024
+MANIFEST_VERSION = 1
+
+
+def _sha256(view):
+    try:
+        return hashlib.sha256(view)
+    finally:
+        view.release()
+
+
+def hash_file(path, block_size=DEFAULT_BLOCK_SIZE, executor=None):
+    """Returns a manifest entry {path, size, sha256, tree_sha256, block_size}."""
+    size = os.path.getsize(path)
+    entry = {"path": path, "size": size, "block_size": block_size}
+    if size == 0:
+        empty = hashlib.sha256(b"")
+        entry["sha256"] = empty.hexdigest()
+        entry["tree_sha256"] = hashlib.sha256(empty.digest()).hexdigest()
+        return entry
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+    try:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = memoryview(mapped)
+                try:
+                    # The sequential SHA-256 runs alongside the block digests
+                    full = executor.submit(_sha256, data[:])
+                    blocks = [
+                        executor.submit(_sha256, data[offset : offset + block_size])
+                        for offset in range(0, size, block_size)
+                    ]
+                    block_digests = b"".join(
+                        block.result().digest() for block in blocks
+                    )
+                    entry["sha256"] = full.result().hexdigest()
+                finally:
+                    data.release()
+    finally:
+        if own_executor:
+            executor.shutdown()
+    entry["tree_sha256"] = hashlib.sha256(block_digests).hexdigest()
+    return entry
+
+
+def build_manifest(paths, block_size=DEFAULT_BLOCK_SIZE, workers=None):
+    """Hashes all artifacts of a build and returns the manifest dictionary."""
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        entries = [hash_file(path, block_size, executor) for path in paths]
+    return {
+        "version": MANIFEST_VERSION,
+        "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "artifacts": entries,
+    }
+
+
+def write_manifest(manifest, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(
+        f"Wrote manifest for {len(manifest['artifacts'])} artifact(s) to {path}"
+    )
+
+
+def load_manifest(path):
+    with open(path, "r") as f:
+        return json.load(f)
@@ -1,41 +1,66 @@
 import sys
+import datetime
 from product_pipeline.utils.logging import get_logger
+from product_pipeline.core.engine import configure_engine, get_engine
+from product_pipeline.core.events import configure_events, get_event_bus
 from product_pipeline.core.pipeline import (
+    IMPLEMENTED_STEPS,
+    Pipeline,
+    Product,
     create_deployment_target,
     create_notification_channel,
 )
+from product_pipeline.notifications.digest import get_digest_collector
+from product_pipeline.stages.base import load_stage_plugins
+from product_pipeline.utils.history import create_history
+from product_pipeline.utils.metrics import configure_metrics
+from product_pipeline.utils.ratelimit import configure_rate_limits
+from product_pipeline.utils.tracing import configure_tracing, get_tracer
+from product_pipeline.utils.transport import configure_transport
 
 logger = get_logger("ConfigHelper")
 
 
+def lookup_product_config(config, repo_name):
+    """Returns the configuration of the product named repo_name, or None."""
+    if hasattr(config, "find"):
+        # Typed configs look products up by name, loading products.d lazily
+        return config.find(repo_name)
+    for prod in config.get("products", []):
+        if prod.get("product_name") == repo_name:
+            return prod
+    return None
+
+
 def find_product_config(config, repo_name):
     """
     Searches the configuration for a product with the given repo_name.
     Returns the product configuration if found, otherwise logs an error and exits.
     """
-    for prod in config.get("products", []):
-        if prod.get("product_name") == repo_name:
-            return prod
+    product = lookup_product_config(config, repo_name)
+    if product is not None:
+        return product
     logger.error(f"Product '{repo_name}' not found in configuration!")
     sys.exit(1)
 
 
-def init_deployment_targets(product_config):
+def init_deployment_targets(product_config, secrets_provider=None):
     """
     Initializes deployment targets based on the product configuration.
+    Credentials are resolved lazily through secrets_provider, if given.
     Returns a list of deployment target objects.
     """
     deploy_targets = []
     repos_config = product_config.get("repositories", {})
     for repo_type in ["artifactory", "nexus", "s3"]:
         repo_conf = repos_config.get(repo_type, {})
-        target_obj = create_deployment_target(repo_type, repo_conf)
+        target_obj = create_deployment_target(repo_type, repo_conf, secrets_provider)
         if target_obj:
             deploy_targets.append(target_obj)
     return deploy_targets
 
 
-def init_notification_channels(product_config):
+def init_notification_channels(product_config, secrets_provider=None):
     """
     Initializes notification channels based on the product configuration.
     Returns a list of notification channel objects.
@@ -44,7 +69,81 @@ def init_notification_channels(product_config):
     notifications_config = product_config.get("notifications", {})
     for channel_type in ["email", "slack"]:
         chan_conf = notifications_config.get(channel_type, {})
-        notif_obj = create_notification_channel(channel_type, chan_conf)
+        notif_obj = create_notification_channel(
+            channel_type, chan_conf, secrets_provider
+        )
         if notif_obj:
             notification_channels.append(notif_obj)
     return notification_channels
+
+
+def configure_runtime(config):
+    """Sets up the process-wide transport, engine, rate limits and plugins."""
+    plugins = (config.get("stages") or {}).get("plugins")
+    configure_transport(config.get("transport"))
+    # CPU stage processes import the plugins once, in the forkserver
+    configure_engine(config.get("engine"), preload=plugins)
+    configure_rate_limits(config.get("rate_limits"))
+    configure_events(config.get("events"))
+    configure_tracing(config.get("tracing"))
+    configure_metrics(config.get("metrics"))
+    # Extra stages from plugin modules listed under stages.plugins
+    load_stage_plugins(plugins)
+
+
+def shutdown_runtime():
+    """
+    Sends pending digests, delivers pending events and spans, and stops the
+    event subscribers and the shared stage engine.
+    """
+    get_digest_collector().flush_all()
+    get_engine().shutdown()
+    get_event_bus().close()
+    get_tracer().flush()
+
+
+def create_product(product_config, target_branch=None, secrets_provider=None):
+    """
+    Creates the Product of a product configuration, with its deployment
+    targets and notification channels.
+    """
+    return Product(
+        name=product_config.get("product_name"),
+        git_repository=product_config.get("git_repository"),
+        scheduled_time=datetime.datetime.now(),
+        target_branch=target_branch or product_config.get("default_target_branch"),
+        deploy_targets=init_deployment_targets(product_config, secrets_provider),
+        notification_channels=init_notification_channels(
+            product_config, secrets_provider
+        ),
+        # Built-in stages run by default; plugin stages only when listed
+        valid_stages=list(IMPLEMENTED_STEPS),
+        artifacts=product_config.get("artifacts", []),
+        config=product_config,
+        workspace=product_config.get("workspace"),
+    )
+
+
+def run_pipeline(config, product, stages=None, flush_digests=True):
+    """
+    Runs the product's pipeline, recording it in the run history if enabled.
+    Pipelines of a fleet leave their digests pending (flush_digests=False)
+    so that one message covers every product.
+    """
+    history = create_history(config.get("history"))
+    pipeline = Pipeline(
+        product,
+        stages,
+        history=history,
+        tracemalloc_top=(config.get("accounting") or {}).get("tracemalloc_top", 0),
+        deadlines=config.get("deadlines"),
+    )
+    try:
+        pipeline.run()
+    finally:
+        # Digests without a window are sent once the run is over
+        if flush_digests:
+            get_digest_collector().flush_all()
+        # The engine is shared by every pipeline; shutdown_runtime() stops it
+        if history is not None:
+            history.close()
@@ -0,0 +1,282 @@
+"""
+Run history and performance regression detection.
+
+Every pipeline run is stored in a local SQLite database together with the
+duration of each stage, deploy target and notification channel. The
+`regressions` command compares the latest run of a product against a rolling
+baseline of earlier successful runs and flags timings whose z-score exceeds a
+threshold.
+"""
+
+import argparse
+import os
+import socket
+import sqlite3
+import statistics
+import sys
+import threading
+from product_pipeline.utils.config import project_path
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("History")
+
+DEFAULT_HISTORY_PATH = ".pipeline_cache/history.db"
+# Number of earlier runs forming the baseline
+DEFAULT_WINDOW = 20
+DEFAULT_MIN_SAMPLES = 5
+DEFAULT_Z_THRESHOLD = 3.0
+# Ignore "significant" changes that are too small to matter, e.g. a stage
+# that always took exactly 1.00s and now takes 1.02s
+DEFAULT_MIN_RATIO = 1.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product TEXT NOT NULL,
+    branch TEXT,
+    git_commit TEXT,
+    host TEXT,
+    started_at TEXT NOT NULL,
+    duration REAL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS timings (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    duration REAL NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_product ON runs(product, id);
+CREATE INDEX IF NOT EXISTS timings_run ON timings(run_id);
+"""
+
+
+class RunHistory:
+    """SQLite store of pipeline runs, safe to share between threads."""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+
+    def record_run(
+        self,
+        product,
+        branch,
+        git_commit,
+        started_at,
+        duration,
+        status,
+        timings,
+        host=None,
+    ):
+        """
+        Stores one run; timings are (kind, name, duration, status) tuples with
+        kind one of "stage", "target" or "channel". Returns the run id.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (product, branch, git_commit, host, started_at, "
+                "duration, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    product,
+                    branch,
+                    git_commit,
+                    host or socket.gethostname(),
+                    started_at.isoformat(),
+                    duration,
+                    status,
+                ),
+            )
+            run_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO timings (run_id, kind, name, duration, status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(run_id, *timing) for timing in timings],
+            )
+        logger.info(f"Recorded run {run_id} of '{product}' ({status}, {duration:.2f}s)")
+        return run_id
+
+    def runs(self, product, limit=DEFAULT_WINDOW + 1):
+        """Returns the latest runs of a product, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM runs WHERE product = ? ORDER BY id DESC LIMIT ?",
+                (product, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def last_commit(self, product, branch):
+        """Commit of the latest successful run of a product's branch, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT git_commit FROM runs WHERE product = ? AND branch = ? "
+                "AND status = 'success' AND git_commit IS NOT NULL "
+                "ORDER BY id DESC LIMIT 1",
+                (product, branch),
+            ).fetchone()
+        return row["git_commit"] if row else None
+
+    def timings(self, run_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, name, duration, status FROM timings WHERE run_id = ?",
+                (run_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def baseline(self, product, before_run_id, window=DEFAULT_WINDOW):
+        """
+        Returns {(kind, name): [durations]} of the successful timings in the
+        `window` successful runs preceding before_run_id.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.kind, t.name, t.duration FROM timings t "
+                "JOIN (SELECT id FROM runs WHERE product = ? AND id < ? "
+                "AND status = 'success' ORDER BY id DESC LIMIT ?) r "
+                "ON t.run_id = r.id WHERE t.status = 'success'",
+                (product, before_run_id, window),
+            ).fetchall()
+        samples = {}
+        for row in rows:
+            samples.setdefault((row["kind"], row["name"]), []).append(row["duration"])
+        return samples
+
+    def products(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT product FROM runs ORDER BY product"
+            ).fetchall()
+        return [row["product"] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def detect_regressions(
+    history,
+    product,
+    window=DEFAULT_WINDOW,
+    threshold=DEFAULT_Z_THRESHOLD,
+    min_samples=DEFAULT_MIN_SAMPLES,
+    min_ratio=DEFAULT_MIN_RATIO,
+):
+    """
+    Compares the latest run of a product against its baseline. Returns a list
+    of {kind, name, duration, mean, stdev, z_score, ratio} for every timing
+    that is both `threshold` standard deviations and `min_ratio` times slower
+    than the baseline mean.
+    """
+    latest = history.runs(product, limit=1)
+    if not latest:
+        return []
+    run = latest[0]
+    baseline = history.baseline(product, run["id"], window)
+    # Failed calls often end early or hang until a timeout; neither is comparable
+    current = [
+        (t["kind"], t["name"], t["duration"])
+        for t in history.timings(run["id"])
+        if t["status"] == "success"
+    ]
+    if run["status"] == "success" and run["duration"] is not None:
+        current.append(("run", "total", run["duration"]))
+        baseline[("run", "total")] = [
+            r["duration"]
+            for r in history.runs(product, window + 1)[1:]
+            if r["status"] == "success" and r["duration"] is not None
+        ]
+
+    regressions = []
+    for kind, name, duration in current:
+        samples = baseline.get((kind, name), [])
+        if len(samples) < min_samples:
+            continue
+        mean = statistics.fmean(samples)
+        stdev = statistics.stdev(samples)
+        ratio = duration / mean if mean else float("inf")
+        # A perfectly stable baseline makes any slowdown infinitely significant
+        z_score = (duration - mean) / stdev if stdev else float("inf")
+        if z_score >= threshold and ratio >= min_ratio:
+            regressions.append(
+                {
+                    "kind": kind,
+                    "name": name,
+                    "duration": duration,
+                    "mean": mean,
+                    "stdev": stdev,
+                    "z_score": z_score,
+                    "ratio": ratio,
+                }
+            )
+    return regressions
+
+
+def create_history(settings):
+    """
+    Returns a RunHistory for an enabled `history` config section, else None.
+    A relative path is resolved against the project root, like secrets.
+    """
+    settings = settings or {}
+    if not settings.get("enabled", False):
+        return None
+    path = settings.get("path", DEFAULT_HISTORY_PATH)
+    return RunHistory(path if path == ":memory:" else project_path(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Flag performance regressions in the pipeline run history"
+    )
+    parser.add_argument(
+        "--db",
+        default=project_path(DEFAULT_HISTORY_PATH),
+        help="History database (default: under the project root)",
+    )
+    parser.add_argument(
+        "--product", help="Product to check (defaults to all recorded products)"
+    )
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_Z_THRESHOLD)
+    parser.add_argument("--min-samples", type=int, default=DEFAULT_MIN_SAMPLES)
+    parser.add_argument("--min-ratio", type=float, default=DEFAULT_MIN_RATIO)
+    args = parser.parse_args(argv)
+
+    history = RunHistory(args.db)
+    try:
+        found = False
+        for product in [args.product] if args.product else history.products():
+            for r in detect_regressions(
+                history,
+                product,
+                window=args.window,
+                threshold=args.threshold,
+                min_samples=args.min_samples,
+                min_ratio=args.min_ratio,
+            ):
+                found = True
+                print(
+                    f"[Regression] {product}: {r['kind']} '{r['name']}' took "
+                    f"{r['duration']:.2f}s vs {r['mean']:.2f}s ± {r['stdev']:.2f}s "
+                    f"({r['ratio']:.1f}x, z={r['z_score']:.1f})"
+                )
+        if not found:
+            print("[Regression] No significant slowdowns found.")
+    finally:
+        history.close()
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
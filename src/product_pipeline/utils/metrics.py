@@ -0,0 +1,108 @@
+"""
+Pipeline metrics in the Prometheus text format.
+
+Runs update labelled gauges and counters in a process-wide registry, which
+is written to <directory>/<product>.prom after each run: one file per
+product, replaced atomically, as read by the node_exporter textfile
+collector. Workers of --all therefore never write the same file.
+"""
+
+import os
+import threading
+from product_pipeline.utils.config import project_path
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Metrics")
+
+COUNTER = "counter"
+GAUGE = "gauge"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # name -> (type, help); (name, sorted label items) -> value
+        self._metrics = {}
+        self._values = {}
+
+    def _update(self, kind, name, help_text, labels, update):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._metrics.setdefault(name, (kind, help_text))
+            self._values[key] = update(self._values.get(key, 0.0))
+
+    def set(self, name, value, help_text="", **labels):
+        self._update(GAUGE, name, help_text, labels, lambda _: value)
+
+    def inc(self, name, amount=1.0, help_text="", **labels):
+        self._update(COUNTER, name, help_text, labels, lambda old: old + amount)
+
+    def get(self, name, **labels):
+        with self._lock:
+            return self._values.get((name, tuple(sorted(labels.items()))))
+
+    def render(self, product=None):
+        """Text exposition of all samples, or of one product's samples."""
+        with self._lock:
+            values = sorted(self._values.items())
+            metrics = dict(self._metrics)
+        lines = []
+        current = None
+        for (name, labels), value in values:
+            if product is not None and dict(labels).get("product") != product:
+                continue
+            if name != current:
+                kind, help_text = metrics[name]
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                current = name
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(
+                f"{name}{{{label_text}}} {value!r}" if labels else f"{name} {value!r}"
+            )
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def export(self, product):
+        """Writes the product's samples to <directory>/<product>.prom, if enabled."""
+        if not self.directory:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{product}.prom")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "w") as f:
+                f.write(self.render(product))
+            os.replace(temporary, path)
+        except OSError as e:
+            # Metrics must never fail a delivery
+            logger.error(f"Failed to write metrics of '{product}': {e}")
+            return None
+        return path
+
+
+_registry = MetricsRegistry()
+_registry_lock = threading.Lock()
+
+
+def configure_metrics(config=None):
+    """
+    (Re)creates the process-wide registry from the `metrics` config section;
+    files are written only when `directory` is set (relative to the project
+    root).
+    """
+    global _registry
+    config = config or {}
+    with _registry_lock:
+        _registry = MetricsRegistry(project_path(config.get("directory")))
+        return _registry
+
+
+def get_metrics():
+    with _registry_lock:
+        return _registry
@@ -0,0 +1,179 @@
+"""
+Per-host rate limiting shared by all pipelines of the process.
+
+The calls of each repository or channel type to a host get one token bucket
+(requests per second, with bursts) and a cap on concurrent calls, configured
+in the `rate_limits` section of config.yaml:
+
+    rate_limits:
+      artifactory: {rate: 20, burst: 40, max_in_flight: 8}
+      email: {rate: 2, max_in_flight: 2}
+      s3: {max_in_flight: 32, adaptive: {initial: 4}}
+
+Types without an entry are not limited. With `adaptive`, the cap on
+concurrent calls adapts to the host's latency and errors (adaptive.py), up
+to max_in_flight.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from product_pipeline.utils.adaptive import Call, create_adaptive_limiter
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("RateLimit")
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average and `burst` at once."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until one is available. Returns the wait."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            # Sleep outside the lock so other callers can refill and check too
+            self._sleep(delay)
+            waited += delay
+
+
+class HostLimiter:
+    def __init__(
+        self, host, rate=None, burst=None, max_in_flight=None, adaptive=None, kind=None
+    ):
+        self.host = host
+        self.kind = kind
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.adaptive = (
+            create_adaptive_limiter(host, adaptive, maximum=max_in_flight)
+            if adaptive
+            else None
+        )
+        self.slots = (
+            threading.BoundedSemaphore(max_in_flight)
+            if max_in_flight and self.adaptive is None
+            else None
+        )
+
+    @contextmanager
+    def acquire(self):
+        """Yields the Call, whose status callers set for the adaptive limit."""
+        if self.adaptive is not None:
+            with self.adaptive.acquire(wait=self._take_token) as call:
+                yield call
+            return
+        # Hold a slot before taking a token, so no token is spent while queued
+        if self.slots is not None:
+            self.slots.acquire()
+        try:
+            self._take_token()
+            yield Call()
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+    def _take_token(self):
+        if self.bucket is not None:
+            waited = self.bucket.acquire()
+            if waited:
+                logger.debug(f"Throttled call to {self.host} for {waited:.3f}s")
+
+
+class RateLimiter:
+    def __init__(self, config=None):
+        # Settings per repository/channel type, e.g. {"nexus": {"rate": 10}}
+        self.config = {
+            kind.lower(): settings for kind, settings in (config or {}).items()
+        }
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter_for(self, kind, host):
+        """
+        Returns the limiter of a type's calls to a host; None if the type is
+        not limited (or has no type at all).
+        """
+        if not kind:
+            return None
+        kind = kind.lower()
+        key = (kind, host)
+        with self._lock:
+            if key not in self._limiters:
+                settings = self.config.get(kind)
+                self._limiters[key] = (
+                    HostLimiter(
+                        host,
+                        rate=settings.get("rate"),
+                        burst=settings.get("burst"),
+                        max_in_flight=settings.get("max_in_flight"),
+                        adaptive=settings.get("adaptive"),
+                        kind=kind,
+                    )
+                    if settings
+                    else None
+                )
+            return self._limiters[key]
+
+    @contextmanager
+    def limit(self, kind, host):
+        """
+        Context manager wrapping one call of `kind` to `host`; yields a Call
+        whose `status` feeds the host's adaptive limit, if any.
+        """
+        limiter = self.limiter_for(kind, host or kind)
+        if limiter is None:
+            yield Call()
+            return
+        with limiter.acquire() as call:
+            yield call
+
+    def adaptive_limiters(self):
+        """(kind, host, AIMDLimiter) of the hosts with adaptive limits."""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return [
+            (limiter.kind, limiter.host, limiter.adaptive)
+            for limiter in limiters
+            if limiter is not None and limiter.adaptive is not None
+        ]
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def configure_rate_limits(config=None):
+    """(Re)creates the process-wide limiter from the `rate_limits` config section."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = RateLimiter(config)
+        return _rate_limiter
+
+
+def get_rate_limiter():
+    """Returns the process-wide limiter shared by all targets and channels."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Secrets")
+
+# Default time-to-live (seconds) for resolved credentials
+DEFAULT_SECRETS_TTL = 300
+
+
+def substitute_env_placeholders(creds):
+    """
+    Returns a copy of creds with "${ENV_VAR}" placeholders replaced by the
+    value of the environment variable (left untouched if the variable is unset).
+    """
+    resolved = {}
+    for key, value in creds.items():
+        if isinstance(value, str) and value.startswith("${") and value.endswith("}"):
+            env_var = value[2:-1]
+            value = os.environ.get(env_var, value)
+        resolved[key] = value
+    return resolved
+
+
+class SecretsProvider(ABC):
+    """
+    Resolves credentials by their credentials_ref on first use and keeps them
+    in memory for `ttl` seconds, so long-running processes do not re-read and
+    re-process secrets for every pipeline.
+    """
+
+    def __init__(self, ttl=DEFAULT_SECRETS_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _resolve(self, ref):
+        """Method for loading the credentials for ref (None if unknown)."""
+        pass
+
+    def get(self, ref):
+        now = self._clock()
+        with self._lock:
+            cached = self._cache.get(ref)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+            creds = self._resolve(ref)
+            self._cache[ref] = (now + self.ttl, creds)
+        if creds is None:
+            logger.warning(f"No credentials found for reference '{ref}'.")
+        return creds
+
+    def invalidate(self, ref=None):
+        with self._lock:
+            if ref is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(ref, None)
+
+
+class FileSecretsProvider(SecretsProvider):
+    """Reads credentials from a secrets.yaml file, one mapping per reference."""
+
+    def __init__(self, path, ttl=DEFAULT_SECRETS_TTL, clock=time.monotonic):
+        super().__init__(ttl=ttl, clock=clock)
+        self.path = path
+        self._secrets = None
+        self._loaded_at = None
+
+    def _load(self):
+        # The raw file shares the TTL of the entries resolved from it
+        now = self._clock()
+        if self._secrets is None or now - self._loaded_at >= self.ttl:
+            # Imported here to avoid a circular import with utils.config
+            from product_pipeline.utils.config import load_yaml_file
+
+            if not os.path.exists(self.path):
+                logger.error(f"Secrets file {self.path} not found!")
+                raise FileNotFoundError(f"Secrets file {self.path} not found!")
+            self._secrets = load_yaml_file(self.path) or {}
+            self._loaded_at = now
+        return self._secrets
+
+    def invalidate(self, ref=None):
+        super().invalidate(ref)
+        if ref is None:
+            # Re-read the file too, e.g. for a credentials_ref just added
+            with self._lock:
+                self._secrets = None
+
+    def _resolve(self, ref):
+        creds = self._load().get(ref)
+        if creds is None:
+            return None
+        # Only the referenced entry is processed for placeholders
+        return substitute_env_placeholders(creds)
+
+
+class EnvSecretsProvider(SecretsProvider):
+    """
+    Builds credentials from environment variables prefixed with the upper-cased
+    reference, e.g. ARTIFACTORY_USER -> {"user": ...} for ref "artifactory".
+    """
+
+    def __init__(self, ttl=DEFAULT_SECRETS_TTL, clock=time.monotonic, environ=None):
+        super().__init__(ttl=ttl, clock=clock)
+        self.environ = environ if environ is not None else os.environ
+
+    def _resolve(self, ref):
+        prefix = f"{ref.upper()}_"
+        creds = {
+            key[len(prefix) :].lower(): value
+            for key, value in self.environ.items()
+            if key.startswith(prefix)
+        }
+        return creds or None
+
+
+def create_secrets_provider(secrets_config=None, default_path=None):
+    """
+    Creates a secrets provider from the optional `secrets` section of config.yaml:
+
+        secrets:
+          backend: file   # or "env"
+          path: config/secrets.yaml
+          ttl: 300
+    """
+    secrets_config = secrets_config or {}
+    backend = secrets_config.get("backend", "file").lower()
+    ttl = secrets_config.get("ttl", DEFAULT_SECRETS_TTL)
+    if backend == "env":
+        return EnvSecretsProvider(ttl=ttl)
+    if backend == "file":
+        return FileSecretsProvider(secrets_config.get("path", default_path), ttl=ttl)
+    raise ValueError(f"Unknown secrets backend '{backend}'.")
@@ -0,0 +1,283 @@
+"""
+Lightweight tracing with OpenTelemetry-compatible spans.
+
+Spans nest through a context variable, so they follow the code into asyncio
+tasks and, with wrap_context(), into pool threads. Other processes receive
+the W3C `traceparent` of their parent span. Finished spans are exported in
+batches as OTLP/JSON, either appended to a file (one export request per
+line, as read by the collector's otlpjsonfile receiver and trace viewers) or
+POSTed to an OTLP/HTTP collector at <endpoint>/v1/traces.
+"""
+
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Tracing")
+
+DEFAULT_BATCH_SIZE = 256
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+SPAN_KIND_INTERNAL = 1
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class SpanContext:
+    __slots__ = ("trace_id", "span_id")
+
+    def __init__(self, trace_id, span_id):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @classmethod
+    def from_traceparent(cls, traceparent):
+        """Parses a W3C traceparent header; returns None if it is malformed."""
+        try:
+            _, trace_id, span_id, _ = traceparent.split("-")
+        except (AttributeError, ValueError):
+            return None
+        if len(trace_id) != 32 or len(span_id) != 16:
+            return None
+        return cls(trace_id, span_id)
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "context",
+        "parent_span_id",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "status",
+        "status_message",
+    )
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.context = SpanContext(trace_id, secrets.token_hex(8))
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = STATUS_UNSET
+        self.status_message = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": self.status},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def export_request(spans, service_name):
+    """OTLP ExportTraceServiceRequest (JSON encoding) for a batch of spans."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "product_pipeline"},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class FileSpanExporter:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+    def export(self, request):
+        # One request per line, appended in a single write
+        with open(self.path, "a") as f:
+            f.write(json.dumps(request) + "\n")
+
+
+class OTLPHttpExporter:
+    def __init__(self, endpoint):
+        self.url = f"{endpoint.rstrip('/')}/v1/traces"
+
+    def export(self, request):
+        from product_pipeline.utils.transport import get_transport
+
+        get_transport().request(
+            "POST",
+            self.url,
+            body=json.dumps(request).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        ).raise_for_status()
+
+
+class Tracer:
+    """Creates spans and exports the finished ones in batches."""
+
+    def __init__(self, exporter=None, service_name="product-pipeline", batch_size=None):
+        self.exporter = exporter
+        self.service_name = service_name
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.config = {}
+        self._pending = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, attributes=None, parent=None):
+        """
+        Context manager running its block in a new child span of `parent`,
+        or of the current span. Exceptions mark the span as failed.
+        """
+        if self.exporter is None:
+            yield None
+            return
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        span = Span(name, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+            span.status = STATUS_OK
+        except BaseException as e:
+            span.status = STATUS_ERROR
+            span.status_message = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+    def _finish(self, span):
+        with self._lock:
+            self._pending.append(span)
+            if len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+        self._export(batch)
+
+    def _export(self, batch):
+        try:
+            self.exporter.export(export_request(batch, self.service_name))
+        except Exception as e:
+            # Tracing must never fail a delivery
+            logger.error(f"Failed to export {len(batch)} span(s): {e}")
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch and self.exporter is not None:
+            self._export(batch)
+
+
+def current_traceparent():
+    """traceparent of the current span, for handing to another process."""
+    span = _current_span.get()
+    return span.context.traceparent if span is not None else None
+
+
+def inject(headers):
+    """Adds the traceparent of the current span to outgoing HTTP headers."""
+    traceparent = current_traceparent()
+    if traceparent:
+        headers["traceparent"] = traceparent
+    return headers
+
+
+def wrap_context(func):
+    """Binds func to the caller's context (current span), for thread pools."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+_tracer = Tracer()
+_tracer_lock = threading.Lock()
+
+
+def configure_tracing(config=None):
+    """
+    (Re)creates the process-wide tracer from the `tracing` config section:
+
+        tracing:
+          enabled: true
+          exporter: file          # or otlp
+          path: .pipeline_cache/traces.jsonl
+          endpoint: http://localhost:4318
+    """
+    global _tracer
+    config = dict(config or {})
+    exporter = None
+    if config.get("enabled", False):
+        if config.get("exporter", "file") == "otlp":
+            exporter = OTLPHttpExporter(config.get("endpoint", "http://localhost:4318"))
+        else:
+            exporter = FileSpanExporter(
+                config.get("path", ".pipeline_cache/traces.jsonl")
+            )
+    with _tracer_lock:
+        _tracer.flush()
+        _tracer = Tracer(
+            exporter,
+            service_name=config.get("service_name", "product-pipeline"),
+            batch_size=config.get("batch_size"),
+        )
+        # Kept so other processes can configure an equivalent tracer
+        _tracer.config = config
+        return _tracer
+
+
+def get_tracer():
+    """Returns the process-wide tracer; spans are no-ops until configured."""
+    with _tracer_lock:
+        return _tracer
+
+
+def span(name, attributes=None, parent=None):
+    return get_tracer().span(name, attributes, parent)
@@ -0,0 +1,342 @@
+"""
+Shared HTTP transport for all HTTP-speaking plugins.
+
+Connections are pooled per (scheme, host, port) and kept alive between
+requests, DNS lookups are cached per host and TLS sessions are resumed when a
+new connection to the same host is opened, so fleet runs do not pay a full
+handshake per request.
+"""
+
+import base64
+import http.client
+import os
+import socket
+import ssl
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+from product_pipeline.utils.logging import get_logger
+
+logger = get_logger("Transport")
+
+DEFAULT_TRANSPORT_CONFIG = {
+    "pool_size": 8,
+    "connect_timeout": 5.0,
+    "read_timeout": 60.0,
+    "dns_ttl": 300.0,
+    "verify_tls": True,
+}
+
+# Chunk size used when streaming file bodies
+BLOCK_SIZE = 64 * 1024
+
+# Errors raised when a kept-alive connection was closed by the server
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class TransportError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class HTTPResponse:
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise TransportError(
+                f"HTTP {self.status} {self.reason}", status=self.status
+            )
+        return self
+
+
+def basic_auth_header(credentials):
+    """Returns an Authorization header for username/password credentials."""
+    credentials = credentials or {}
+    user = credentials.get("username", credentials.get("user"))
+    password = credentials.get("password", "")
+    if user is None:
+        return {}
+    token = base64.b64encode(f"{user}:{password}".encode()).decode("ascii")
+    return {"Authorization": f"Basic {token}"}
+
+
+def encode_multipart(fields, files, chunk_size=BLOCK_SIZE):
+    """
+    Encodes form fields and files as multipart/form-data without loading the
+    files into memory. `files` is a list of (field, filename, source) tuples
+    where source is a local path or a (size, iterable of chunks) pair.
+    Returns (content_type, content_length, iterable_body).
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            (
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+                f"\r\n\r\n{value}\r\n"
+            ).encode()
+        )
+    for name, filename, source in files:
+        header = (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        parts.append(header)
+        parts.append(source)
+        parts.append(b"\r\n")
+    closing = f"--{boundary}--\r\n".encode()
+
+    length = len(closing)
+    for part in parts:
+        if isinstance(part, str):
+            length += os.path.getsize(part)
+        elif isinstance(part, tuple):
+            length += part[0]
+        else:
+            length += len(part)
+
+    def body():
+        for part in parts:
+            if isinstance(part, str):
+                with open(part, "rb") as f:
+                    while True:
+                        chunk = f.read(chunk_size)
+                        if not chunk:
+                            break
+                        yield chunk
+            elif isinstance(part, tuple):
+                yield from part[1]
+            else:
+                yield part
+        yield closing
+
+    return f"multipart/form-data; boundary={boundary}", length, body()
+
+
+class _PooledConnectionMixin:
+    """Connects through the pool's DNS cache and applies connect/read timeouts."""
+
+    # Seconds left to the caller's deadline, capping both timeouts (or None)
+    time_left = None
+
+    def _timeout(self, timeout):
+        if self.time_left is None:
+            return timeout
+        # 0 would make the socket non-blocking
+        return max(min(timeout, self.time_left), 0.001)
+
+    def connect(self):
+        sock = None
+        last_error = None
+        for family, sockaddr in self._pool.resolve():
+            candidate = socket.socket(family, socket.SOCK_STREAM)
+            try:
+                candidate.settimeout(self._timeout(self._pool.connect_timeout))
+                candidate.connect(sockaddr)
+                sock = candidate
+                break
+            except OSError as e:
+                last_error = e
+                candidate.close()
+        if sock is None:
+            raise last_error or OSError(f"Cannot connect to {self.host}")
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = self._wrap(sock)
+        self.sock.settimeout(self._timeout(self._pool.read_timeout))
+
+    def _wrap(self, sock):
+        return sock
+
+
+class _HTTPConnection(_PooledConnectionMixin, http.client.HTTPConnection):
+    def __init__(self, pool):
+        super().__init__(pool.host, pool.port, blocksize=BLOCK_SIZE)
+        self._pool = pool
+
+
+class _HTTPSConnection(_PooledConnectionMixin, http.client.HTTPSConnection):
+    def __init__(self, pool):
+        super().__init__(
+            pool.host, pool.port, context=pool.ssl_context, blocksize=BLOCK_SIZE
+        )
+        self._pool = pool
+
+    def _wrap(self, sock):
+        # Resume the host's last TLS session to skip the full handshake
+        return self._context.wrap_socket(
+            sock, server_hostname=self.host, session=self._pool.tls_session
+        )
+
+
+class HostPool:
+    """Keep-alive connections to a single (scheme, host, port)."""
+
+    def __init__(self, scheme, host, port, config, ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.connect_timeout = config["connect_timeout"]
+        self.read_timeout = config["read_timeout"]
+        self.dns_ttl = config["dns_ttl"]
+        self.ssl_context = ssl_context
+        self.tls_session = None
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(config["pool_size"])
+        self._lock = threading.Lock()
+        self._addresses = None
+        self._resolved_at = 0.0
+        self.connections_opened = 0
+
+    def resolve(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._addresses is None or now - self._resolved_at > self.dns_ttl:
+                infos = socket.getaddrinfo(
+                    self.host, self.port, type=socket.SOCK_STREAM
+                )
+                self._addresses = [(info[0], info[4]) for info in infos]
+                self._resolved_at = now
+            return list(self._addresses)
+
+    def acquire(self, timeout=None):
+        """
+        Returns (connection, reused); blocks while pool_size are in use, for
+        at most timeout seconds.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TransportError(
+                f"No free connection to {self.host} within {timeout:.1f}s."
+            )
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.connections_opened += 1
+        if self.scheme == "https":
+            return _HTTPSConnection(self), False
+        return _HTTPConnection(self), False
+
+    def release(self, conn, reusable):
+        try:
+            if isinstance(conn.sock, ssl.SSLSocket) and conn.sock.session is not None:
+                # TLS 1.3 tickets arrive after the handshake, so refresh here
+                self.tls_session = conn.sock.session
+            if reusable and conn.sock is not None:
+                with self._lock:
+                    self._idle.append(conn)
+            else:
+                conn.close()
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class HTTPTransport:
+    def __init__(self, config=None):
+        self.config = dict(DEFAULT_TRANSPORT_CONFIG)
+        self.config.update(config or {})
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+        if not self.config["verify_tls"]:
+            self._ssl_context.check_hostname = False
+            self._ssl_context.verify_mode = ssl.CERT_NONE
+
+    def pool_for(self, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise TransportError(f"Unsupported URL scheme in '{url}'.")
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = HostPool(
+                    scheme,
+                    parts.hostname,
+                    port,
+                    self.config,
+                    self._ssl_context if scheme == "https" else None,
+                )
+                self._pools[key] = pool
+        return pool
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        """
+        Sends a request; timeout (seconds) caps the wait for a pooled
+        connection and every socket operation, for callers with a deadline.
+        """
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        pool = self.pool_for(url)
+        # Only bodies that can be sent again are retried on a stale connection
+        retriable = body is None or isinstance(body, (bytes, str))
+        while True:
+            conn, reused = pool.acquire(timeout)
+            conn.time_left = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn._timeout(pool.read_timeout))
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = response.read()
+            except _STALE_CONNECTION_ERRORS:
+                pool.release(conn, reusable=False)
+                if reused and retriable:
+                    continue
+                raise
+            except BaseException:
+                pool.release(conn, reusable=False)
+                raise
+            pool.release(conn, reusable=not response.will_close)
+            return HTTPResponse(
+                response.status, response.reason, dict(response.getheaders()), data
+            )
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def configure_transport(config=None):
+    """(Re)creates the process-wide transport from the `transport` config section."""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = HTTPTransport(config)
+        return _transport
+
+
+def get_transport():
+    """Returns the process-wide transport shared by all plugins."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HTTPTransport()
+        return _transport
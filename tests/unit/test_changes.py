@@ -0,0 +1,71 @@
+import datetime
+import subprocess
+
+import pytest
+
+from product_pipeline.core.changes import detect_changes, repository_host
+from product_pipeline.utils.history import RunHistory
+
+
+def _git(*args, cwd):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def _commit(work, message):
+    (work / "file").write_text(message)
+    _git("commit", "--quiet", "--allow-empty", "-am", message, cwd=work)
+    _git("push", "--quiet", "origin", "HEAD:main", cwd=work)
+    return _git("rev-parse", "HEAD", cwd=work)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    bare = tmp_path / "remote.git"
+    _git("init", "--quiet", "--bare", str(bare), cwd=tmp_path)
+    work = tmp_path / "work"
+    _git("clone", "--quiet", str(bare), str(work), cwd=tmp_path)
+    (work / "file").write_text("initial")
+    _git("add", "file", cwd=work)
+    return bare, work
+
+
+def test_unchanged_products_are_detected(remote):
+    bare, work = remote
+    head = _commit(work, "first")
+    history = RunHistory(":memory:")
+    history.record_run("A", "main", head, datetime.datetime.now(), 1.0, "success", [])
+    products = [
+        ("A", str(bare), "main"),
+        ("B", str(bare), "main"),  # never deployed
+        ("C", str(bare), "missing"),
+    ]
+    statuses = detect_changes(products, history)
+    assert not statuses["A"].changed and statuses["A"].head == head
+    assert statuses["B"].changed and statuses["B"].last_commit is None
+    assert statuses["C"].changed and "not found" in statuses["C"].error
+
+    # A new commit on the remote makes the product run again
+    _commit(work, "second")
+    assert detect_changes(products[:1], history)["A"].changed
+    history.close()
+
+
+def test_failed_runs_do_not_count_as_deployed(remote):
+    bare, work = remote
+    head = _commit(work, "first")
+    history = RunHistory(":memory:")
+    history.record_run("A", "main", head, datetime.datetime.now(), 1.0, "failed", [])
+    assert detect_changes([("A", str(bare), "main")], history)["A"].changed
+    history.close()
+
+
+def test_repository_host():
+    assert repository_host("https://github.com/example/A.git") == "github.com"
+    assert repository_host("git@gitlab.example.com:team/A.git") == "gitlab.example.com"
+    assert repository_host("/srv/git/A.git") == "local"
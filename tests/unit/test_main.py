@@ -53,7 +53,7 @@ def fake_init_deployment_targets(product_config):
     return []
 
 
-def fake_init_notification_channels(product_config):
+def fake_init_notification_channels(product_config, secrets_provider=None):
     """
     Fake init_notification_channels returns an empty list.
     """
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import time
+
+import pytest
+
+from product_pipeline.core import matrix
+
+
+def _git(*args, cwd):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repository(tmp_path):
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _git("init", "--quiet", "--initial-branch", "main", cwd=origin)
+    (origin / "VERSION").write_text("main\n")
+    _git("add", "VERSION", cwd=origin)
+    _git("commit", "--quiet", "-m", "main", cwd=origin)
+    _git("checkout", "--quiet", "-b", "release/1.0", cwd=origin)
+    (origin / "VERSION").write_text("1.0\n")
+    _git("commit", "--quiet", "-am", "release", cwd=origin)
+    return origin
+
+
+def test_branches_share_one_mirror(repository, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    config = {"matrix": {"cache_dir": str(tmp_path / "cache")}}
+    product_config = {"product_name": "P", "git_repository": str(repository)}
+    results = matrix.run_matrix(
+        config, product_config, ["main", "release/1.0"], stages=["clone"]
+    )
+    assert [(r.branch, r.status) for r in results] == [
+        ("main", "success"),
+        ("release/1.0", "success"),
+    ]
+    worktrees = tmp_path / "cache" / "worktrees" / "P"
+    assert (worktrees / "main" / "VERSION").read_text() == "main\n"
+    assert (worktrees / "release_1.0" / "VERSION").read_text() == "1.0\n"
+    # Worktrees hold no object store of their own
+    assert os.path.isfile(worktrees / "main" / ".git")
+    assert os.listdir(tmp_path / "cache" / "mirrors") == ["P.git"]
+    assert "[Matrix] 2 succeeded, 0 failed." in capsys.readouterr().out
+
+    # A rerun reuses the mirror and worktrees; an unknown branch fails the fetch
+    matrix.run_matrix(config, product_config, ["main"], stages=["clone"])
+    with pytest.raises(matrix.MatrixError):
+        matrix.run_matrix(config, product_config, ["missing"], stages=["clone"])
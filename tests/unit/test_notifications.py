@@ -27,8 +27,15 @@ class TestEmailNotification:
     @patch("smtplib.SMTP")
     def test_email_notification_send(self, mock_smtp):
         """Test email notification sending."""
-        config = {"smtp_server": "smtp.example.com", "port": 587}
-        email_notif = EmailNotification(config=config)
+        config = {
+            "smtp_server": "smtp.example.com",
+            "port": 587,
+            "recipients": ["team@example.com"],
+            "credentials_ref": "email",
+        }
+        secrets = MagicMock()
+        secrets.get.return_value = {"username": "bot", "password": "pw"}
+        email_notif = EmailNotification(config=config, secrets_provider=secrets)
 
         # Mock product
         mock_product = MagicMock()
@@ -41,7 +48,32 @@ class TestEmailNotification:
         email_notif.notify(mock_product)
 
         # Verify SMTP was called
-        mock_smtp.assert_called_once_with("smtp.example.com", 587)
+        mock_smtp.assert_called_once_with("smtp.example.com", 587, timeout=30)
+        mock_smtp_instance.starttls.assert_called_once()
+        secrets.get.assert_called_once_with("email")
+        mock_smtp_instance.login.assert_called_once_with("bot", "pw")
+        message = mock_smtp_instance.send_message.call_args[0][0]
+        assert message["To"] == "team@example.com"
+        assert message["Subject"] == "Product TestProduct processed"
+
+    @patch("smtplib.SMTP")
+    def test_email_cancellation_is_not_swallowed(self, mock_smtp):
+        """A past deadline fails the send instead of being logged."""
+        from src.product_pipeline.notifications import email
+
+        config = {"smtp_server": "smtp.example.com", "recipients": ["a@b.c"]}
+        token = MagicMock()
+        token.check.side_effect = email.CancelledError("Deadline exceeded")
+        with patch.object(email, "current_token", return_value=token):
+            with pytest.raises(email.CancelledError):
+                EmailNotification(config=config).send("s", "b")
+        mock_smtp.assert_not_called()
+
+    @patch("smtplib.SMTP")
+    def test_email_without_recipients_is_not_sent(self, mock_smtp):
+        """Without recipients no connection is opened."""
+        EmailNotification(config={"smtp_server": "smtp.example.com"}).send("s", "b")
+        mock_smtp.assert_not_called()
 
 
 class TestSlackNotification:
@@ -53,8 +85,8 @@ class TestSlackNotification:
         slack_notif = SlackNotification(config=config)
         assert slack_notif.config == config
 
-    @patch("requests.post")
-    def test_slack_notification_send(self, mock_post):
+    @patch("src.product_pipeline.notifications.slack.get_transport")
+    def test_slack_notification_send(self, mock_get_transport):
         """Test Slack notification sending."""
         config = {"webhook_url": "https://hooks.slack.com/services/test"}
         slack_notif = SlackNotification(config=config)
@@ -65,12 +97,81 @@ class TestSlackNotification:
 
         # Mock HTTP response
         mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_post.return_value = mock_response
+        mock_response.status = 200
+        mock_get_transport.return_value.request.return_value = mock_response
 
         slack_notif.notify(mock_product)
 
-        # Verify HTTP POST was called
-        mock_post.assert_called_once()
-        call_args = mock_post.call_args
-        assert call_args[0][0] == "https://hooks.slack.com/services/test"
+        # Verify HTTP POST was sent through the shared transport
+        mock_request = mock_get_transport.return_value.request
+        mock_request.assert_called_once()
+        call_args = mock_request.call_args
+        assert call_args[0][0] == "POST"
+        assert call_args[0][1] == "https://hooks.slack.com/services/test"
+
+
+class TestDigestNotifications:
+    """Test coalescing notifications into one message per destination."""
+
+    def _product(self, name, failed=False):
+        product = MagicMock()
+        product.name = name
+        product.target_branch = "main"
+        product.timings = [("stage", "deploy", 1.0, "failed" if failed else "success")]
+        return product
+
+    def test_one_message_per_destination(self):
+        from product_pipeline.notifications.digest import DigestCollector
+
+        collector = DigestCollector()
+        digest = {"digest": {"enabled": True}}
+        shared = [
+            SlackNotification(config={"webhook_url": "https://hooks/a", **digest})
+            for _ in range(3)
+        ]
+        other = SlackNotification(config={"webhook_url": "https://hooks/b", **digest})
+        collector_patch = patch(
+            "src.product_pipeline.notifications.slack.get_digest_collector",
+            return_value=collector,
+        )
+        with collector_patch, patch.object(SlackNotification, "post") as mock_post:
+            for index, channel in enumerate(shared):
+                channel.notify(self._product(f"P{index}", failed=index == 1))
+            other.notify(self._product("P3"))
+            mock_post.assert_not_called()
+            collector.flush_all()
+        assert collector.messages_sent == mock_post.call_count == 2
+        texts = sorted(call.args[0] for call in mock_post.call_args_list)
+        assert texts[0].splitlines() == [
+            "1 product(s) processed:",
+            "P3 (main): success",
+        ]
+        assert texts[1].splitlines() == [
+            "3 product(s) processed:",
+            "P0 (main): success",
+            "P1 (main): failed",
+            "P2 (main): success",
+        ]
+
+    def test_window_flushes_email_digest(self):
+        import time
+        from product_pipeline.notifications.digest import DigestCollector
+
+        collector = DigestCollector()
+        config = {
+            "smtp_server": "smtp.example.com",
+            "recipients": ["team@example.com"],
+            "digest": {"enabled": True, "window": 0.05},
+        }
+        collector_patch = patch(
+            "src.product_pipeline.notifications.email.get_digest_collector",
+            return_value=collector,
+        )
+        with collector_patch, patch.object(EmailNotification, "send") as mock_send:
+            EmailNotification(config=config).notify(self._product("P0"))
+            EmailNotification(config=dict(config)).notify(self._product("P1"))
+            deadline = time.monotonic() + 2
+            while not mock_send.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        mock_send.assert_called_once()
+        assert mock_send.call_args.args[0] == "2 product(s) processed"
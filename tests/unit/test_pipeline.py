@@ -1,4 +1,6 @@
 import sys
+import time
+import threading
 import os
 
 # Add the project root directory to the Python module search path
@@ -79,3 +81,259 @@ def test_pipeline_run(dummy_product, capsys):
     captured = capsys.readouterr().out
     # Check that the output includes the starting message
     assert "Starting pipeline for product: 'TestProduct'" in captured
+
+
+# Product is slotted and exposes its fields through repr instead of __dict__
+def test_product_slots(dummy_product):
+    product, _, _ = dummy_product
+    assert not hasattr(product, "__dict__")
+    assert "name='TestProduct'" in repr(product)
+
+
+# Streaming target that records the bytes it receives through upload_stream
+class StreamingTarget:
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.received = {}
+        self.deployed = False
+
+    def can_stream(self):
+        return True
+
+    def upload_stream(self, product, artifact, size, chunks):
+        data = b""
+        for chunk in chunks:
+            if self.fail:
+                raise RuntimeError("upload rejected")
+            time.sleep(self.delay)
+            data += chunk
+        self.received[artifact] = data
+
+    def deploy(self, product):
+        self.deployed = True
+
+
+def test_tee_upload_reads_once(tmp_path):
+    import hashlib
+    from product_pipeline.core.tee import tee_upload
+
+    artifact = tmp_path / "big.bin"
+    payload = os.urandom(64 * 1024)
+    artifact.write_bytes(payload)
+    fast, slow = StreamingTarget(), StreamingTarget(delay=0.001)
+    digest = tee_upload(None, str(artifact), [fast, slow], chunk_size=4096)
+    assert digest == hashlib.sha256(payload).hexdigest()
+    assert fast.received[str(artifact)] == payload
+    assert slow.received[str(artifact)] == payload
+
+
+def test_tee_upload_failure_does_not_stall_other_targets(tmp_path):
+    from product_pipeline.core.tee import TeeUploadError, tee_upload
+
+    artifact = tmp_path / "big.bin"
+    artifact.write_bytes(b"x" * 100000)
+    good, bad = StreamingTarget(), StreamingTarget(fail=True)
+    with pytest.raises(TeeUploadError) as error:
+        tee_upload(None, str(artifact), [good, bad], chunk_size=1024, queue_depth=1)
+    assert list(error.value.errors) == [bad]
+    assert len(good.received[str(artifact)]) == 100000
+
+
+def test_deploy_streams_artifacts_to_streaming_targets(tmp_path):
+    artifact = tmp_path / "app.tar"
+    artifact.write_bytes(b"artifact")
+    streaming, classic = StreamingTarget(), DummyTarget()
+    product = Product(
+        name="TestProduct",
+        git_repository="https://example.com/test.git",
+        scheduled_time="2025-03-01T00:00:00",
+        target_branch="main",
+        deploy_targets=[streaming, classic],
+        notification_channels=[],
+        artifacts=[str(artifact)],
+    )
+    product.deploy()
+    assert streaming.received == {str(artifact): b"artifact"}
+    assert not streaming.deployed
+    assert classic.deployed
+    assert str(artifact) in product.checksums
+
+
+def test_deploy_reuses_manifest_checksums(tmp_path):
+    import hashlib
+
+    artifact = tmp_path / "app.tar"
+    artifact.write_bytes(b"artifact")
+    target = StreamingTarget()
+    product = Product(
+        name="TestProduct",
+        git_repository="https://example.com/test.git",
+        scheduled_time="2025-03-01T00:00:00",
+        target_branch="main",
+        deploy_targets=[target],
+        notification_channels=[],
+        artifacts=[str(artifact)],
+        config={"manifest": {"enabled": True, "path": str(tmp_path / "m.json")}},
+    )
+    product.deploy()
+    expected = hashlib.sha256(b"artifact").hexdigest()
+    assert product.checksums[str(artifact)] == expected
+    assert product.manifest["artifacts"][0]["sha256"] == expected
+    assert (tmp_path / "m.json").exists()
+
+
+# Stage, target and channel timings end up in the run history
+def test_pipeline_records_history(dummy_product, monkeypatch):
+    from product_pipeline.utils.history import RunHistory
+
+    product, _, _ = dummy_product
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    history = RunHistory(":memory:")
+    Pipeline(product, stages=["build", "deploy", "notify"], history=history).run()
+    run = history.runs("TestProduct", limit=1)[0]
+    assert run["status"] == "success" and run["branch"] == "main"
+    recorded = {(t["kind"], t["name"]) for t in history.timings(run["id"])}
+    assert {("stage", "build"), ("stage", "deploy"), ("stage", "notify")} <= recorded
+    assert len([kind for kind, _ in recorded if kind in ("target", "channel")]) == 2
+    history.close()
+
+
+# Run, stage, target and channel events reach subscribers and the JSON-lines file
+def test_pipeline_publishes_events(dummy_product, monkeypatch, tmp_path):
+    import json
+    from product_pipeline.core import events
+
+    product, _, _ = dummy_product
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    path = tmp_path / "events.jsonl"
+    bus = events.configure_events({"path": str(path)})
+    received = []
+    bus.subscribe(received.append, maxsize=1)
+    try:
+        Pipeline(product, stages=["build", "deploy", "notify"]).run()
+    finally:
+        events.configure_events()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    types = [line["type"] for line in lines]
+    assert types[0] == events.RUN_STARTED and types[-1] == events.RUN_FINISHED
+    assert types.count(events.STAGE_STARTED) == types.count(events.STAGE_FINISHED) == 3
+    assert events.TARGET_DEPLOYED in types and events.CHANNEL_NOTIFIED in types
+    assert [event.type for event in received] == types
+    assert lines[-1]["status"] == "success" and lines[-1]["product"] == "TestProduct"
+
+
+def test_event_bus_backpressure():
+    import threading
+    from concurrent.futures import TimeoutError
+    from product_pipeline.core.events import Event, EventBus
+
+    bus = EventBus()
+    release = threading.Event()
+    handled = []
+
+    def slow(event):
+        release.wait(5)
+        handled.append(event.data["n"])
+
+    bus.subscribe(slow, maxsize=2)
+    # One event is being handled and two are queued; the fourth must wait
+    for n in range(3):
+        bus.publish(Event.create("tick", "P", n=n))
+    with pytest.raises(TimeoutError):
+        bus.publish(Event.create("tick", "P", n=3), timeout=0.1)
+    release.set()
+    bus.close()
+    assert handled[:3] == [0, 1, 2]
+
+
+# Run, stage, target and channel spans form one trace, across pool threads
+def test_pipeline_exports_spans(dummy_product, monkeypatch, tmp_path):
+    import json
+    from product_pipeline.utils import tracing
+
+    product, _, _ = dummy_product
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    path = tmp_path / "traces.jsonl"
+    tracing.configure_tracing({"enabled": True, "path": str(path)})
+    try:
+        Pipeline(product, stages=["build", "deploy", "notify"]).run()
+    finally:
+        tracing.configure_tracing()
+    spans = [
+        span
+        for line in path.read_text().splitlines()
+        for resource in json.loads(line)["resourceSpans"]
+        for scope in resource["scopeSpans"]
+        for span in scope["spans"]
+    ]
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["pipeline.run"]
+    assert "parentSpanId" not in root
+    assert {span["traceId"] for span in spans} == {root["traceId"]}
+    assert by_name["stage deploy"]["parentSpanId"] == root["spanId"]
+    assert by_name["target DummyTarget"]["parentSpanId"] == (
+        by_name["stage deploy"]["spanId"]
+    )
+    assert by_name["channel DummyChannel"]["parentSpanId"] == (
+        by_name["stage notify"]["spanId"]
+    )
+
+
+# Every stage gets its CPU/RSS usage, printed and exported as metrics
+def test_pipeline_reports_stage_usage(dummy_product, monkeypatch, tmp_path, capsys):
+    from product_pipeline.utils import metrics
+
+    product, _, _ = dummy_product
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    metrics.configure_metrics({"directory": str(tmp_path)})
+    try:
+        pipeline = Pipeline(product, stages=["build", "deploy", "notify"])
+        pipeline.run()
+    finally:
+        metrics.configure_metrics()
+    assert [usage.stage for usage in pipeline.usage] == ["build", "deploy", "notify"]
+    assert all(usage.cpu_seconds >= 0 for usage in pipeline.usage)
+    assert "[Usage] stage deploy: user" in capsys.readouterr().out
+    exported = (tmp_path / "TestProduct.prom").read_text()
+    assert (
+        'pipeline_runs_total{branch="main",product="TestProduct",status="success"} 1.0'
+        in exported
+    )
+    assert 'pipeline_stage_cpu_seconds_total{branch="main",mode="user",' in exported
+
+
+# A stage past its deadline is cancelled; the run fails without later stages
+def test_stage_deadline_cancels_the_stage(dummy_product, monkeypatch):
+    from product_pipeline.utils.cancellation import DeadlineExceeded, current_token
+
+    class HangingTarget:
+        cancelled = False
+
+        def __init__(self):
+            self.returned = threading.Event()
+
+        def deploy(self, product):
+            token = current_token()
+            # Waits for a response that never comes, unless cancelled
+            self.cancelled = token.wait(30)
+            self.returned.set()
+            token.check()
+
+    product, _, channel = dummy_product
+    target = HangingTarget()
+    product.deploy_targets = [target]
+    monkeypatch.setattr(time, "sleep", lambda seconds: None)
+    pipeline = Pipeline(
+        product,
+        stages=["build", "deploy", "notify"],
+        deadlines={"stage": 10, "stages": {"deploy": 0.2}},
+    )
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        pipeline.run()
+    assert time.monotonic() - start < 5
+    # The stage may still be unwinding on its worker thread
+    assert target.returned.wait(5)
+    assert target.cancelled
+    assert not channel.notified
@@ -1,9 +1,9 @@
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from src.product_pipeline.repositories.artifactory import ArtifactoryTarget
 from src.product_pipeline.repositories.nexus import NexusTarget
 from src.product_pipeline.repositories.s3 import S3Target
-from src.product_pipeline.repositories.base import DeploymentTarget
+from src.product_pipeline.repositories.base import DeploymentTarget, StreamingTarget
 
 
 class TestDeploymentTarget:
@@ -15,6 +15,16 @@ class TestDeploymentTarget:
         with pytest.raises(TypeError):
             DeploymentTarget()
 
+    def test_streaming_targets_must_implement_upload_stream(self):
+        class Incomplete(StreamingTarget):
+            def deploy(self, product):
+                pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+        assert not ArtifactoryTarget(config={}).can_stream()
+        assert ArtifactoryTarget(config={"url": "https://a"}).can_stream()
+
 
 class TestArtifactoryTarget:
     """Test Artifactory deployment target."""
@@ -28,6 +38,17 @@ class TestArtifactoryTarget:
         assert target.credentials_ref == "artifactory"
         assert target.credentials == {"username": "user", "password": "pass"}
 
+    def test_artifactory_target_lazy_credentials(self):
+        """Test credentials are resolved through the secrets provider on use."""
+        provider = MagicMock()
+        provider.get.return_value = {"username": "lazy"}
+        target = ArtifactoryTarget(
+            credentials_ref="artifactory", secrets_provider=provider
+        )
+        provider.get.assert_not_called()
+        assert target.credentials == {"username": "lazy"}
+        provider.get.assert_called_once_with("artifactory")
+
     def test_artifactory_deploy(self):
         """Test Artifactory deployment."""
         target = ArtifactoryTarget(
@@ -153,3 +174,210 @@ class TestDeploymentTargetFactory:
 
         target = create_deployment_target("artifactory", repo_config)
         assert target is None
+
+
+class TestHTTPUploads:
+    """Test that targets with a url upload artifacts over HTTP."""
+
+    @pytest.fixture
+    def product(self, tmp_path):
+        artifact = tmp_path / "app.tar"
+        artifact.write_bytes(b"artifact-bytes")
+        product = MagicMock()
+        product.name = "TestProduct"
+        product.target_branch = "main"
+        product.artifacts = [str(artifact)]
+        product.checksums = {}
+        return product
+
+    def test_artifactory_put(self, product):
+        target = ArtifactoryTarget(
+            credentials={"username": "u", "password": "p"},
+            config={
+                "url": "https://art.example.com/artifactory/",
+                "repository": "libs",
+            },
+        )
+        with patch.object(ArtifactoryTarget, "request") as mock_request:
+            target.deploy(product)
+        method, url = mock_request.call_args[0]
+        assert method == "PUT"
+        assert (
+            url == "https://art.example.com/artifactory/libs/TestProduct/main/app.tar"
+        )
+        assert mock_request.call_args[1]["headers"]["Authorization"] == "Basic dTpw"
+
+    def test_requests_share_host_limit(self):
+        from concurrent.futures import ThreadPoolExecutor
+        import threading
+        import time
+        from src.product_pipeline.utils.ratelimit import RateLimiter
+
+        limiter = RateLimiter({"artifactory": {"max_in_flight": 2}})
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_request(*args, **kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return MagicMock()
+
+        targets = [
+            ArtifactoryTarget(config={"url": f"https://art.example.com/{i}"})
+            for i in range(3)
+        ]
+        transport = MagicMock()
+        transport.request.side_effect = slow_request
+        with patch(
+            "product_pipeline.repositories.base.get_rate_limiter",
+            return_value=limiter,
+        ):
+            with patch(
+                "product_pipeline.repositories.base.get_transport",
+                return_value=transport,
+            ):
+                with ThreadPoolExecutor(max_workers=6) as executor:
+                    for i in range(12):
+                        target = targets[i % 3]
+                        executor.submit(target.request, "PUT", f"{target.url}/a{i}")
+        assert transport.request.call_count == 12
+        # The three targets share one host, hence one in-flight cap
+        assert peak[0] == 2
+
+    def test_overloaded_host_lowers_adaptive_limit(self):
+        from src.product_pipeline.utils.ratelimit import RateLimiter
+
+        limiter = RateLimiter(
+            {"artifactory": {"max_in_flight": 8, "adaptive": {"initial": 8}}}
+        )
+        target = ArtifactoryTarget(config={"url": "https://art.example.com"})
+        transport = MagicMock()
+        transport.request.return_value = MagicMock(status=503)
+        limiter_patch = patch(
+            "product_pipeline.repositories.base.get_rate_limiter",
+            return_value=limiter,
+        )
+        transport_patch = patch(
+            "product_pipeline.repositories.base.get_transport",
+            return_value=transport,
+        )
+        with limiter_patch, transport_patch:
+            target.request("PUT", "https://art.example.com/a")
+        ((kind, host, adaptive),) = limiter.adaptive_limiters()
+        assert (kind, host) == ("artifactory", "art.example.com")
+        assert adaptive.snapshot()["limit"] == 4
+
+    def test_artifactory_sends_manifest_checksum(self, product):
+        product.checksums = {product.artifacts[0]: "ab" * 32}
+        target = ArtifactoryTarget(config={"url": "https://art.example.com"})
+        with patch.object(ArtifactoryTarget, "request") as mock_request:
+            target.deploy(product)
+        headers = mock_request.call_args[1]["headers"]
+        assert headers["X-Checksum-Sha256"] == "ab" * 32
+
+    def test_nexus_component_upload(self, product):
+        target = NexusTarget(config={"url": "https://nexus.example.com"})
+        with patch.object(NexusTarget, "request") as mock_request:
+            target.deploy(product)
+        method, url = mock_request.call_args[0]
+        assert method == "POST"
+        assert url.endswith("/service/rest/v1/components?repository=raw-hosted")
+        body = b"".join(mock_request.call_args[1]["body"])
+        assert b'name="raw.asset1"; filename="app.tar"' in body
+
+    def test_s3_signed_put(self, product):
+        target = S3Target(
+            credentials={"access_key": "AKID", "secret_key": "secret"},
+            config={"url": "https://s3.example.com", "bucket": "builds"},
+        )
+        with patch.object(S3Target, "request") as mock_request:
+            target.deploy(product)
+        method, url = mock_request.call_args[0]
+        headers = mock_request.call_args[1]["headers"]
+        assert url == "https://s3.example.com/builds/TestProduct/main/app.tar"
+        assert headers["Authorization"].startswith("AWS4-HMAC-SHA256 Credential=AKID/")
+        assert headers["Host"] == "s3.example.com"
+
+    def test_target_without_url_does_not_upload(self, product):
+        target = S3Target(credentials={})
+        with patch.object(S3Target, "request") as mock_request:
+            target.deploy(product)
+        mock_request.assert_not_called()
+
+
+class TestNexusBatcher:
+    """Test batching of Nexus uploads across products."""
+
+    def _product(self, name, tmp_path):
+        artifact = tmp_path / f"{name}.tar"
+        artifact.write_bytes(b"data")
+        product = MagicMock()
+        product.name = name
+        product.target_branch = "main"
+        product.artifacts = [str(artifact)]
+        return product
+
+    def _target(self, max_items=3):
+        return NexusTarget(
+            credentials_ref="nexus",
+            config={
+                "url": "https://nexus.example.com",
+                "batch": {"enabled": True, "max_items": max_items, "window": 30},
+            },
+        )
+
+    def test_size_threshold_sends_one_component(self, tmp_path):
+        from product_pipeline.repositories.nexus import NexusBatcher
+
+        batcher = NexusBatcher()
+        products = [self._product(f"P{i}", tmp_path) for i in range(3)]
+        with patch.object(NexusTarget, "upload_assets") as mock_upload:
+            futures = [batcher.submit(self._target(), p, p.artifacts) for p in products]
+            assert all(future.result(timeout=1) for future in futures)
+        mock_upload.assert_called_once()
+        directory, assets = mock_upload.call_args[0]
+        assert directory == "/"
+        assert [name for name, _ in assets] == [
+            "P0/main/P0.tar",
+            "P1/main/P1.tar",
+            "P2/main/P2.tar",
+        ]
+
+    def test_failed_batch_reports_per_item(self, tmp_path):
+        from product_pipeline.repositories.nexus import NexusBatcher
+
+        batcher = NexusBatcher()
+        good, bad = self._product("Good", tmp_path), self._product("Bad", tmp_path)
+
+        def upload_component(self, product, artifacts):
+            if product.name == "Bad":
+                raise RuntimeError("rejected")
+
+        with patch.object(
+            NexusTarget, "upload_assets", side_effect=RuntimeError("batch failed")
+        ):
+            with patch.object(NexusTarget, "upload_component", upload_component):
+                good_future = batcher.submit(self._target(2), good, good.artifacts)
+                bad_future = batcher.submit(self._target(2), bad, bad.artifacts)
+        assert good_future.result(timeout=1) is True
+        with pytest.raises(RuntimeError, match="rejected"):
+            bad_future.result(timeout=1)
+
+    def test_window_flushes_partial_batch(self, tmp_path):
+        from product_pipeline.repositories.nexus import NexusBatcher
+
+        batcher = NexusBatcher()
+        product = self._product("Solo", tmp_path)
+        target = NexusTarget(
+            config={
+                "url": "https://nexus.example.com",
+                "batch": {"enabled": True, "max_items": 10, "window": 0.05},
+            }
+        )
+        with patch.object(NexusTarget, "upload_assets") as mock_upload:
+            assert batcher.submit(target, product, product.artifacts).result(timeout=2)
+        mock_upload.assert_called_once()
@@ -0,0 +1,107 @@
+from concurrent.futures import Future
+
+import pytest
+
+from product_pipeline.core.scheduler import RunScheduler, run_priority
+
+
+class FakeWorkers:
+    """Start function recording started runs; tests finish them by hand."""
+
+    def __init__(self):
+        self.started = []
+        self.futures = {}
+
+    def __call__(self, product, *args):
+        future = Future()
+        self.started.append(product)
+        self.futures[product] = future
+        return future
+
+    def finish(self, product, result=None):
+        self.futures.pop(product).set_result(result)
+
+
+class FakeHistory:
+    def __init__(self, durations):
+        self.durations = durations
+
+    def runs(self, product):
+        return [{"duration": self.durations[product], "status": "success"}]
+
+
+def test_higher_priority_runs_first():
+    workers = FakeWorkers()
+    scheduler = RunScheduler(workers, max_parallel=1)
+    scheduler.submit("Running")
+    low = scheduler.submit("Low", "main", priority=0)
+    high = scheduler.submit("High", "main", priority=5)
+    assert workers.started == ["Running"]
+    workers.finish("Running")
+    assert workers.started == ["Running", "High"]
+    workers.finish("High", "done")
+    assert high.result() == "done"
+    assert workers.started[-1] == "Low" and not low.done()
+
+
+def test_heavy_product_cannot_starve_small_ones():
+    workers = FakeWorkers()
+    history = FakeHistory({"Running": 1, "Heavy": 100, "Small": 1})
+    scheduler = RunScheduler(workers, max_parallel=1, history=history)
+    scheduler.submit("Running")
+    for _ in range(3):
+        scheduler.submit("Heavy")
+    for _ in range(3):
+        scheduler.submit("Small")
+    while scheduler.queued or workers.futures:
+        workers.finish(workers.started[-1])
+    # Every queued Heavy run would take 100s: the small runs go in between
+    assert workers.started == [
+        "Running",
+        "Heavy",
+        "Small",
+        "Small",
+        "Small",
+        "Heavy",
+        "Heavy",
+    ]
+
+
+def test_hotfix_preempts_queued_runs_only():
+    workers = FakeWorkers()
+    settings = {"hotfix_branches": ["hotfix/*"]}
+    scheduler = RunScheduler(workers, max_parallel=2, preempt_priority=100)
+    scheduler.submit("A")
+    scheduler.submit("B")
+    scheduler.submit("C", priority=run_priority(settings, {}, "main"))
+    hotfix = scheduler.submit(
+        "Hotfix", priority=run_priority(settings, {"priority": 1}, "hotfix/cve")
+    )
+    # Running work is not interrupted
+    assert workers.started == ["A", "B"]
+    workers.finish("A")
+    assert workers.started == ["A", "B", "Hotfix"]
+    # C is held back while the hotfix runs, although a worker is free
+    workers.finish("B")
+    assert workers.started == ["A", "B", "Hotfix"]
+    workers.finish("Hotfix")
+    assert hotfix.done()
+    assert workers.started == ["A", "B", "Hotfix", "C"]
+
+
+def test_failed_runs_and_shutdown():
+    workers = FakeWorkers()
+    scheduler = RunScheduler(workers, max_parallel=1)
+    failing = scheduler.submit("A")
+    queued = scheduler.submit("B")
+    workers.futures.pop("A").set_exception(RuntimeError("boom"))
+    with pytest.raises(RuntimeError):
+        failing.result()
+    later = scheduler.submit("C")
+    scheduler.shutdown(cancel_queued=True)
+    assert later.cancelled()
+    assert not queued.cancelled()  # Already started when A failed
+    with pytest.raises(RuntimeError):
+        scheduler.submit("D")
+    with pytest.raises(ValueError):
+        RunScheduler(workers, 1).submit("E", weight=0)
@@ -0,0 +1,245 @@
+import gzip
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from product_pipeline.core.engine import StageEngine
+from product_pipeline.core.pipeline import IMPLEMENTED_STEPS
+from product_pipeline.stages.build import BuildError, run_build
+from product_pipeline.stages.base import (
+    STAGE_REGISTRY,
+    Stage,
+    get_stage,
+    register_stage,
+)
+
+from product_pipeline.stages.compress import (
+    choose_level,
+    compress_artifacts,
+    compress_file,
+    is_compressed,
+)
+
+
+def _product(artifacts, config):
+    product = MagicMock()
+    product.name = "TestProduct"
+    product.artifacts = list(artifacts)
+    product.config = config
+    return product
+
+
+class TestCompressStage:
+    """Test the parallel compression stage."""
+
+    def test_parallel_members_form_valid_gzip(self, tmp_path):
+        src = tmp_path / "data.txt"
+        payload = b"line of log output\n" * 50000
+        src.write_bytes(payload)
+        dst = tmp_path / "data.txt.gz"
+        written = compress_file(str(src), str(dst), chunk_size=64 * 1024, workers=4)
+        assert written == dst.stat().st_size < len(payload)
+        assert gzip.decompress(dst.read_bytes()) == payload
+
+    def test_already_compressed_inputs_are_skipped(self, tmp_path):
+        archive = tmp_path / "bundle.bin"
+        archive.write_bytes(gzip.compress(b"data"))
+        plain = tmp_path / "app.bin"
+        plain.write_bytes(os.urandom(1024) * 4)
+        assert is_compressed(str(archive))
+
+        product = _product(
+            [str(archive), str(plain)], {"compression": {"enabled": True}}
+        )
+        compress_artifacts(product)
+        assert product.artifacts == [str(archive), str(plain) + ".gz"]
+
+    def test_disabled_compression_keeps_artifacts(self, tmp_path):
+        plain = tmp_path / "app.bin"
+        plain.write_bytes(b"data")
+        product = _product([str(plain)], {})
+        compress_artifacts(product)
+        assert product.artifacts == [str(plain)]
+
+    def test_bare_file_name_and_explicit_level_zero(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "app.bin").write_bytes(b"data" * 1000)
+        product = _product(["app.bin"], {"compression": {"enabled": True, "level": 0}})
+        compress_artifacts(product)
+        assert product.artifacts == ["app.bin.gz"]
+        # Level 0 stores the data uncompressed instead of picking a level
+        assert os.path.getsize("app.bin.gz") > 4000
+
+    def test_level_depends_on_size_and_type(self):
+        assert choose_level("app.bin", 1024, "gzip") == 9
+        assert choose_level("app.bin", 1024**3, "gzip") == 3
+        assert choose_level("app.log", 1024**3, "gzip") == 4
+        assert choose_level("app.bin", 100 * 1024**2, "zstd") == 9
+
+
+class TestIntegrationTestStage:
+    """Test sharding and caching of the integration test stage."""
+
+    def test_shards_are_balanced_by_duration(self):
+        from product_pipeline.stages.test import shard_tests
+
+        durations = {"a": 8.0, "b": 5.0, "c": 4.0, "d": 3.0}
+        shards = shard_tests(["a", "b", "c", "d"], durations, 2)
+        loads = sorted(sum(durations[f] for f in shard) for shard in shards)
+        assert loads == [9.0, 11.0]
+        assert shard_tests([], durations, 4) == []
+
+    def _workspace(self, tmp_path, failing=False):
+        import subprocess
+
+        tests_dir = tmp_path / "tests"
+        tests_dir.mkdir()
+        (tests_dir / "test_ok.py").write_text("print('ok')\n")
+        (tests_dir / "test_other.py").write_text(
+            "raise SystemExit(1)\n" if failing else "print('ok')\n"
+        )
+        subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+        subprocess.run(["git", "add", "."], cwd=tmp_path, check=True)
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "i"],
+            cwd=tmp_path,
+            check=True,
+        )
+        return str(tmp_path)
+
+    def test_passing_results_are_cached(self, tmp_path):
+        import sys
+
+        from product_pipeline.stages.test import run_integration_tests
+
+        product = _product([], {})
+        product.workspace = self._workspace(tmp_path)
+        product.config = {
+            "tests": {"enabled": True, "command": sys.executable, "workers": 2}
+        }
+        first = run_integration_tests(product)
+        assert sorted(r["file"] for r in first) == [
+            os.path.join("tests", "test_ok.py"),
+            os.path.join("tests", "test_other.py"),
+        ]
+        # Same commit and unchanged files: everything comes from the cache
+        assert run_integration_tests(product) == []
+
+    def test_failures_raise(self, tmp_path):
+        import sys
+
+        import pytest
+        from product_pipeline.stages.test import (
+            IntegrationTestError,
+            run_integration_tests,
+        )
+
+        product = _product([], {})
+        product.workspace = self._workspace(tmp_path, failing=True)
+        product.config = {"tests": {"enabled": True, "command": sys.executable}}
+        with pytest.raises(IntegrationTestError) as error:
+            run_integration_tests(product)
+        assert error.value.failed == [os.path.join("tests", "test_other.py")]
+
+
+class TestStageEngine:
+    """Test dispatching stages by resource class."""
+
+    @pytest.fixture
+    def engine(self):
+        engine = StageEngine({"cpu_workers": 1, "io_workers": 2})
+        yield engine
+        engine.shutdown()
+
+    def test_cpu_stage_runs_in_worker_process(self, engine, tmp_path):
+        artifact = tmp_path / "app.log"
+        artifact.write_bytes(b"log line\n" * 1000)
+        product = _product([str(artifact)], {"compression": {"enabled": True}})
+        engine.run_stage(get_stage("compress"), product)
+        assert product.artifacts == [str(artifact) + ".gz"]
+        assert engine._process_pool is not None
+
+    def test_cpu_pool_processes_get_the_limits(self):
+        import resource
+
+        engine = StageEngine({"cpu_workers": 1, "limits": {"open_files": 64}})
+        try:
+            pool = engine._get_process_pool()
+            limit = pool.submit(resource.getrlimit, resource.RLIMIT_NOFILE)
+            assert limit.result() == (64, 64)
+            assert pool.submit(os.getpid).result() != os.getpid()
+        finally:
+            engine.shutdown()
+
+    def test_io_and_subprocess_stages(self, engine):
+        product = _product([], {})
+        engine.run_stage(get_stage("deploy"), product)
+        engine.run_stage(get_stage("build"), product)
+        product.deploy.assert_called_once()
+        product.build.assert_called_once()
+        assert engine._thread_pool is not None and engine._loop is not None
+        assert engine._process_pool is None
+
+    def test_register_rejects_unknown_resource_class(self):
+        class GpuStage(Stage):
+            name = "gpu"
+            resource_class = "gpu"
+
+            def run(self, product):
+                pass
+
+        with pytest.raises(ValueError):
+            register_stage(GpuStage)
+        assert "gpu" not in STAGE_REGISTRY
+
+
+def test_builtin_stages_registered():
+    assert set(IMPLEMENTED_STEPS) <= set(STAGE_REGISTRY)
+
+
+class TestBuildStage:
+    """Test the subprocess build executor and its log capture."""
+
+    def test_runs_commands_with_env_and_rotating_logs(self, tmp_path):
+        script = tmp_path / "chatty.py"
+        script.write_text(
+            "import os\n"
+            "for i in range(2000):\n"
+            "    print(os.environ['GREETING'], i)\n"
+        )
+        log_dir = tmp_path / "logs"
+        settings = {
+            "commands": [
+                f"{sys.executable} {script}",
+                [f"{sys.executable} -c pass", f"{sys.executable} -c pass"],
+            ],
+            "env": {"GREETING": "hello"},
+            "jobs": 2,
+            "log_dir": str(log_dir),
+            "log_max_bytes": 8192,
+            "log_backups": 2,
+            "tail_lines": 5,
+        }
+        product = _product([], {"build": settings})
+        product.workspace = str(tmp_path)
+        assert run_build(product) == 3
+        log = log_dir / "TestProduct-1.log"
+        assert log.read_text().splitlines()[-1] == "hello 1999"
+        assert (log_dir / "TestProduct-1.log.2").exists()
+        assert not (log_dir / "TestProduct-1.log.3").exists()
+        assert log.stat().st_size <= 8192
+
+    def test_failure_reports_only_the_tail(self, tmp_path):
+        command = (
+            f"{sys.executable} -c "
+            "\"import sys; [print('line', i) for i in range(1000)]; sys.exit(3)\""
+        )
+        settings = {"commands": [command], "log_dir": str(tmp_path), "tail_lines": 3}
+        product = _product([], {"build": settings})
+        product.workspace = str(tmp_path)
+        with pytest.raises(BuildError) as excinfo:
+            run_build(product)
+        assert excinfo.value.returncode == 3
+        assert excinfo.value.tail == ["line 997\n", "line 998\n", "line 999\n"]
@@ -0,0 +1,130 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from product_pipeline.utils.transport import (
+    HTTPTransport,
+    TransportError,
+    basic_auth_header,
+    encode_multipart,
+)
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler that records requests and answers with a status."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_PUT(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_GET(self):
+        self._handle()
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        self.server.requests.append(
+            (self.command, self.path, dict(self.headers), body, self.client_address)
+        )
+        status = self.server.status
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    server.requests = []
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_keep_alive_connections_are_reused(http_server):
+    transport = HTTPTransport({"pool_size": 2})
+    url = f"http://127.0.0.1:{http_server.server_port}/path?x=1"
+    for _ in range(5):
+        assert transport.request("GET", url).body == b"ok"
+    pool = transport.pool_for(url)
+    # All five requests went over a single keep-alive socket
+    assert pool.connections_opened == 1
+    assert len({request[4] for request in http_server.requests}) == 1
+    assert http_server.requests[0][1] == "/path?x=1"
+    transport.close()
+
+
+def test_error_status_raises(http_server):
+    http_server.status = 503
+    transport = HTTPTransport()
+    response = transport.request("GET", f"http://127.0.0.1:{http_server.server_port}/")
+    with pytest.raises(TransportError) as error:
+        response.raise_for_status()
+    assert error.value.status == 503
+    transport.close()
+
+
+def test_file_body_is_streamed(http_server, tmp_path):
+    artifact = tmp_path / "artifact.bin"
+    artifact.write_bytes(b"x" * 200000)
+    transport = HTTPTransport()
+    with open(artifact, "rb") as f:
+        transport.request(
+            "PUT",
+            f"http://127.0.0.1:{http_server.server_port}/artifact.bin",
+            body=f,
+            headers={"Content-Length": "200000"},
+        )
+    assert http_server.requests[0][3] == b"x" * 200000
+    transport.close()
+
+
+def test_encode_multipart_length(tmp_path):
+    artifact = tmp_path / "a.txt"
+    artifact.write_bytes(b"payload")
+    content_type, length, body = encode_multipart(
+        {"raw.directory": "/p"}, [("raw.asset1", "a.txt", str(artifact))]
+    )
+    data = b"".join(body)
+    assert content_type.startswith("multipart/form-data; boundary=")
+    assert len(data) == length
+    assert b"payload" in data
+
+
+def test_basic_auth_header():
+    assert basic_auth_header({"username": "u", "password": "p"}) == {
+        "Authorization": "Basic dTpw"
+    }
+    assert basic_auth_header(None) == {}
+
+
+def test_timeout_caps_the_wait_for_a_response():
+    import socket
+    import time
+
+    # Accepts connections (backlog) but never answers
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    transport = HTTPTransport({"read_timeout": 60})
+    start = time.monotonic()
+    try:
+        with pytest.raises(OSError):
+            transport.request(
+                "GET", f"http://127.0.0.1:{listener.getsockname()[1]}/", timeout=0.2
+            )
+    finally:
+        transport.close()
+        listener.close()
+    assert time.monotonic() - start < 5
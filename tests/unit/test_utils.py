@@ -1,5 +1,7 @@
 import pytest
+import datetime
 import os
+import time
 from unittest.mock import patch, mock_open
 from src.product_pipeline.utils.config import load_configuration, load_yaml_file
 
@@ -79,3 +81,461 @@ def test_environment_variable_substitution():
             # Note: This would need to be tested in the actual load_configuration function
             # where the substitution logic is implemented
             assert result["artifactory"]["username"] == "${TEST_USER}"
+
+
+def test_file_secrets_provider_resolves_only_referenced_entry(tmp_path):
+    """Test that only the requested credentials_ref is resolved, on first use."""
+    from src.product_pipeline.utils.secrets import FileSecretsProvider
+
+    secrets_file = tmp_path / "secrets.yaml"
+    secrets_file.write_text(
+        "artifactory:\n  username: '${TEST_USER}'\nnexus:\n  username: plain\n"
+    )
+    provider = FileSecretsProvider(str(secrets_file), ttl=60)
+    with patch.dict(os.environ, {"TEST_USER": "env_user"}):
+        assert provider.get("artifactory") == {"username": "env_user"}
+    assert list(provider._cache) == ["artifactory"]
+    assert provider.get("missing") is None
+
+
+def test_secrets_provider_ttl_cache(tmp_path):
+    """Test that credentials are cached until their TTL expires."""
+    from src.product_pipeline.utils.secrets import FileSecretsProvider
+
+    now = [0.0]
+    secrets_file = tmp_path / "secrets.yaml"
+    secrets_file.write_text("s3:\n  access_key: old\n")
+    provider = FileSecretsProvider(str(secrets_file), ttl=10, clock=lambda: now[0])
+    assert provider.get("s3") == {"access_key": "old"}
+
+    secrets_file.write_text("s3:\n  access_key: new\n")
+    now[0] = 5.0
+    assert provider.get("s3") == {"access_key": "old"}
+    now[0] = 11.0
+    assert provider.get("s3") == {"access_key": "new"}
+
+
+def test_env_secrets_provider():
+    """Test that the env backend maps prefixed variables to credential keys."""
+    from src.product_pipeline.utils.secrets import EnvSecretsProvider
+
+    provider = EnvSecretsProvider(
+        environ={"NEXUS_USER": "u", "NEXUS_PASSWORD": "p", "OTHER": "x"}
+    )
+    assert provider.get("nexus") == {"user": "u", "password": "p"}
+    assert provider.get("s3") is None
+
+
+def test_file_secrets_provider_missing_file(tmp_path):
+    """Test that a missing secrets file is only reported when first used."""
+    from src.product_pipeline.utils.secrets import FileSecretsProvider
+
+    provider = FileSecretsProvider(str(tmp_path / "secrets.yaml"))
+    with pytest.raises(FileNotFoundError):
+        provider.get("artifactory")
+
+
+def test_config_model_shares_sub_configs():
+    """Test that the typed model interns strings and shares equal sub-configs."""
+    from src.product_pipeline.utils.config_model import build_config_model
+
+    repos = {"s3": {"enabled": True, "credentials_ref": "s3"}}
+    raw = {
+        "products": [
+            {
+                "product_name": "A",
+                "default_target_branch": "main",
+                "repositories": repos,
+            },
+            {
+                "product_name": "B",
+                "default_target_branch": "main",
+                "repositories": {"s3": {"enabled": True, "credentials_ref": "s3"}},
+            },
+        ]
+    }
+    model = build_config_model(raw)
+    first, second = model.products
+    assert first.repositories is second.repositories
+    assert model.find("B") is second
+    assert first.get("repositories")["s3"]["credentials_ref"] == "s3"
+    assert first.get("notifications") == {}
+    with pytest.raises(TypeError):
+        first.repositories["nexus"] = {}
+
+
+def test_config_model_validation():
+    """Test that structural problems are reported as ConfigError."""
+    from src.product_pipeline.utils.config_model import (
+        ConfigError,
+        build_config_model,
+    )
+
+    with pytest.raises(ConfigError):
+        build_config_model({"products": [{"git_repository": "x"}]})
+    with pytest.raises(ConfigError):
+        build_config_model(
+            {
+                "products": [
+                    {"product_name": "A", "repositories": {"s3": {"enabled": "y"}}}
+                ]
+            }
+        )
+    with pytest.raises(ConfigError):
+        build_config_model({"products": [{"product_name": "A"}, {"product_name": "A"}]})
+
+
+def test_hash_file_digests(tmp_path):
+    """Test standard and blockwise digests of a memory-mapped artifact."""
+    import hashlib
+    from src.product_pipeline.utils.hashing import hash_file
+
+    artifact = tmp_path / "artifact.bin"
+    payload = os.urandom(10000)
+    artifact.write_bytes(payload)
+    entry = hash_file(str(artifact), block_size=4096)
+    assert entry["size"] == 10000
+    assert entry["sha256"] == hashlib.sha256(payload).hexdigest()
+    blocks = b"".join(
+        hashlib.sha256(payload[i : i + 4096]).digest() for i in range(0, 10000, 4096)
+    )
+    assert entry["tree_sha256"] == hashlib.sha256(blocks).hexdigest()
+
+
+def test_build_and_write_manifest(tmp_path):
+    """Test that the manifest lists every artifact and round-trips as JSON."""
+    from src.product_pipeline.utils.hashing import (
+        build_manifest,
+        load_manifest,
+        write_manifest,
+    )
+
+    first, empty = tmp_path / "a.bin", tmp_path / "empty.bin"
+    first.write_bytes(b"abc")
+    empty.write_bytes(b"")
+    manifest = build_manifest([str(first), str(empty)], workers=2)
+    assert [entry["size"] for entry in manifest["artifacts"]] == [3, 0]
+
+    path = tmp_path / "out" / "manifest.json"
+    write_manifest(manifest, str(path))
+    assert load_manifest(str(path)) == manifest
+
+
+def _record(history, deploy_seconds, status="success"):
+    history.record_run(
+        "ProductA",
+        "main",
+        "abc123",
+        datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc),
+        deploy_seconds + 1.0,
+        status,
+        [
+            ("stage", "build", 1.0, "success"),
+            ("target", "NexusTarget", deploy_seconds, status),
+        ],
+        host="ci-1",
+    )
+
+
+def test_run_history_flags_slow_target(tmp_path):
+    """Test that a 3x slower deploy stands out against the rolling baseline."""
+    from src.product_pipeline.utils.history import RunHistory, detect_regressions
+
+    history = RunHistory(str(tmp_path / "history.db"))
+    for seconds in (10.0, 11.0, 9.5, 10.5, 10.0, 9.8):
+        _record(history, seconds)
+    # Failed runs are not part of the baseline
+    _record(history, 60.0, status="failed")
+    assert detect_regressions(history, "ProductA") == []
+
+    _record(history, 31.0)
+    regressions = detect_regressions(history, "ProductA")
+    assert {(r["kind"], r["name"]) for r in regressions} == {
+        ("target", "NexusTarget"),
+        ("run", "total"),
+    }
+    target = next(r for r in regressions if r["kind"] == "target")
+    assert target["ratio"] == pytest.approx(31.0 / 10.133, rel=1e-3)
+    assert history.runs("ProductA", limit=1)[0]["host"] == "ci-1"
+    history.close()
+
+
+def test_rate_limits_are_kept_per_type_and_host():
+    from src.product_pipeline.utils.ratelimit import RateLimiter
+
+    limiter = RateLimiter({"artifactory": {"max_in_flight": 2}})
+    # Untyped plugins are not limited
+    with limiter.limit(None, "shared.example.com"):
+        pass
+    # An unlimited type calling first does not lift another type's limit
+    assert limiter.limiter_for("slack", "shared.example.com") is None
+    artifactory = limiter.limiter_for("Artifactory", "shared.example.com")
+    assert artifactory is not None and artifactory.kind == "artifactory"
+    assert limiter.limiter_for("artifactory", "shared.example.com") is artifactory
+
+
+def test_token_bucket_throttles_after_burst():
+    """Test that calls beyond the burst wait for tokens to refill."""
+    from src.product_pipeline.utils.ratelimit import TokenBucket
+
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+    assert bucket.acquire() == 0 and bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.5)
+    now[0] += 10  # Refill is capped at the burst size
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, pytest.approx(0.5)]
+    assert sleeps == [pytest.approx(0.5)] * 2
+
+
+def _write_product(directory, name, branch):
+    (directory / f"{name}.yaml").write_text(
+        f"product_name: {name}\n"
+        f"git_repository: https://example.com/{name}.git\n"
+        f"default_target_branch: {branch}\n"
+    )
+
+
+def test_product_store_parses_lazily(tmp_path):
+    """Test that products.d files are parsed only when requested."""
+    from src.product_pipeline.utils.config_model import (
+        ConfigError,
+        build_config_model,
+    )
+    from src.product_pipeline.utils.config_store import ProductStore
+
+    for name in ("A", "B"):
+        _write_product(tmp_path, name, "main")
+    store = ProductStore(str(tmp_path))
+    model = build_config_model({"products": []}, store=store)
+    assert store.names() == ["A", "B"] and not store.is_loaded("A")
+    assert model.find("B").default_target_branch == "main"
+    assert store.is_loaded("B") and not store.is_loaded("A")
+    assert model.find("missing") is None
+    assert [p.product_name for p in model.get("products")] == ["A", "B"]
+    # A product in both places is reported instead of shadowing one of them
+    with pytest.raises(ConfigError, match="both in config.yaml"):
+        build_config_model({"products": [{"product_name": "A"}]}, store=store)
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_config_watcher_reloads_changed_files(tmp_path, use_inotify):
+    """Test hot reload of only the changed product files."""
+    import threading
+    from src.product_pipeline.utils.config_store import ConfigWatcher, ProductStore
+
+    for name in ("A", "B"):
+        _write_product(tmp_path, name, "main")
+    store = ProductStore(str(tmp_path))
+    store.get("A")
+    store.get("B")
+    events = []
+    seen = threading.Event()
+
+    def on_change(names):
+        events.append(names)
+        seen.set()
+
+    watcher = ConfigWatcher(
+        store, interval=0.05, on_change=on_change, use_inotify=use_inotify
+    ).start()
+    try:
+        _write_product(tmp_path, "A", "release")
+        # Polling compares mtimes, so make the change visible to it
+        os.utime(tmp_path / "A.yaml", ns=(0, 10**18))
+        assert seen.wait(5)
+    finally:
+        watcher.stop()
+    assert events[0] == {"A"}
+    assert store.get("A").default_target_branch == "release"
+    assert store.get("B").default_target_branch == "main"
+
+
+def test_tracing_propagates_context(tmp_path):
+    import threading
+    from src.product_pipeline.utils.tracing import (
+        SpanContext,
+        Tracer,
+        _current_span,
+        current_traceparent,
+        inject,
+        wrap_context,
+    )
+
+    class Exporter:
+        def __init__(self):
+            self.requests = []
+
+        def export(self, request):
+            self.requests.append(request)
+
+    exporter = Exporter()
+    tracer = Tracer(exporter)
+    seen = {}
+    with tracer.span("root") as root:
+        headers = inject({})
+
+        def child():
+            with tracer.span("child") as span:
+                seen["parent"] = span.parent_span_id
+
+        thread = threading.Thread(target=wrap_context(child))
+        thread.start()
+        thread.join()
+        remote = SpanContext.from_traceparent(current_traceparent())
+    assert (
+        headers["traceparent"]
+        == f"00-{root.context.trace_id}-{root.context.span_id}-01"
+    )
+    assert seen["parent"] == root.context.span_id
+    assert remote.trace_id == root.context.trace_id
+    assert _current_span.get() is None
+    assert SpanContext.from_traceparent("garbage") is None
+    # Spans are batched until flushed
+    assert exporter.requests == []
+    tracer.flush()
+    spans = exporter.requests[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["child", "root"]
+
+
+def test_measure_records_cpu_and_allocations():
+    from src.product_pipeline.utils.accounting import add_usage, measure
+
+    with measure("busy", tracemalloc_top=5) as usage:
+        deadline = time.process_time() + 0.05
+        while time.process_time() < deadline:
+            pass
+        retained = [bytearray(1024) for _ in range(1000)]
+        add_usage(0.5, 0.25)  # CPU time reported by a pool process
+    assert usage.user + usage.system >= 0.03
+    assert usage.children_user >= 0.5 and usage.children_system >= 0.25
+    assert usage.cpu_seconds >= 0.79
+    assert usage.top_allocations and usage.top_allocations[0][1] >= 1024 * 1000
+    assert "test_utils.py" in usage.top_allocations[0][0]
+    del retained
+    # Outside a measured stage, reported usage is dropped
+    add_usage(1.0, 1.0)
+
+
+def test_metrics_registry_exports_per_product(tmp_path):
+    from src.product_pipeline.utils.metrics import MetricsRegistry
+
+    registry = MetricsRegistry(str(tmp_path))
+    registry.inc("runs_total", help_text="Runs", product="A", status="success")
+    registry.inc("runs_total", product="A", status="success")
+    registry.set("peak_bytes", 1024, product="B")
+    assert registry.get("runs_total", product="A", status="success") == 2.0
+    path = registry.export("A")
+    assert open(path).read() == (
+        "# HELP runs_total Runs\n"
+        "# TYPE runs_total counter\n"
+        'runs_total{product="A",status="success"} 2.0\n'
+    )
+    assert "peak_bytes" in registry.render("B")
+
+
+def test_cancellation_token_deadlines():
+    from src.product_pipeline.utils.cancellation import (
+        CancelledError,
+        CancellationToken,
+        DeadlineExceeded,
+        stage_timeout,
+    )
+
+    now = [100.0]
+    run = CancellationToken.after(10, clock=lambda: now[0])
+    # A child never outlives its parent's deadline
+    assert run.child(60).remaining() == 10
+    stage = run.child(3)
+    assert stage.remaining() == 3
+    killed = []
+    with stage.on_cancel(lambda: killed.append("build")):
+        now[0] += 4
+        with pytest.raises(DeadlineExceeded):
+            stage.check()
+    assert killed == ["build"]
+    run.check()  # The run still has time left
+    other = run.child()
+    run.cancel("Shutting down")
+    with pytest.raises(CancelledError) as error:
+        other.check()
+    assert not isinstance(error.value, DeadlineExceeded)
+    assert stage_timeout({"stage": 900, "stages": {"build": 1800}}, "build") == 1800
+    assert stage_timeout({"stage": 900}, "deploy") == 900
+    assert stage_timeout(None, "deploy") is None
+
+
+def test_aimd_limiter_finds_capacity():
+    from src.product_pipeline.utils.adaptive import AIMDLimiter
+
+    now = [0.0]
+    limiter = AIMDLimiter("host", initial=2, maximum=4, clock=lambda: now[0])
+
+    def round_of_calls(latency, status=200):
+        calls = [limiter.acquire() for _ in range(int(limiter.limit))]
+        for call in calls:
+            call.__enter__().status = status
+        now[0] += latency
+        for call in calls:
+            call.__exit__(None, None, None)
+
+    # Additive increase while latency stays at its baseline, up to the maximum
+    for _ in range(10):
+        round_of_calls(0.1)
+    assert limiter.snapshot()["limit"] == 4
+    # Rising latency halves the limit, once per round of calls
+    round_of_calls(1.0)
+    assert limiter.snapshot()["limit"] == 2
+    assert limiter.gradient < 0.5
+    # So do 429s and 5xx
+    now[0] += 10
+    round_of_calls(0.1, status=429)
+    assert limiter.snapshot()["limit"] == 1
+
+
+def test_rate_limit_wait_is_not_taken_for_host_latency():
+    from src.product_pipeline.utils.ratelimit import HostLimiter, TokenBucket
+
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    limiter = HostLimiter(
+        "h", rate=16, burst=1, max_in_flight=16, adaptive={"initial": 8}
+    )
+    # 1/16s waits add up exactly on the fake clock
+    limiter.bucket = TokenBucket(16, 1, clock=lambda: now[0], sleep=sleep)
+    limiter.adaptive._clock = lambda: now[0]
+    # Instant calls, each throttled by the token bucket
+    for _ in range(40):
+        with limiter.acquire() as call:
+            call.status = 200
+    assert now[0] == 39 / 16
+    snapshot = limiter.adaptive.snapshot()
+    assert snapshot["limit"] == 8 and snapshot["decreases"] == 0
+    assert snapshot["latency"] == 0.0
+
+
+def test_history_and_metrics_paths_follow_the_project_root(tmp_path, monkeypatch):
+    from src.product_pipeline.utils.history import create_history
+    from src.product_pipeline.utils.metrics import configure_metrics
+
+    monkeypatch.setenv("PIPELINE_CONFIG_DIR", str(tmp_path / "config"))
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    history = create_history({"enabled": True, "path": "cache/history.db"})
+    history.close()
+    assert (tmp_path / "cache" / "history.db").exists()
+    registry = configure_metrics({"directory": "cache/metrics"})
+    try:
+        assert registry.directory == str(tmp_path / "cache" / "metrics")
+    finally:
+        configure_metrics()
+    assert not os.listdir(elsewhere)
@@ -0,0 +1,148 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+import urllib.request
+
+import pytest
+
+from unittest.mock import MagicMock
+
+from product_pipeline.core.webhook import (
+    RepositoryIndex,
+    RunQueue,
+    WebhookListener,
+    normalize_repository,
+    watch_products,
+)
+from product_pipeline.utils.config_model import build_config_model
+from product_pipeline.utils.config_store import ProductStore
+
+PRODUCTS = [
+    {
+        "product_name": "ProductA",
+        "git_repository": "https://github.com/example/ProductA.git",
+        "default_target_branch": "main",
+    },
+    {
+        "product_name": "ProductB",
+        "git_repository": "git@github.com:example/ProductB.git",
+        "default_target_branch": "release",
+    },
+]
+
+
+def test_repository_urls_are_normalized():
+    expected = "github.com/example/producta"
+    for url in (
+        "https://github.com/example/ProductA.git",
+        "git@github.com:example/ProductA.git",
+        "ssh://git@github.com:22/example/ProductA",
+        "https://token@github.com/example/ProductA/",
+    ):
+        assert normalize_repository(url) == expected
+    index = RepositoryIndex(PRODUCTS)
+    assert index.lookup(["https://github.com/example/productb"], "release") == [
+        "ProductB"
+    ]
+    assert index.lookup(["https://github.com/example/productb"], "main") == []
+
+
+def test_pushes_are_debounced():
+    runs = []
+    queue = RunQueue(lambda *key: runs.append((time.monotonic(), key)), debounce=0.3)
+    start = time.monotonic()
+    assert queue.trigger("ProductA", "main")
+    for _ in range(5):
+        assert not queue.trigger("ProductA", "main")
+    time.sleep(0.5)
+    queue.shutdown()
+    # The first push runs at once, the burst after it makes a single run
+    assert [key for _, key in runs] == [("ProductA", "main")] * 2
+    assert runs[0][0] - start < 0.1
+
+
+@pytest.fixture
+def listener():
+    started = threading.Event()
+    triggered = []
+
+    def runner(product, branch):
+        triggered.append((product, branch))
+        started.set()
+
+    listener = WebhookListener(
+        RepositoryIndex(PRODUCTS),
+        RunQueue(runner, debounce=1),
+        port=0,
+        secret="s3cret",
+    ).start()
+    listener.triggered, listener.started = triggered, started
+    yield listener
+    listener.stop()
+
+
+def _post(listener, payload, secret="s3cret"):
+    body = json.dumps(payload).encode()
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    host, port = listener.address[:2]
+    request = urllib.request.Request(
+        f"http://{host}:{port}/",
+        data=body,
+        headers={"X-Hub-Signature-256": f"sha256={signature}"},
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_push_event_starts_run(listener):
+    payload = {
+        "ref": "refs/heads/main",
+        "repository": {"clone_url": "https://github.com/example/ProductA.git"},
+    }
+    start = time.monotonic()
+    assert _post(listener, payload) == (202, {"triggered": ["ProductA"]})
+    assert listener.started.wait(1)
+    assert time.monotonic() - start < 1
+    assert listener.triggered == [("ProductA", "main")]
+    assert _post(listener, payload, secret="wrong")[0] == 401
+
+
+def test_listener_follows_products_d_edits(tmp_path):
+    def write(branch):
+        (tmp_path / "ProductC.yaml").write_text(
+            "product_name: ProductC\n"
+            "git_repository: https://github.com/example/ProductC.git\n"
+            f"default_target_branch: {branch}\n"
+        )
+
+    write("main")
+    config = build_config_model({"products": PRODUCTS}, store=ProductStore(tmp_path))
+    listener = WebhookListener(
+        RepositoryIndex(config.get("products")), RunQueue(print), port=0
+    )
+    secrets = MagicMock()
+    watcher = watch_products(config, listener, secrets, interval=0.05)
+    urls = ["https://github.com/example/ProductC"]
+    try:
+        assert listener.index.lookup(urls, "main") == ["ProductC"]
+        write("release")
+        # Polling compares mtimes, so make the change visible to it
+        os.utime(tmp_path / "ProductC.yaml", ns=(0, 10**18))
+        deadline = time.monotonic() + 5
+        while not listener.index.lookup(urls, "release"):
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+    finally:
+        watcher.stop()
+        listener.stop()
+    assert listener.index.lookup(urls, "main") == []
+    assert listener.index.lookup(
+        ["https://github.com/example/ProductA.git"], "main"
+    ) == ["ProductA"]
+    secrets.invalidate.assert_called()
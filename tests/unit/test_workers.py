@@ -0,0 +1,58 @@
+import os
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from product_pipeline.core import workers
+from product_pipeline.core.workers import PipelineWorkerPool, WorkerError
+from product_pipeline.utils.ratelimit import get_rate_limiter
+
+CONFIG = {"products": [{"product_name": "A"}, {"product_name": "B"}]}
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    runs = []
+
+    def fake_run_pipeline(config, product, stages=None, flush_digests=True):
+        runs.append(
+            (
+                product.name,
+                os.getpid(),
+                threading.current_thread().name,
+                get_rate_limiter(),
+                flush_digests,
+            )
+        )
+        product.timings.append(("stage", "build", 0.0, "success"))
+
+    monkeypatch.setattr(workers, "run_pipeline", fake_run_pipeline)
+    return runs
+
+
+@pytest.fixture
+def pool():
+    pool = PipelineWorkerPool(CONFIG, max_workers=2, secrets_provider=MagicMock())
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_share_the_process_and_its_runtime(pool, runs):
+    futures = [pool.submit(name, "main", ["build"]) for name in ("A", "B")]
+    assert [future.result() for future in futures] == [
+        [("stage", "build", 0.0, "success")]
+    ] * 2
+    assert {run[0] for run in runs} == {"A", "B"}
+    assert {run[1] for run in runs} == {os.getpid()}
+    assert all(run[2].startswith("pipeline") for run in runs)
+    # One rate limiter (and transport, batcher, digests) for the whole fleet
+    assert {id(run[3]) for run in runs} == {id(get_rate_limiter())}
+    # Fleet runs leave their digests to shutdown_runtime()
+    assert not any(run[4] for run in runs)
+
+
+def test_unknown_product_fails_its_future_only(pool, runs):
+    with pytest.raises(WorkerError, match="'C' not found"):
+        pool.submit("C").result()
+    assert pool.submit("A").result()